@@ -4,8 +4,29 @@ from .aggregates import (
 from .commands import (
     CredentialsCommandService,
 )
+from .filters import (
+    BloomFilter,
+    UsernameFilter,
+)
+from .identifiers import (
+    TimeOrderedEventRepository,
+    TimeOrderedUUIDGenerator,
+    uuid7,
+)
+from .passwords import (
+    PasswordHasher,
+)
 from .queries import (
     AlreadyExists,
     CredentialsQueryRepository,
     CredentialsQueryService,
+    LRUCache,
+    PostgreSqlQueryRepository,
+)
+from .tokens import (
+    TokenCache,
+    TokenManager,
+)
+from .verifiers import (
+    TokenVerifier,
 )
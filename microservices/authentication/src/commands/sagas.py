@@ -2,6 +2,14 @@ from __future__ import (
     annotations,
 )
 
+from typing import (
+    Optional,
+)
+
+from dependency_injector.wiring import (
+    Provide,
+    inject,
+)
 from minos.saga import (
     Saga,
     SagaContext,
@@ -12,6 +20,9 @@ from minos.saga import (
 from ..aggregates import (
     Credentials,
 )
+from ..filters import (
+    UsernameFilter,
+)
 
 
 def _validate_username(context: SagaContext):
@@ -33,15 +44,24 @@ async def _on_create_user_success(context: SagaContext, response: SagaResponse)
     return context
 
 
-async def _create_credentials(context: SagaContext) -> SagaContext:
+@inject
+async def _create_credentials(
+    context: SagaContext, username_filter: Optional[UsernameFilter] = Provide["username_filter"]
+) -> SagaContext:
+    if isinstance(username_filter, Provide):
+        username_filter = None
+
     username = context["username"]
     password = context["password"]
     user = context["user"]
 
+    # The filter may lag behind the other replicas, so the snapshot is always checked.
     if await Credentials.exists_username(username):
         raise Exception(f"The given username already exists: {username}")
 
     credentials = await Credentials.create(username, password, active=True, user=user)
+    if username_filter is not None:
+        username_filter.add(username)
     return SagaContext(credentials=credentials)
 
 
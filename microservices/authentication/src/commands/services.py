@@ -1,7 +1,10 @@
 import logging
 
 from minos.aggregate import (
+    AggregateNotFoundException,
     Condition,
+    DeletedAggregateException,
+    EventRepositoryConflictException,
 )
 from minos.cqrs import (
     CommandService,
@@ -19,6 +22,9 @@ from minos.saga import (
 from ..aggregates import (
     Credentials,
 )
+from ..passwords import (
+    PasswordHasher,
+)
 from .sagas import (
     CREATE_CREDENTIALS_SAGA,
 )
@@ -29,10 +35,16 @@ logger = logging.getLogger(__name__)
 class CredentialsCommandService(CommandService):
     """Credentials Command Service class"""
 
+    password_hasher: PasswordHasher
+
+    _UPDATE_PASSWORD_ATTEMPTS = 3
+
     @enroute.rest.command("/login", "POST")
     async def create_credentials(self, request: Request) -> Response:
         """Create new credentials based on a given username and password.
 
+        The password is hashed before starting the saga, so that it is never stored in plain text.
+
         :param request: A ``Request`` containing the username and password.
 
         :return:
@@ -40,7 +52,7 @@ class CredentialsCommandService(CommandService):
         content = await request.content()
 
         username = content["username"]
-        password = content["password"]
+        password = await self.password_hasher.hash(content["password"])
         metadata = {k: v for k, v in content.items() if k not in {"username", "password"}}
 
         try:
@@ -71,6 +83,37 @@ class CredentialsCommandService(CommandService):
 
         await credentials.delete()
 
+    @enroute.broker.command("UpdateCredentialsPassword")
+    async def update_password(self, request: Request) -> None:
+        """Replace the password hash of the given credentials, if it has not changed in the meantime.
+
+        The query service sends this command to upgrade the hash of a password stored in plain text or with outdated
+        parameters. Several logins may request it at the same time, so the first one wins and the rest are ignored. If
+        saving conflicts with a concurrent write, the credentials are loaded and compared again.
+
+        :param request: A ``Request`` containing the credentials identifier, the previous hash and the new one.
+        :return: This method does not return anything.
+        """
+        content = await request.content()
+
+        for _ in range(self._UPDATE_PASSWORD_ATTEMPTS):
+            try:
+                credentials = await Credentials.get(content["uuid"])
+            except (AggregateNotFoundException, DeletedAggregateException):
+                return
+
+            if credentials.password != content["previous"]:
+                return
+
+            credentials.password = content["password"]
+            try:
+                await credentials.save()
+                return
+            except EventRepositoryConflictException:
+                logger.info(f"The password of the {content['uuid']!s} credentials was concurrently modified")
+
+        raise ResponseException("The password could not be updated due to concurrent modifications.")
+
     @enroute.broker.event("CustomerDeleted")
     async def user_deleted(self, request: Request) -> None:
         """Delete the associated credentials to the already deleted user.
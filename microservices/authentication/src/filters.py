@@ -0,0 +1,165 @@
+from __future__ import (
+    annotations,
+)
+
+import logging
+import math
+from hashlib import (
+    blake2b,
+)
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Optional,
+)
+
+from minos.common import (
+    MinosConfig,
+    MinosConfigException,
+    MinosSetup,
+)
+
+if TYPE_CHECKING:
+    from .queries import (
+        CredentialsQueryRepository,
+    )
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Bloom Filter class.
+
+    The membership of the added items is answered with no false negatives and a false positive rate close to
+    ``error_rate`` while the number of items does not exceed ``capacity``. The positions of each item are derived from a
+    single ``blake2b`` digest by double hashing.
+    """
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, item: str) -> None:
+        """Add an item.
+
+        :param item: The item to be added.
+        :return: This method does not return anything.
+        """
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def _positions(self, item: str) -> list[int]:
+        digest = blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+
+class UsernameFilter(MinosSetup):
+    """Username Filter class.
+
+    The registered usernames are kept in a ``BloomFilter``, which is rebuilt from the read model on setup and updated as
+    the credentials are created, so that most of the queries for a username that is not taken are answered without
+    querying the database. A username that may be taken must be checked against the database. Until the filter is
+    built, every username may be taken.
+
+    The usernames registered on other replicas only reach the filter through the ``CredentialsCreated`` event, so it is
+    as fresh as the read model but no fresher. Therefore, it must not be used to decide whether a username can be
+    registered.
+    """
+
+    def __init__(
+        self, repository: CredentialsQueryRepository, *args, capacity: int = 100_000, error_rate: float = 0.01, **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.repository = repository
+        self.capacity = capacity
+        self.error_rate = error_rate
+
+        self.negatives = 0
+        self.positives = 0
+
+        self._filter: Optional[BloomFilter] = None
+        self._added: Optional[list[str]] = None
+
+    @classmethod
+    def _from_config(
+        cls, *args, config: MinosConfig, credentials_repository: CredentialsQueryRepository, **kwargs
+    ) -> UsernameFilter:
+        try:
+            # noinspection PyProtectedMember
+            kwargs = dict(config._get("username_filter")) | kwargs
+        except MinosConfigException:
+            pass
+        return cls(credentials_repository, *args, **kwargs)
+
+    async def _setup(self) -> None:
+        await self.rebuild()
+
+    async def rebuild(self) -> None:
+        """Build the filter again from the usernames stored on the read model.
+
+        The usernames added while it is being built are also added to the new filter.
+
+        :return: This method does not return anything.
+        """
+        self._added = list()
+        try:
+            usernames = [username async for username in self.repository.stream_usernames()]
+
+            bloom = BloomFilter(max(self.capacity, 2 * len(usernames)), self.error_rate)
+            for username in usernames + self._added:
+                bloom.add(username)
+        finally:
+            self._added = None
+
+        self._filter = bloom
+        logger.info(f"The username filter has been built with {len(usernames)} usernames.")
+
+    def add(self, username: str) -> None:
+        """Add a registered username.
+
+        :param username: The username to be added.
+        :return: This method does not return anything.
+        """
+        if self._added is not None:
+            self._added.append(username)
+        if self._filter is not None:
+            self._filter.add(username)
+
+    def may_exist(self, username: str) -> bool:
+        """Check if a username may be taken.
+
+        :param username: The username to be checked.
+        :return: ``False`` if the username is not taken or ``True`` if it may be.
+        """
+        if self._filter is not None and username not in self._filter:
+            self.negatives += 1
+            return False
+
+        self.positives += 1
+        return True
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """Get the filter counters.
+
+        :return: A dictionary containing the number of usernames, the number of checks answered without querying the
+            database and the number of checks that needed it.
+        """
+        return {
+            "ready": self._filter is not None,
+            "usernames": self._filter.count if self._filter is not None else 0,
+            "negatives": self.negatives,
+            "positives": self.positives,
+        }
@@ -1,2 +1,2 @@
-JWT_ALGORITHM = "HS256"
+JWT_ALGORITHM = "EdDSA"
 SECRET = "secret"
@@ -0,0 +1,211 @@
+from __future__ import (
+    annotations,
+)
+
+import hashlib
+import hmac
+import logging
+import os
+from asyncio import (
+    Semaphore,
+    get_running_loop,
+)
+from base64 import (
+    b64decode,
+    b64encode,
+)
+from concurrent.futures import (
+    ThreadPoolExecutor,
+)
+from time import (
+    perf_counter,
+)
+from typing import (
+    Any,
+    Optional,
+)
+
+from minos.common import (
+    MinosConfig,
+    MinosConfigException,
+    MinosSetup,
+)
+
+logger = logging.getLogger(__name__)
+
+SCRYPT_PREFIX = "$scrypt$"
+
+
+class PasswordHasher(MinosSetup):
+    """Password Hasher class.
+
+    The passwords are hashed with ``scrypt``, a memory-hard function, and encoded in the PHC string format together with
+    their parameters and salt, so that the parameters can be raised without invalidating the stored hashes. As each
+    hash takes tens of milliseconds, it is computed on a pool of worker threads (``hashlib`` releases the GIL meanwhile)
+    and at most ``max_concurrency`` hashes run at the same time, so that the event loop is never blocked and a burst of
+    logins cannot exhaust the memory of the service.
+    """
+
+    def __init__(
+        self,
+        *args,
+        n: int = 2 ** 14,
+        r: int = 8,
+        p: int = 1,
+        salt_size: int = 16,
+        key_size: int = 32,
+        workers: int = 4,
+        max_concurrency: Optional[int] = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        if max_concurrency is None:
+            max_concurrency = workers
+
+        self.n = n
+        self.r = r
+        self.p = p
+        self.salt_size = salt_size
+        self.key_size = key_size
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+
+        self.waiting = 0
+        self.running = 0
+        self.hashes = 0
+        self.total_time = 0.0
+        self.max_waiting = 0
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+        self._semaphore: Optional[Semaphore] = None
+
+    @classmethod
+    def _from_config(cls, *args, config: MinosConfig, **kwargs) -> PasswordHasher:
+        try:
+            # noinspection PyProtectedMember
+            kwargs = dict(config._get("password_hashing")) | kwargs
+        except MinosConfigException:
+            pass
+        return cls(*args, **kwargs)
+
+    async def _destroy(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password.
+
+        :param password: The password to be hashed.
+        :return: The encoded hash, containing its parameters and salt.
+        """
+        salt = os.urandom(self.salt_size)
+        key = await self._scrypt(password, salt, self.n, self.r, self.p, self.key_size)
+        return _encode(self.n, self.r, self.p, salt, key)
+
+    async def verify(self, password: str, encoded: str) -> bool:
+        """Check if a password matches with an encoded hash.
+
+        :param password: The password to be checked.
+        :param encoded: The encoded hash.
+        :return: ``True`` if the password matches or ``False`` otherwise.
+        """
+        if not encoded.startswith(SCRYPT_PREFIX):
+            # The credentials created before the passwords were hashed store them in plain text.
+            return hmac.compare_digest(password.encode(), encoded.encode())
+
+        try:
+            n, r, p, salt, expected = _decode(encoded)
+        except ValueError:
+            logger.warning("An invalid password hash has been found.")
+            return False
+
+        key = await self._scrypt(password, salt, n, r, p, len(expected))
+        return hmac.compare_digest(key, expected)
+
+    async def verify_dummy(self, password: str) -> bool:
+        """Verify a password against a fixed hash computed with the current parameters, which never matches.
+
+        It takes as long as a real verification, so that a missing user cannot be told apart by the response time.
+
+        :param password: The password to be checked.
+        :return: This method always returns ``False``.
+        """
+        await self.verify(password, _encode(self.n, self.r, self.p, bytes(self.salt_size), bytes(self.key_size)))
+        return False
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """Check if an encoded hash has been computed with outdated parameters.
+
+        :param encoded: The encoded hash.
+        :return: ``True`` if it should be computed again or ``False`` otherwise.
+        """
+        try:
+            n, r, p, _, key = _decode(encoded)
+        except ValueError:
+            return True
+        return (n, r, p, len(key)) != (self.n, self.r, self.p, self.key_size)
+
+    async def _scrypt(self, password: str, salt: bytes, n: int, r: int, p: int, key_size: int) -> bytes:
+        if self._semaphore is None:
+            self._semaphore = Semaphore(self.max_concurrency)
+
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        started_at = perf_counter()
+        try:
+            return await get_running_loop().run_in_executor(
+                self._executor, _scrypt, password.encode(), salt, n, r, p, key_size
+            )
+        finally:
+            self.hashes += 1
+            self.total_time += perf_counter() - started_at
+            self.running -= 1
+            self._semaphore.release()
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """Get the hashing counters.
+
+        :return: A dictionary containing the number of waiting and running hashes, the highest number of waiting
+            hashes, the number of computed hashes and their mean duration in milliseconds.
+        """
+        return {
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "running": self.running,
+            "max_concurrency": self.max_concurrency,
+            "hashes": self.hashes,
+            "mean_ms": 1000 * self.total_time / self.hashes if self.hashes else 0.0,
+        }
+
+
+def _scrypt(password: bytes, salt: bytes, n: int, r: int, p: int, key_size: int) -> bytes:
+    maxmem = 2 * 128 * n * r * p  # The default limit of OpenSSL (32 MiB) is too low for the higher parameters.
+    return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p, maxmem=max(maxmem, 32 * 1024 * 1024), dklen=key_size)
+
+
+def _encode(n: int, r: int, p: int, salt: bytes, key: bytes) -> str:
+    ln = n.bit_length() - 1
+    return f"{SCRYPT_PREFIX}ln={ln},r={r},p={p}${_b64encode(salt)}${_b64encode(key)}"
+
+
+def _decode(encoded: str) -> tuple[int, int, int, bytes, bytes]:
+    try:
+        _, name, raw_params, raw_salt, raw_key = encoded.split("$")
+        params = dict(param.split("=") for param in raw_params.split(","))
+        return 2 ** int(params["ln"]), int(params["r"]), int(params["p"]), _b64decode(raw_salt), _b64decode(raw_key)
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ValueError(f"The password hash could not be decoded: {exc!r}")
+
+
+def _b64encode(raw: bytes) -> str:
+    return b64encode(raw).decode().rstrip("=")
+
+
+def _b64decode(raw: str) -> bytes:
+    return b64decode(raw + "=" * (-len(raw) % 4))
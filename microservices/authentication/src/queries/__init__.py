@@ -1,3 +1,9 @@
+from .abc import (
+    PostgreSqlQueryRepository,
+)
+from .caches import (
+    LRUCache,
+)
 from .exceptions import (
     AlreadyExists,
 )
@@ -13,7 +13,7 @@ CREDENTIALS_TABLE = Table(
     META,
     Column("uuid", UUID_PG(as_uuid=True), primary_key=True),
     Column("username", String(32), unique=True, nullable=False),
-    Column("password", String(32), nullable=False),
+    Column("password", String(128), nullable=False),
     Column("active", Boolean),
     Column("user", UUID_PG(as_uuid=True)),
 )
@@ -3,27 +3,38 @@ from __future__ import (
 )
 
 from typing import (
+    Any,
+    AsyncIterator,
+    Optional,
     Union,
 )
 from uuid import (
     UUID,
 )
 
+from aiopg.sa import (
+    SAConnection,
+)
 from minos.common import (
     MinosConfig,
-    MinosSetup,
-)
-from sqlalchemy import (
-    and_,
-    create_engine,
+    MinosConfigException,
 )
-from sqlalchemy.exc import (
+from psycopg2 import (
     IntegrityError,
 )
+from sqlalchemy import (
+    select,
+)
 
 from ..aggregates import (
     Customer,
 )
+from .abc import (
+    PostgreSqlQueryRepository,
+)
+from .caches import (
+    LRUCache,
+)
 from .exceptions import (
     AlreadyExists,
 )
@@ -33,19 +44,44 @@ from .models import (
 )
 
 
-class CredentialsQueryRepository(MinosSetup):
-    """Credentials Repository class."""
+class CredentialsQueryRepository(PostgreSqlQueryRepository):
+    """Credentials Repository class.
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.engine = create_engine("postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}".format(**kwargs))
+    The credentials are looked up by username through an in-process cache, which is filled when the credentials are
+    created and invalidated when they are updated or deleted. The cache is disabled if its maximum size is zero.
+    """
 
-    async def _setup(self) -> None:
-        META.create_all(self.engine)
+    metadata = META
+
+    def __init__(self, *args, cache_max_size: int = 4096, cache_ttl: Optional[float] = 5, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = LRUCache(cache_max_size, cache_ttl) if cache_max_size > 0 else None
 
     @classmethod
     def _from_config(cls, *args, config: MinosConfig, **kwargs) -> CredentialsQueryRepository:
-        return cls(*args, **(config.repository._asdict() | {"database": "auth_query_db"}) | kwargs)
+        return cls(
+            *args,
+            **(config.repository._asdict() | {"database": "auth_query_db"})
+            | cls._pool_config(config)
+            | cls._cache_config(config)
+            | kwargs,
+        )
+
+    async def _upgrade(self, connection: SAConnection) -> None:
+        # The password column used to be too short to store the encoded hashes.
+        result = await connection.execute(_PASSWORD_LENGTH_QUERY)
+        if (await result.scalar()) >= 128:
+            return
+
+        await connection.execute(_UPGRADE_PASSWORD_QUERY)
+
+    @staticmethod
+    def _cache_config(config: MinosConfig) -> dict[str, Any]:
+        try:
+            # noinspection PyProtectedMember
+            return {f"cache_{k}": v for k, v in config._get("query_cache").items()}
+        except MinosConfigException:
+            return dict()
 
     async def create_credentials(
         self, uuid: UUID, username: str, password: str, active: bool, user: Union[Customer, UUID]
@@ -66,21 +102,93 @@ class CredentialsQueryRepository(MinosSetup):
             query = CREDENTIALS_TABLE.insert().values(
                 uuid=uuid, username=username, password=password, active=active, user=user
             )
-            self.engine.execute(query)
+            async with self.connection() as connection:
+                await connection.execute(query)
         except IntegrityError:
             raise AlreadyExists
 
-    async def exist_credentials(self, username, password) -> bool:
-        query = CREDENTIALS_TABLE.select().where(
-            and_(
-                CREDENTIALS_TABLE.columns.username == username,
-                CREDENTIALS_TABLE.columns.password == password,
-                CREDENTIALS_TABLE.columns.active == True,  # Do not substitute '==' by 'is' # noqa: E712
-            )
-        )
+        credentials = {"uuid": uuid, "username": username, "password": password, "active": active, "user": user}
+        self._invalidate(username, credentials)
 
-        return True if self.engine.execute(query).first() else False
+    async def get_by_username(self, username: str, cached: bool = True) -> Optional[dict[str, Any]]:
+        """Get the credentials identified by the given username.
 
-    async def get_by_username(self, username: str):
+        :param username: The credentials username.
+        :param cached: If ``False``, the credentials are read from the database even if they are cached, and the cache
+            is refreshed with them. Other replicas only notice the changes within the cache TTL, so the credentials
+            used to authenticate must not be read from the cache.
+        :return: A dictionary containing the credentials or ``None`` if they do not exist.
+        """
+        if cached and self.cache is not None and (credentials := self.cache.get(username)) is not None:
+            return credentials
+
+        version = self.cache.version() if self.cache is not None else None
         query = CREDENTIALS_TABLE.select().where(CREDENTIALS_TABLE.columns.username == username)
-        return self.engine.execute(query).first()
+        async with self.connection() as connection:
+            row = await (await connection.execute(query)).first()
+
+        if row is None:
+            return None
+
+        credentials = dict(row)
+        if self.cache is not None:
+            self.cache.set(username, credentials, version=version)
+        return credentials
+
+    async def stream_usernames(self) -> AsyncIterator[str]:
+        """Iterate over all the registered usernames.
+
+        :return: An asynchronous iterator of ``str`` values.
+        """
+        async for row in self.stream(select(CREDENTIALS_TABLE.columns.username)):
+            yield row["username"]
+
+    async def update_password(self, uuid: UUID, password: str) -> None:
+        """Update the password of the credentials identified by the given identifier.
+
+        :param uuid: The credentials identifier.
+        :param password: The new password hash.
+        :return: This method does not return anything.
+        """
+        query = CREDENTIALS_TABLE.update().where(CREDENTIALS_TABLE.columns.uuid == uuid).values(password=password)
+        query = query.returning(CREDENTIALS_TABLE.columns.username)
+        async with self.connection() as connection:
+            rows = await (await connection.execute(query)).fetchall()
+
+        for row in rows:
+            self._invalidate(row["username"])
+
+    async def delete(self, uuid: UUID) -> None:
+        """Delete the credentials identified by the given identifier.
+
+        :param uuid: The credentials identifier.
+        :return: This method does not return anything.
+        """
+        query = CREDENTIALS_TABLE.delete().where(CREDENTIALS_TABLE.columns.uuid == uuid)
+        query = query.returning(CREDENTIALS_TABLE.columns.username)
+        async with self.connection() as connection:
+            rows = await (await connection.execute(query)).fetchall()
+
+        for row in rows:
+            self._invalidate(row["username"])
+
+    def _invalidate(self, username: str, credentials: Optional[dict[str, Any]] = None) -> None:
+        if self.cache is None:
+            return
+
+        def _fn() -> None:
+            # The reads started before this change obtained an older cache version, so their results are not cached.
+            self.cache.discard(username)
+            if credentials is not None:
+                self.cache.set(username, credentials)
+
+        self._after_commit(_fn)
+
+
+_PASSWORD_LENGTH_QUERY = """
+SELECT character_maximum_length
+FROM information_schema.columns
+WHERE table_schema = current_schema() AND table_name = 'credentials' AND column_name = 'password'
+""".strip()
+
+_UPGRADE_PASSWORD_QUERY = "ALTER TABLE credentials ALTER COLUMN password TYPE VARCHAR(128)"
@@ -1,7 +1,10 @@
 import base64
-import time
+import logging
+from typing import (
+    Any,
+    Optional,
+)
 
-import jwt
 from dependency_injector.wiring import (
     Provide,
     inject,
@@ -16,6 +19,9 @@ from minos.cqrs import (
     QueryService,
 )
 from minos.networks import (
+    BrokerMessageV1,
+    BrokerMessageV1Payload,
+    BrokerPublisher,
     Request,
     Response,
     ResponseException,
@@ -23,22 +29,50 @@ from minos.networks import (
     enroute,
 )
 
-from ..jwt_env import (
-    JWT_ALGORITHM,
-    SECRET,
+from ..filters import (
+    UsernameFilter,
+)
+from ..passwords import (
+    PasswordHasher,
+)
+from ..tokens import (
+    TokenManager,
 )
 from .repositories import (
     CredentialsQueryRepository,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class CredentialsQueryService(QueryService):
     """Credentials Query Service class."""
 
     @inject
-    def __init__(self, *args, repository: CredentialsQueryRepository = Provide["credentials_repository"], **kwargs):
+    def __init__(
+        self,
+        *args,
+        repository: CredentialsQueryRepository = Provide["credentials_repository"],
+        token_manager: Optional[TokenManager] = Provide["token_manager"],
+        password_hasher: Optional[PasswordHasher] = Provide["password_hasher"],
+        username_filter: Optional[UsernameFilter] = Provide["username_filter"],
+        broker_publisher: Optional[BrokerPublisher] = Provide["broker_publisher"],
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
         self.repository = repository
+        if isinstance(token_manager, Provide):
+            token_manager = TokenManager()
+        self.token_manager = token_manager
+        if isinstance(password_hasher, Provide):
+            password_hasher = PasswordHasher()
+        self.password_hasher = password_hasher
+        if isinstance(username_filter, Provide):
+            username_filter = None
+        self.username_filter = username_filter
+        if isinstance(broker_publisher, Provide):
+            broker_publisher = None
+        self.broker_publisher = broker_publisher
 
     @enroute.rest.query("/login", "GET")
     async def generate_token(self, request: RestRequest) -> Response:
@@ -53,38 +87,87 @@ class CredentialsQueryService(QueryService):
 
         username, password = base64.b64decode(encoded_credentials).decode().split(":")
 
-        if not await self._validate_credentials(username, password):
+        # The password and the status are always read from the database, as a cached copy may miss a change handled
+        # by another replica.
+        credentials = await self.repository.get_by_username(username, cached=False)
+
+        if not await self._validate_credentials(credentials, password):
             raise ResponseException("Invalid username or password")
 
-        token = await self._generate_token(username)
+        if self.password_hasher.needs_rehash(credentials["password"]):
+            await self._rehash_password(credentials, password)
+
+        token = self._generate_token(credentials)
 
         return Response({"token": token})
 
-    async def _validate_credentials(self, username: str, password: str) -> bool:
+    async def _validate_credentials(self, credentials: Optional[dict[str, Any]], password: str) -> bool:
         """Check if the given credentials are valid.
 
-        :param username: The username.
+        The password is verified against the stored hash on the worker pool of the password hasher. A missing or
+        inactive user is verified against a fixed hash, so that the response time does not reveal whether the username
+        exists.
+
+        :param credentials: The credentials identified by the given username, if any.
         :param password: The password.
         :return: ``True`` if are valid or ``False`` otherwise.
         """
-        return await self.repository.exist_credentials(username, password)
+        if credentials is None or not credentials["active"]:
+            return await self.password_hasher.verify_dummy(password)
+
+        return await self.password_hasher.verify(password, credentials["password"])
+
+    async def _rehash_password(self, credentials: dict[str, Any], password: str) -> None:
+        """Hash again a password stored in plain text or with outdated parameters.
 
-    async def _generate_token(self, username: str) -> str:
-        """Generate a token for credentials identified by the given username.
+        The new hash is sent to the command service through the ``UpdateCredentialsPassword`` command, which only stores
+        it if the stored password has not changed in the meantime. The login succeeds even if the command cannot be
+        sent, as the hash is upgraded on a later login.
 
-        :param username: The username that identifies the credentials.
+        :param credentials: The already validated credentials.
+        :param password: The password.
+        :return: This method does not return anything.
+        """
+        if self.broker_publisher is None:
+            return
+
+        content = {
+            "uuid": credentials["uuid"],
+            "previous": credentials["password"],
+            "password": await self.password_hasher.hash(password),
+        }
+        message = BrokerMessageV1("UpdateCredentialsPassword", BrokerMessageV1Payload(content))
+        try:
+            await self.broker_publisher.send(message)
+        except Exception as exc:
+            logger.warning(
+                f"The password hash of the {credentials['uuid']!s} credentials could not be upgraded: {exc!r}"
+            )
+
+    def _generate_token(self, credentials: dict[str, Any]) -> str:
+        """Generate a token for the given credentials.
+
+        :param credentials: The already validated credentials.
         :return: A token encoded as an string value.
         """
-        credentials = await self.repository.get_by_username(username)
+        return self.token_manager.issue(str(credentials["user"]), credentials["username"])
 
-        payload = {"sub": str(credentials["user"]), "name": credentials["username"], "iat": time.time()}
+    # noinspection PyUnusedLocal
+    @enroute.rest.query("/login/hashing", "GET")
+    async def get_hashing_stats(self, request: Request) -> Response:
+        """Get the counters of the password hasher.
 
-        return jwt.encode(payload, SECRET, algorithm=JWT_ALGORITHM)
+        :param request: A request without any content.
+        :return: A response containing the number of waiting and running hashes and their mean duration.
+        """
+        return Response(self.password_hasher.stats)
 
     @enroute.rest.query("/token", "POST")
     async def validate_token(self, request: RestRequest) -> Response:
         """Validate if the given ``jwt`` token is valid.
 
+        The already verified tokens are answered from a cache until they expire.
+
         :param request: A ``RestRequest`` containing the token in headers.
         :return: The response containing the payload if everything is fine or an exception otherwise.
         """
@@ -94,17 +177,26 @@ class CredentialsQueryService(QueryService):
             raise ResponseException("Only 'Bearer Authentication' is supported")
 
         try:
-            payload = jwt.decode(token, SECRET, algorithms=[JWT_ALGORITHM])
+            payload = self.token_manager.validate(token)
         except InvalidTokenError as exc:
             raise ResponseException(exc.args[0])
 
         return Response(payload)
 
+    @enroute.rest.query("/.well-known/jwks.json", "GET")
+    async def get_jwks(self, request: Request) -> Response:
+        """Get the public keys used to sign the tokens, so that they can be verified without calling this service.
+
+        :param request: A request without any content.
+        :return: A response containing the JSON Web Key Set.
+        """
+        return Response(self.token_manager.jwks)
+
     @enroute.broker.query("GetByUsername")
     async def get_by_username(self, request: Request) -> Response:
         content = await request.content()
         username = content["username"]
-        credentials = await self.repository.get_by_username(username)
+        credentials = await self._get_by_username(username)
         if credentials:
             return Response(credentials["username"])
         else:
@@ -114,12 +206,22 @@ class CredentialsQueryService(QueryService):
     async def unique_username(self, request: Request) -> Response:
         content = await request.content()
         username = content["username"]
-        credentials = await self.repository.get_by_username(username)
+        credentials = await self._get_by_username(username)
         if credentials:
             raise ResponseException("'username' already exists")
         else:
             return Response(True)
 
+    async def _get_by_username(self, username: str) -> Optional[dict[str, Any]]:
+        """Get the credentials identified by the given username, skipping the query if the username is not taken.
+
+        :param username: The username.
+        :return: A dictionary containing the credentials or ``None`` if they do not exist.
+        """
+        if self.username_filter is not None and not self.username_filter.may_exist(username):
+            return None
+        return await self.repository.get_by_username(username)
+
     @enroute.broker.event("CredentialsCreated")
     async def credentials_created(self, request: Request) -> None:
         """Handle the ``CredentialsCreated`` domain event.
@@ -129,3 +231,25 @@ class CredentialsQueryService(QueryService):
         """
         diff: AggregateDiff = await request.content()
         await self.repository.create_credentials(diff.uuid, diff.username, diff.password, diff.active, diff.user)
+        if self.username_filter is not None:
+            self.username_filter.add(diff.username)
+
+    @enroute.broker.event("CredentialsUpdated.password")
+    async def credentials_password_updated(self, request: Request) -> None:
+        """Handle the ``CredentialsUpdated.password`` domain event.
+
+        :param request: A ``Request`` instance containing the ``AggregateDiff``.
+        :return: This method does not return anything.
+        """
+        diff: AggregateDiff = await request.content()
+        await self.repository.update_password(diff.uuid, diff.password)
+
+    @enroute.broker.event("CredentialsDeleted")
+    async def credentials_deleted(self, request: Request) -> None:
+        """Handle the ``CredentialsDeleted`` domain event.
+
+        :param request: A ``Request`` instance containing the ``AggregateDiff``.
+        :return: This method does not return anything.
+        """
+        diff: AggregateDiff = await request.content()
+        await self.repository.delete(diff.uuid)
@@ -0,0 +1,322 @@
+from __future__ import (
+    annotations,
+)
+
+import json
+import logging
+import os
+import time
+from base64 import (
+    urlsafe_b64encode,
+)
+from collections import (
+    OrderedDict,
+)
+from collections.abc import (
+    Callable,
+)
+from hashlib import (
+    sha256,
+)
+from pathlib import (
+    Path,
+)
+from typing import (
+    Any,
+    Optional,
+    Union,
+)
+
+import jwt
+from cryptography.hazmat.primitives import (
+    serialization,
+)
+from cryptography.hazmat.primitives.asymmetric import (
+    ed25519,
+    rsa,
+)
+from jwt.algorithms import (
+    get_default_algorithms,
+)
+from jwt.exceptions import (
+    InvalidTokenError,
+)
+from minos.common import (
+    MinosConfig,
+    MinosConfigException,
+    MinosSetup,
+)
+
+from .jwt_env import (
+    JWT_ALGORITHM,
+    SECRET,
+)
+
+logger = logging.getLogger(__name__)
+
+PRIVATE_KEY_ENV = "MINOS_TOKENS_PRIVATE_KEY"
+EPHEMERAL_KEYS_ENV = "MINOS_TOKENS_EPHEMERAL_KEYS"
+
+
+class TokenCache:
+    """Token Cache class.
+
+    The payloads of the already verified tokens are stored by the digest of the token, so that the raw tokens are not
+    kept in memory. Each entry expires when its token does, or after the time to live if the token has no expiration.
+    The least recently used entries are evicted when the maximum size is reached.
+    """
+
+    def __init__(self, max_size: int = 4096, ttl: Optional[float] = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: OrderedDict[bytes, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        """Compute the key of a token.
+
+        :param token: The encoded token.
+        :return: A ``bytes`` digest.
+        """
+        return sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict[str, Any]]:
+        """Get the payload of a token.
+
+        :param token: The encoded token.
+        :return: The stored payload or ``None`` if it is missing or expired.
+        """
+        key = self.digest(token)
+        if key not in self._entries:
+            self.misses += 1
+            return None
+
+        expires_at, payload = self._entries[key]
+        if time.time() >= expires_at:
+            del self._entries[key]
+            self.evictions += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return payload
+
+    def set(self, token: str, payload: dict[str, Any], leeway: float = 0) -> None:
+        """Store the payload of a verified token.
+
+        :param token: The encoded token.
+        :param payload: The verified payload.
+        :param leeway: The margin in seconds accepted after the expiration of the token.
+        :return: This method does not return anything.
+        """
+        if self.max_size <= 0:
+            return
+
+        now = time.time()
+        expires_at = float("inf") if self.ttl is None else now + self.ttl
+        if "exp" in payload:
+            expires_at = min(expires_at, payload["exp"] + leeway)
+        if expires_at <= now:
+            return
+
+        key = self.digest(token)
+        self._entries[key] = (expires_at, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all the entries.
+
+        :return: This method does not return anything.
+        """
+        self._entries.clear()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Get the cache counters.
+
+        :return: A dictionary containing the size, hits, misses and evictions.
+        """
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TokenManager(MinosSetup):
+    """Token Manager class.
+
+    The tokens are issued with the ``iat``, ``nbf`` and ``exp`` claims. The validation of a token is answered from the
+    cache while it is valid, so that the signature is only verified the first time the token is seen.
+
+    With an asymmetric algorithm (``EdDSA`` or ``RS256``) the tokens are signed with the first configured private key
+    and its identifier is set as the ``kid`` header. The public keys of all the configured keys are published as a JSON
+    Web Key Set, so that a key can be rotated by prepending the new one and keeping the previous one (its private key is
+    no longer needed) until the tokens signed with it expire. The signing key is shared by all the replicas, so it can
+    also be given through the ``MINOS_TOKENS_PRIVATE_KEY`` environment variable, which takes precedence over the
+    configured keys. An asymmetric manager without any key fails to start, unless the ephemeral keys are enabled (only
+    suitable for development, as each process would generate its own key).
+    """
+
+    def __init__(
+        self,
+        *args,
+        algorithm: str = JWT_ALGORITHM,
+        keys: Optional[list[dict[str, str]]] = None,
+        ephemeral_keys: bool = False,
+        secret: str = SECRET,
+        expiration: Optional[float] = 3600,
+        leeway: float = 0,
+        cache_max_size: int = 4096,
+        cache_ttl: Optional[float] = 300,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.algorithm = algorithm
+        self.ephemeral_keys = ephemeral_keys
+        self.secret = secret
+        self.expiration = expiration
+        self.leeway = leeway
+        self.cache = TokenCache(cache_max_size, cache_ttl)
+
+        self._signing_key: Optional[tuple[str, Any]] = None
+        self._public_keys: dict[str, Any] = dict()
+        if self.is_asymmetric:
+            self._load_keys(keys)
+
+    @classmethod
+    def _from_config(cls, *args, config: MinosConfig, **kwargs) -> TokenManager:
+        try:
+            # noinspection PyProtectedMember
+            kwargs = dict(config._get("tokens")) | kwargs
+        except MinosConfigException:
+            pass
+
+        if private_key := os.environ.get(PRIVATE_KEY_ENV):
+            kwargs["keys"] = [{"private_key": private_key}, *kwargs.get("keys", list())]
+        if (ephemeral_keys := os.environ.get(EPHEMERAL_KEYS_ENV)) is not None:
+            kwargs["ephemeral_keys"] = ephemeral_keys.lower() in ("1", "true", "yes")
+
+        return cls(*args, **kwargs)
+
+    @property
+    def is_asymmetric(self) -> bool:
+        """Check if the tokens are signed with an asymmetric algorithm.
+
+        :return: ``True`` if the algorithm is asymmetric or ``False`` otherwise.
+        """
+        return not self.algorithm.startswith("HS")
+
+    def _load_keys(self, keys: Optional[list[dict[str, str]]]) -> None:
+        if not keys:
+            if not self.ephemeral_keys:
+                raise ValueError(
+                    f"No token signing key has been configured. Set the {PRIVATE_KEY_ENV!r} environment variable or "
+                    f"the token keys, or enable the ephemeral keys for development."
+                )
+            logger.warning("No token signing key has been configured. An ephemeral one will be used.")
+            keys = [{"private_key": _generate_private_key(self.algorithm)}]
+
+        for key in keys:
+            if "private_key" in key:
+                private_key = _load_key(key["private_key"], serialization.load_pem_private_key, password=None)
+                public_key = private_key.public_key()
+            else:
+                private_key = None
+                public_key = _load_key(key["public_key"], serialization.load_pem_public_key)
+
+            kid = key.get("kid") or _thumbprint(self._to_jwk(public_key))
+            self._public_keys[kid] = public_key
+            if self._signing_key is None and private_key is not None:
+                self._signing_key = (kid, private_key)
+
+        if self._signing_key is None:
+            raise ValueError("At least one of the token keys must contain a private key.")
+
+    def _to_jwk(self, public_key: Any) -> dict[str, Any]:
+        return json.loads(get_default_algorithms()[self.algorithm].to_jwk(public_key))
+
+    @property
+    def jwks(self) -> dict[str, list[dict[str, Any]]]:
+        """Get the public keys as a JSON Web Key Set.
+
+        :return: A dictionary containing the ``keys`` list.
+        """
+        keys = list()
+        for kid, public_key in self._public_keys.items():
+            keys.append(self._to_jwk(public_key) | {"kid": kid, "alg": self.algorithm, "use": "sig"})
+        return {"keys": keys}
+
+    def issue(self, sub: str, name: str) -> str:
+        """Issue a new token.
+
+        :param sub: The subject of the token.
+        :param name: The name of the subject.
+        :return: A token encoded as an string value.
+        """
+        now = int(time.time())
+        payload = {"sub": sub, "name": name, "iat": now, "nbf": now}
+        if self.expiration is not None:
+            payload["exp"] = now + int(self.expiration)
+
+        if not self.is_asymmetric:
+            return jwt.encode(payload, self.secret, algorithm=self.algorithm)
+
+        kid, private_key = self._signing_key
+        return jwt.encode(payload, private_key, algorithm=self.algorithm, headers={"kid": kid})
+
+    def validate(self, token: str) -> dict[str, Any]:
+        """Validate a token.
+
+        :param token: The encoded token.
+        :return: The payload of the token. An ``InvalidTokenError`` is raised if the token is not valid.
+        """
+        if (payload := self.cache.get(token)) is not None:
+            return payload
+
+        if self.is_asymmetric:
+            kid = jwt.get_unverified_header(token).get("kid")
+            if kid not in self._public_keys:
+                raise InvalidTokenError(f"Unknown signing key: {kid!r}")
+            key = self._public_keys[kid]
+        else:
+            key = self.secret
+
+        payload = jwt.decode(token, key, algorithms=[self.algorithm], leeway=self.leeway)
+        self.cache.set(token, payload, self.leeway)
+        return payload
+
+
+def _load_key(raw: Union[str, bytes], fn: Callable[..., Any], **kwargs) -> Any:
+    # The keys are given either as PEM contents or as the path of a PEM file.
+    if isinstance(raw, str):
+        raw = raw.encode() if raw.startswith("-----BEGIN") else Path(raw).read_bytes()
+    return fn(raw, **kwargs)
+
+
+def _generate_private_key(algorithm: str) -> bytes:
+    if algorithm == "EdDSA":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    elif algorithm.startswith("RS") or algorithm.startswith("PS"):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        raise ValueError(f"An ephemeral key cannot be generated for the {algorithm!r} algorithm.")
+
+    return private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+
+
+def _thumbprint(jwk: dict[str, Any]) -> str:
+    # The RFC 7638 thumbprint, computed over the required members of the key.
+    members = {k: v for k, v in jwk.items() if k in ("crv", "e", "kty", "n", "x", "y")}
+    digest = sha256(json.dumps(members, sort_keys=True, separators=(",", ":")).encode()).digest()
+    return urlsafe_b64encode(digest).rstrip(b"=").decode()
@@ -0,0 +1,146 @@
+from __future__ import (
+    annotations,
+)
+
+import logging
+from asyncio import (
+    Lock,
+)
+from collections.abc import (
+    Iterable,
+)
+from time import (
+    monotonic,
+)
+from typing import (
+    Any,
+    Optional,
+)
+
+import jwt
+from aiohttp import (
+    ClientSession,
+    ClientTimeout,
+)
+from jwt.exceptions import (
+    InvalidTokenError,
+)
+from minos.common import (
+    MinosConfig,
+    MinosConfigException,
+    MinosSetup,
+)
+
+from .tokens import (
+    TokenCache,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenVerifier(MinosSetup):
+    """Token Verifier class.
+
+    The tokens are verified in-process against the JSON Web Key Set published by the authentication microservice (at
+    ``/.well-known/jwks.json``), so that validating a request does not require a round trip to it. The key set is
+    refreshed periodically and also when a token is signed with an unknown key, which happens after a key rotation.
+
+    It only depends on ``PyJWT``, ``aiohttp`` and the ``TokenCache``, so that it can be copied into the microservices
+    that need to authenticate their requests, registered as the ``token_verifier`` injection and configured with a
+    ``token_verifier`` section containing at least the ``url`` of the key set.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *args,
+        algorithms: Iterable[str] = ("EdDSA", "RS256"),
+        leeway: float = 0,
+        refresh_interval: float = 3600,
+        min_refresh_interval: float = 30,
+        timeout: float = 5,
+        cache_max_size: int = 4096,
+        cache_ttl: Optional[float] = 300,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.url = url
+        self.algorithms = list(algorithms)
+        self.leeway = leeway
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.cache = TokenCache(cache_max_size, cache_ttl)
+
+        self._keys: dict[str, tuple[str, jwt.PyJWK]] = dict()
+        self._refreshed_at: Optional[float] = None
+        self._lock = Lock()
+
+    @classmethod
+    def _from_config(cls, *args, config: MinosConfig, **kwargs) -> TokenVerifier:
+        try:
+            # noinspection PyProtectedMember
+            kwargs = dict(config._get("token_verifier")) | kwargs
+        except MinosConfigException:
+            pass
+        return cls(*args, **kwargs)
+
+    async def _setup(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as exc:
+            logger.warning(f"The token keys could not be fetched: {exc!r}")
+
+    async def refresh(self) -> None:
+        """Fetch the key set.
+
+        :return: This method does not return anything.
+        """
+        requested_at = monotonic()
+        async with self._lock:
+            if self._refreshed_at is not None and self._refreshed_at >= requested_at:
+                return  # Already refreshed by a concurrent call.
+            self._refreshed_at = monotonic()
+            async with ClientSession(timeout=ClientTimeout(total=self.timeout)) as session:
+                async with session.get(self.url) as response:
+                    response.raise_for_status()
+                    raw = await response.json()
+
+            keys = dict()
+            for jwk in raw["keys"]:
+                if jwk.get("use", "sig") != "sig" or jwk.get("alg") not in self.algorithms:
+                    continue
+                keys[jwk["kid"]] = (jwk["alg"], jwt.PyJWK(jwk, jwk["alg"]))
+            self._keys = keys
+
+    async def verify(self, token: str) -> dict[str, Any]:
+        """Verify a token.
+
+        :param token: The encoded token.
+        :return: The payload of the token. An ``InvalidTokenError`` is raised if the token is not valid.
+        """
+        if (payload := self.cache.get(token)) is not None:
+            return payload
+
+        kid = jwt.get_unverified_header(token).get("kid")
+        if self._should_refresh(kid):
+            try:
+                await self.refresh()
+            except Exception as exc:
+                logger.warning(f"The token keys could not be fetched: {exc!r}")
+
+        if kid not in self._keys:
+            raise InvalidTokenError(f"Unknown signing key: {kid!r}")
+        algorithm, key = self._keys[kid]
+
+        payload = jwt.decode(token, key.key, algorithms=[algorithm], leeway=self.leeway)
+        self.cache.set(token, payload, self.leeway)
+        return payload
+
+    def _should_refresh(self, kid: Optional[str]) -> bool:
+        if self._refreshed_at is None:
+            return True
+        elapsed = monotonic() - self._refreshed_at
+        if kid not in self._keys:
+            return elapsed > self.min_refresh_interval
+        return elapsed > self.refresh_interval
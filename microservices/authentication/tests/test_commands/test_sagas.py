@@ -0,0 +1,60 @@
+import sys
+import unittest
+from unittest.mock import (
+    AsyncMock,
+)
+from uuid import (
+    uuid4,
+)
+
+from minos.saga import (
+    SagaContext,
+)
+
+from src import (
+    Credentials,
+    UsernameFilter,
+)
+from src.commands.sagas import (
+    _create_credentials,
+)
+from tests.utils import (
+    build_dependency_injector,
+)
+
+
+class TestCreateCredentialsSaga(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.injector = build_dependency_injector()
+        await self.injector.wire(modules=[sys.modules[__name__]])
+
+        async def _stream_usernames():
+            for _ in ():
+                yield
+
+        repository = AsyncMock()
+        repository.stream_usernames = _stream_usernames
+        self.username_filter = UsernameFilter(repository)
+        await self.username_filter.setup()
+
+        self.context = SagaContext(username="foo", password="bar", user=uuid4())
+
+    async def asyncTearDown(self) -> None:
+        await self.injector.unwire()
+
+    async def test_create_credentials(self):
+        context = await _create_credentials(self.context, username_filter=self.username_filter)
+
+        self.assertEqual("foo", context["credentials"].username)
+        self.assertTrue(self.username_filter.may_exist("foo"))
+
+    async def test_create_credentials_raises_missing_from_filter(self):
+        await Credentials.create("foo", "baz", active=True, user=uuid4())
+        self.assertFalse(self.username_filter.may_exist("foo"))
+
+        with self.assertRaisesRegex(Exception, "already exists"):
+            await _create_credentials(self.context, username_filter=self.username_filter)
+
+
+if __name__ == "__main__":
+    unittest.main()
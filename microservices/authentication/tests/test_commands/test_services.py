@@ -9,11 +9,15 @@ from asyncio import (
 )
 from unittest.mock import (
     AsyncMock,
+    patch,
 )
 from uuid import (
     uuid4,
 )
 
+from minos.aggregate import (
+    EventRepositoryConflictException,
+)
 from minos.networks import (
     InMemoryRequest,
     Response,
@@ -57,6 +61,56 @@ class TestCredentialsCommandService(unittest.IsolatedAsyncioTestCase):
         observed = await response.content()
         self.assertEqual({"user": expected.user}, observed)
 
+        context = self.injector.saga_manager.run.call_args.kwargs["context"]
+        self.assertTrue(context["password"].startswith("$scrypt$"))
+        self.assertTrue(await self.service.password_hasher.verify("bar", context["password"]))
+
+    async def test_update_password(self):
+        credentials = await Credentials.create("foo", "bar", active=True, user=uuid4())
+
+        request = InMemoryRequest({"uuid": credentials.uuid, "previous": "bar", "password": "baz"})
+        await self.service.update_password(request)
+
+        self.assertEqual("baz", (await Credentials.get(credentials.uuid)).password)
+
+    async def test_update_password_changed(self):
+        credentials = await Credentials.create("foo", "bar", active=True, user=uuid4())
+
+        request = InMemoryRequest({"uuid": credentials.uuid, "previous": "qux", "password": "baz"})
+        await self.service.update_password(request)
+
+        self.assertEqual(credentials, await Credentials.get(credentials.uuid))
+
+    async def test_update_password_missing(self):
+        request = InMemoryRequest({"uuid": uuid4(), "previous": "bar", "password": "baz"})
+        await self.service.update_password(request)
+
+    async def test_update_password_conflict(self):
+        credentials = await Credentials.create("foo", "bar", active=True, user=uuid4())
+        save = Credentials.save
+        calls = list()
+
+        async def _save(aggregate: Credentials):
+            calls.append(aggregate)
+            if len(calls) == 1:
+                raise EventRepositoryConflictException("", 0)
+            await save(aggregate)
+
+        request = InMemoryRequest({"uuid": credentials.uuid, "previous": "bar", "password": "baz"})
+        with patch.object(Credentials, "save", _save):
+            await self.service.update_password(request)
+
+        self.assertEqual(2, len(calls))
+        self.assertEqual("baz", (await Credentials.get(credentials.uuid)).password)
+
+    async def test_update_password_conflict_raises(self):
+        credentials = await Credentials.create("foo", "bar", active=True, user=uuid4())
+
+        request = InMemoryRequest({"uuid": credentials.uuid, "previous": "bar", "password": "baz"})
+        with patch.object(Credentials, "save", side_effect=EventRepositoryConflictException("", 0)):
+            with self.assertRaises(ResponseException):
+                await self.service.update_password(request)
+
     @unittest.skip
     async def test_create_credentials_raises_duplicated_username(self):
         await Credentials.create("foo", "bar", True, uuid4())
@@ -0,0 +1,86 @@
+import unittest
+from unittest.mock import (
+    MagicMock,
+)
+
+from src import (
+    BloomFilter,
+    UsernameFilter,
+)
+
+
+class TestBloomFilter(unittest.TestCase):
+    def test_constructor(self):
+        bloom = BloomFilter(1000, 0.01)
+        self.assertEqual(1000, bloom.capacity)
+        self.assertEqual(9586, bloom.size)
+        self.assertEqual(7, bloom.hashes)
+        self.assertEqual(0, bloom.count)
+
+    def test_contains(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f"user-{i}")
+
+        self.assertEqual(1000, bloom.count)
+        self.assertTrue(all(f"user-{i}" in bloom for i in range(1000)))
+
+    def test_error_rate(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f"user-{i}")
+
+        positives = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(positives / 10000, 0.03)
+
+
+class TestUsernameFilter(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.usernames = ["foo", "bar"]
+        self.repository = MagicMock()
+        self.repository.stream_usernames.side_effect = self._stream_usernames
+
+    async def _stream_usernames(self):
+        for username in self.usernames:
+            yield username
+
+    async def test_not_ready(self):
+        username_filter = UsernameFilter(self.repository)
+        self.assertTrue(username_filter.may_exist("baz"))
+        self.assertEqual({"ready": False, "usernames": 0, "negatives": 0, "positives": 1}, username_filter.stats)
+
+    async def test_setup(self):
+        async with UsernameFilter(self.repository) as username_filter:
+            self.assertTrue(username_filter.may_exist("foo"))
+            self.assertTrue(username_filter.may_exist("bar"))
+            self.assertFalse(username_filter.may_exist("baz"))
+
+            self.assertEqual({"ready": True, "usernames": 2, "negatives": 1, "positives": 2}, username_filter.stats)
+
+    async def test_add(self):
+        async with UsernameFilter(self.repository) as username_filter:
+            username_filter.add("baz")
+            self.assertTrue(username_filter.may_exist("baz"))
+
+    async def test_add_while_rebuilding(self):
+        username_filter = UsernameFilter(self.repository)
+
+        async def _stream_usernames():
+            yield "foo"
+            username_filter.add("baz")
+            yield "bar"
+
+        self.repository.stream_usernames.side_effect = _stream_usernames
+        await username_filter.rebuild()
+
+        self.assertTrue(username_filter.may_exist("baz"))
+
+    async def test_capacity(self):
+        self.usernames = [f"user-{i}" for i in range(100)]
+        async with UsernameFilter(self.repository, capacity=10) as username_filter:
+            self.assertTrue(all(username_filter.may_exist(username) for username in self.usernames))
+            self.assertEqual(100, username_filter.stats["usernames"])
+
+
+if __name__ == "__main__":
+    unittest.main()
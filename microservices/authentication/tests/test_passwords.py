@@ -0,0 +1,64 @@
+import unittest
+from asyncio import (
+    gather,
+)
+
+from src import (
+    PasswordHasher,
+)
+
+
+class TestPasswordHasher(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.hasher = PasswordHasher(n=2 ** 10, workers=2)
+
+    async def asyncTearDown(self) -> None:
+        await self.hasher.destroy()
+
+    async def test_hash(self):
+        observed = await self.hasher.hash("bar")
+
+        self.assertTrue(observed.startswith("$scrypt$ln=10,r=8,p=1$"))
+        self.assertNotIn("bar", observed)
+        self.assertNotEqual(observed, await self.hasher.hash("bar"))
+
+    async def test_verify(self):
+        encoded = await self.hasher.hash("bar")
+
+        self.assertTrue(await self.hasher.verify("bar", encoded))
+        self.assertFalse(await self.hasher.verify("foo", encoded))
+
+    async def test_verify_other_parameters(self):
+        encoded = await PasswordHasher(n=2 ** 11, r=4).hash("bar")
+
+        self.assertTrue(await self.hasher.verify("bar", encoded))
+        self.assertTrue(self.hasher.needs_rehash(encoded))
+        self.assertFalse(self.hasher.needs_rehash(await self.hasher.hash("bar")))
+
+    async def test_verify_plain_text(self):
+        self.assertTrue(await self.hasher.verify("bar", "bar"))
+        self.assertFalse(await self.hasher.verify("foo", "bar"))
+
+    async def test_verify_dummy(self):
+        self.assertFalse(await self.hasher.verify_dummy("bar"))
+        self.assertEqual(1, self.hasher.stats["hashes"])
+
+    async def test_verify_invalid_hash(self):
+        self.assertFalse(await self.hasher.verify("bar", "$scrypt$foo"))
+
+    async def test_max_concurrency(self):
+        hasher = PasswordHasher(n=2 ** 10, workers=4, max_concurrency=1)
+
+        await gather(*(hasher.hash("bar") for _ in range(4)))
+
+        observed = hasher.stats
+        self.assertEqual(0, observed["waiting"])
+        self.assertEqual(0, observed["running"])
+        self.assertEqual(3, observed["max_waiting"])
+        self.assertEqual(4, observed["hashes"])
+        self.assertGreater(observed["mean_ms"], 0)
+        await hasher.destroy()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import unittest
+from contextlib import (
+    asynccontextmanager,
+)
+from unittest.mock import (
+    AsyncMock,
+    MagicMock,
+)
+from uuid import (
+    uuid4,
+)
+
+from src import (
+    CredentialsQueryRepository,
+    PostgreSqlQueryRepository,
+)
+from tests.utils import (
+    build_config,
+)
+
+
+class TestCredentialsQueryRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        self.config = build_config()
+
+    def test_subclass(self):
+        self.assertTrue(issubclass(CredentialsQueryRepository, PostgreSqlQueryRepository))
+
+    def test_from_config(self):
+        repository = CredentialsQueryRepository.from_config(self.config)
+
+        self.assertEqual("auth_query_db", repository.database)
+        self.assertEqual(self.config.repository.host, repository.host)
+        self.assertEqual(self.config.repository.port, repository.port)
+        self.assertEqual(5, repository.pool_size)
+        self.assertEqual(10, repository.max_overflow)
+        self.assertEqual(3600, repository.pool_recycle)
+        self.assertEqual(30000, repository.statement_timeout)
+        self.assertEqual(5, repository.cache.ttl)
+        self.assertIsNone(repository.engine)
+
+    def test_from_config_with_kwargs(self):
+        repository = CredentialsQueryRepository.from_config(self.config, pool_size=2, statement_timeout=None)
+
+        self.assertEqual(2, repository.pool_size)
+        self.assertIsNone(repository.statement_timeout)
+
+    def test_from_config_without_cache(self):
+        repository = CredentialsQueryRepository.from_config(self.config, cache_max_size=0)
+
+        self.assertIsNone(repository.cache)
+
+
+class TestCredentialsQueryRepositoryGetByUsername(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.repository = CredentialsQueryRepository.from_config(build_config())
+        self.uuid, self.user = uuid4(), uuid4()
+        self.rows = [{"uuid": self.uuid, "username": "foo", "password": "bar", "active": True, "user": self.user}]
+
+        self.execute = AsyncMock(side_effect=self._execute)
+
+        @asynccontextmanager
+        async def _connection():
+            yield MagicMock(execute=self.execute)
+
+        self.repository.connection = _connection
+
+    async def _execute(self, *args, **kwargs):
+        rows = self.rows
+        return MagicMock(first=AsyncMock(return_value=rows[0] if rows else None), fetchall=AsyncMock(return_value=rows))
+
+    async def test_get_by_username(self):
+        observed = await self.repository.get_by_username("foo")
+
+        self.assertEqual(self.rows[0], observed)
+        self.assertEqual(1, self.execute.call_count)
+
+    async def test_get_by_username_missing(self):
+        self.rows = []
+
+        self.assertIsNone(await self.repository.get_by_username("foo"))
+        self.assertIsNone(await self.repository.get_by_username("foo"))
+        self.assertEqual(2, self.execute.call_count)
+
+    async def test_get_by_username_cached(self):
+        expected = await self.repository.get_by_username("foo")
+        observed = await self.repository.get_by_username("foo")
+
+        self.assertEqual(expected, observed)
+        self.assertEqual(1, self.execute.call_count)
+
+    async def test_get_by_username_created(self):
+        await self.repository.create_credentials(self.uuid, "foo", "bar", True, self.user)
+        observed = await self.repository.get_by_username("foo")
+
+        self.assertEqual(self.rows[0], observed)
+        self.assertEqual(1, self.execute.call_count)
+
+    async def test_get_by_username_deleted(self):
+        await self.repository.get_by_username("foo")
+        await self.repository.delete(self.uuid)
+        self.rows = []
+
+        self.assertIsNone(await self.repository.get_by_username("foo"))
+        self.assertEqual(3, self.execute.call_count)
+
+    async def test_get_by_username_password_updated(self):
+        await self.repository.get_by_username("foo")
+        await self.repository.update_password(self.uuid, "baz")
+        self.rows = [self.rows[0] | {"password": "baz"}]
+
+        self.assertEqual("baz", (await self.repository.get_by_username("foo"))["password"])
+        self.assertEqual(3, self.execute.call_count)
+
+    async def test_get_by_username_not_cached(self):
+        await self.repository.get_by_username("foo")
+        self.rows = [self.rows[0] | {"active": False}]
+
+        self.assertFalse((await self.repository.get_by_username("foo", cached=False))["active"])
+        self.assertFalse((await self.repository.get_by_username("foo"))["active"])
+        self.assertEqual(2, self.execute.call_count)
+
+
+class TestCredentialsQueryRepositoryUpgrade(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.repository = CredentialsQueryRepository.from_config(build_config())
+        await self.repository.setup()
+
+    async def asyncTearDown(self) -> None:
+        await self.repository.destroy()
+
+    async def test_upgrade_password_length(self):
+        async with self.repository.transaction() as connection:
+            await connection.execute("DROP TABLE credentials")
+            await connection.execute(_OLD_CREDENTIALS_TABLE)
+
+        await self.repository.destroy()
+        await self.repository.setup()
+
+        password = "$scrypt$" + "a" * 80
+        await self.repository.create_credentials(uuid4(), "foo", "bar", True, uuid4())
+        await self.repository.update_password((await self.repository.get_by_username("foo"))["uuid"], password)
+
+        async with self.repository.transaction() as connection:
+            result = await connection.execute("SELECT password FROM credentials WHERE username = 'foo'")
+            self.assertEqual(password, await result.scalar())
+
+
+_OLD_CREDENTIALS_TABLE = """
+CREATE TABLE credentials (
+    uuid UUID NOT NULL PRIMARY KEY,
+    username VARCHAR(32) NOT NULL UNIQUE,
+    password VARCHAR(32) NOT NULL,
+    active BOOLEAN,
+    "user" UUID
+)
+""".strip()
+
+
+if __name__ == "__main__":
+    unittest.main()
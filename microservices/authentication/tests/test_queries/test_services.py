@@ -10,6 +10,11 @@ from base64 import (
 from pathlib import (
     Path,
 )
+from unittest.mock import (
+    AsyncMock,
+    MagicMock,
+    call,
+)
 from uuid import (
     UUID,
     uuid4,
@@ -35,6 +40,9 @@ from minos.networks import (
 from src import (
     CredentialsQueryRepository,
     CredentialsQueryService,
+    PasswordHasher,
+    TokenManager,
+    UsernameFilter,
 )
 from tests.utils import (
     FakeLockPool,
@@ -59,6 +67,7 @@ class TestCredentialsQueryService(PostgresAsyncTestCase):
             credentials_repository=CredentialsQueryRepository.from_config(
                 self.config, database=self.config.repository.database
             ),
+            token_manager=TokenManager(ephemeral_keys=True),
         )
         await self.injector.wire(modules=[sys.modules[__name__]])
 
@@ -105,5 +114,135 @@ class TestCredentialsQueryService(PostgresAsyncTestCase):
             await self.service.unique_username(request)
 
 
+class TestCredentialsQueryServiceLogin(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.hasher = PasswordHasher(n=2 ** 10)
+        self.user = uuid4()
+        self.credentials = credentials = {
+            "uuid": uuid4(),
+            "username": "foo",
+            "password": await self.hasher.hash("bar"),
+            "active": True,
+            "user": self.user,
+        }
+        self.repository = AsyncMock(get_by_username=AsyncMock(return_value=credentials))
+        self.broker_publisher = MagicMock(send=AsyncMock())
+        self.service = CredentialsQueryService(
+            repository=self.repository,
+            password_hasher=self.hasher,
+            token_manager=TokenManager(ephemeral_keys=True),
+            broker_publisher=self.broker_publisher,
+        )
+
+    async def asyncTearDown(self) -> None:
+        await self.hasher.destroy()
+
+    def _request(self, username: str, password: str) -> InMemoryRequest:
+        request = InMemoryRequest()
+        credentials = b64encode(f"{username}:{password}".encode()).decode()
+        request.headers = {"Authorization": f"Basic {credentials}"}
+        return request
+
+    async def test_generate_token(self):
+        response = await self.service.generate_token(self._request("foo", "bar"))
+        token = (await response.content())["token"]
+
+        self.assertEqual(str(self.user), jwt.decode(token, options={"verify_signature": False})["sub"])
+        self.assertEqual([call("foo", cached=False)], self.repository.get_by_username.call_args_list)
+
+    async def test_generate_token_wrong_password(self):
+        with self.assertRaises(ResponseException):
+            await self.service.generate_token(self._request("foo", "foo"))
+
+    async def test_generate_token_missing(self):
+        self.repository.get_by_username.return_value = None
+        hashes = self.hasher.stats["hashes"]
+
+        with self.assertRaises(ResponseException):
+            await self.service.generate_token(self._request("foo", "bar"))
+
+        self.assertEqual(hashes + 1, self.hasher.stats["hashes"])
+
+    async def test_generate_token_inactive(self):
+        self.credentials["active"] = False
+        hashes = self.hasher.stats["hashes"]
+
+        with self.assertRaises(ResponseException):
+            await self.service.generate_token(self._request("foo", "bar"))
+
+        self.assertEqual(hashes + 1, self.hasher.stats["hashes"])
+
+    async def test_generate_token_rehash(self):
+        self.credentials["password"] = "bar"
+
+        await self.service.generate_token(self._request("foo", "bar"))
+
+        self.assertEqual(1, self.broker_publisher.send.call_count)
+        message = self.broker_publisher.send.call_args.args[0]
+        self.assertEqual("UpdateCredentialsPassword", message.topic)
+        self.assertEqual(self.credentials["uuid"], message.content["uuid"])
+        self.assertEqual("bar", message.content["previous"])
+        self.assertTrue(await self.hasher.verify("bar", message.content["password"]))
+
+    async def test_generate_token_rehash_fails(self):
+        self.credentials["password"] = "bar"
+        self.broker_publisher.send.side_effect = ValueError()
+
+        response = await self.service.generate_token(self._request("foo", "bar"))
+
+        self.assertIn("token", await response.content())
+
+    async def test_generate_token_without_rehash(self):
+        await self.service.generate_token(self._request("foo", "bar"))
+
+        self.assertEqual(0, self.broker_publisher.send.call_count)
+
+    async def test_credentials_password_updated(self):
+        uuid = uuid4()
+        await self.service.credentials_password_updated(InMemoryRequest(MagicMock(uuid=uuid, password="baz")))
+
+        self.assertEqual([call(uuid, "baz")], self.repository.update_password.call_args_list)
+
+    async def test_credentials_deleted(self):
+        uuid = uuid4()
+        await self.service.credentials_deleted(InMemoryRequest(MagicMock(uuid=uuid)))
+
+        self.assertEqual([call(uuid)], self.repository.delete.call_args_list)
+
+
+class TestCredentialsQueryServiceUsernameFilter(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        async def _stream_usernames():
+            yield "foo"
+
+        self.repository = AsyncMock(get_by_username=AsyncMock(return_value={"username": "foo"}))
+        self.repository.stream_usernames = _stream_usernames
+        self.username_filter = UsernameFilter(self.repository)
+        await self.username_filter.setup()
+        self.service = CredentialsQueryService(
+            repository=self.repository,
+            username_filter=self.username_filter,
+            token_manager=TokenManager(ephemeral_keys=True),
+        )
+
+    async def test_unique_username(self):
+        response = await self.service.unique_username(InMemoryRequest({"username": "bar"}))
+
+        self.assertEqual(True, await response.content())
+        self.assertEqual(0, self.repository.get_by_username.call_count)
+
+    async def test_unique_username_raises(self):
+        with self.assertRaises(ResponseException):
+            await self.service.unique_username(InMemoryRequest({"username": "foo"}))
+
+        self.assertEqual(1, self.repository.get_by_username.call_count)
+
+    async def test_credentials_created(self):
+        diff = MagicMock(uuid=uuid4(), username="bar", password="baz", active=True, user=uuid4())
+        await self.service.credentials_created(InMemoryRequest(diff))
+
+        self.assertTrue(self.username_filter.may_exist("bar"))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,256 @@
+import os
+import time
+import unittest
+from unittest.mock import (
+    ANY,
+    patch,
+)
+from uuid import (
+    uuid4,
+)
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric.ed25519 import (
+    Ed25519PrivateKey,
+)
+from cryptography.hazmat.primitives.serialization import (
+    Encoding,
+    NoEncryption,
+    PrivateFormat,
+    PublicFormat,
+    load_pem_private_key,
+)
+from jwt.exceptions import (
+    ExpiredSignatureError,
+    ImmatureSignatureError,
+    InvalidSignatureError,
+    InvalidTokenError,
+)
+
+from src import (
+    TokenCache,
+    TokenManager,
+)
+from tests.utils import (
+    build_config,
+)
+
+
+class TestTokenCache(unittest.TestCase):
+    def test_get_set(self):
+        cache = TokenCache()
+        cache.set("foo", {"sub": "bar"})
+
+        self.assertEqual({"sub": "bar"}, cache.get("foo"))
+        self.assertEqual(None, cache.get("bar"))
+        self.assertEqual({"size": 1, "hits": 1, "misses": 1, "evictions": 0}, cache.stats)
+
+    def test_digest(self):
+        cache = TokenCache()
+        cache.set("foo", {"sub": "bar"})
+
+        # noinspection PyProtectedMember
+        self.assertEqual([TokenCache.digest("foo")], list(cache._entries))
+
+    def test_expired_claim(self):
+        cache = TokenCache()
+        cache.set("foo", {"sub": "bar", "exp": time.time() + 10})
+
+        with patch("time.time", return_value=time.time() + 11):
+            self.assertEqual(None, cache.get("foo"))
+        self.assertEqual(0, len(cache))
+
+    def test_already_expired_claim(self):
+        cache = TokenCache()
+        cache.set("foo", {"sub": "bar", "exp": time.time() - 1})
+
+        self.assertEqual(0, len(cache))
+
+    def test_leeway(self):
+        cache = TokenCache()
+        cache.set("foo", {"sub": "bar", "exp": time.time() - 1}, leeway=10)
+
+        self.assertEqual({"sub": "bar", "exp": ANY}, cache.get("foo"))
+
+    def test_ttl(self):
+        cache = TokenCache(ttl=10)
+        cache.set("foo", {"sub": "bar", "exp": time.time() + 3600})
+
+        with patch("time.time", return_value=time.time() + 11):
+            self.assertEqual(None, cache.get("foo"))
+
+    def test_max_size(self):
+        cache = TokenCache(max_size=2)
+        cache.set("one", {"sub": "1"})
+        cache.set("two", {"sub": "2"})
+        cache.get("one")
+        cache.set("three", {"sub": "3"})
+
+        self.assertEqual({"sub": "1"}, cache.get("one"))
+        self.assertEqual(None, cache.get("two"))
+        self.assertEqual(1, cache.stats["evictions"])
+
+    def test_disabled(self):
+        cache = TokenCache(max_size=0)
+        cache.set("foo", {"sub": "bar"})
+
+        self.assertEqual(0, len(cache))
+
+
+class TestTokenManager(unittest.TestCase):
+    def setUp(self) -> None:
+        self.manager = TokenManager(algorithm="HS256", secret="secret", expiration=60)
+
+    def test_issue(self):
+        sub = str(uuid4())
+        token = self.manager.issue(sub, "foo")
+        payload = jwt.decode(token, "secret", algorithms=["HS256"])
+
+        self.assertEqual(sub, payload["sub"])
+        self.assertEqual("foo", payload["name"])
+        self.assertEqual(payload["iat"], payload["nbf"])
+        self.assertEqual(payload["iat"] + 60, payload["exp"])
+
+    def test_validate(self):
+        token = self.manager.issue("bar", "foo")
+
+        with patch("jwt.decode", side_effect=jwt.decode) as mock:
+            one = self.manager.validate(token)
+            two = self.manager.validate(token)
+
+        self.assertEqual(one, two)
+        self.assertEqual("bar", one["sub"])
+        self.assertEqual(1, mock.call_count)
+
+    def test_validate_expired(self):
+        token = self.manager.issue("bar", "foo")
+        self.manager.validate(token)
+
+        with patch("time.time", return_value=time.time() + 61):
+            with patch("jwt.decode", side_effect=ExpiredSignatureError()) as mock:
+                with self.assertRaises(ExpiredSignatureError):
+                    self.manager.validate(token)
+
+        self.assertEqual(1, mock.call_count)
+
+    def test_validate_expired_claim(self):
+        token = jwt.encode({"sub": "bar", "exp": int(time.time()) - 1}, "secret", algorithm="HS256")
+
+        with self.assertRaises(ExpiredSignatureError):
+            self.manager.validate(token)
+        self.assertEqual(0, len(self.manager.cache))
+
+    def test_validate_not_before(self):
+        token = jwt.encode({"sub": "bar", "nbf": int(time.time()) + 60}, "secret", algorithm="HS256")
+
+        with self.assertRaises(ImmatureSignatureError):
+            self.manager.validate(token)
+        self.assertEqual(0, len(self.manager.cache))
+
+    def test_validate_invalid_signature(self):
+        token = jwt.encode({"sub": "bar"}, "other", algorithm="HS256")
+
+        with self.assertRaises(InvalidSignatureError):
+            self.manager.validate(token)
+        self.assertEqual(0, len(self.manager.cache))
+
+
+class TestAsymmetricTokenManager(unittest.TestCase):
+    def setUp(self) -> None:
+        self.old = _private_key()
+        self.new = _private_key()
+
+    def test_issue(self):
+        manager = TokenManager(keys=[{"kid": "new", "private_key": self.new}, {"kid": "old", "private_key": self.old}])
+        token = manager.issue("bar", "foo")
+
+        self.assertEqual({"typ": "JWT", "alg": "EdDSA", "kid": "new"}, jwt.get_unverified_header(token))
+        public_key = load_pem_private_key(self.new.encode(), None).public_key()
+        self.assertEqual("bar", jwt.decode(token, public_key, algorithms=["EdDSA"])["sub"])
+
+    def test_rotation(self):
+        old = TokenManager(keys=[{"kid": "old", "private_key": self.old}])
+        token = old.issue("bar", "foo")
+
+        public_key = load_pem_private_key(self.old.encode(), None).public_key()
+        public_pem = public_key.public_bytes(Encoding.PEM, PublicFormat.SubjectPublicKeyInfo).decode()
+        new = TokenManager(keys=[{"kid": "new", "private_key": self.new}, {"kid": "old", "public_key": public_pem}])
+
+        self.assertEqual("bar", new.validate(token)["sub"])
+        self.assertEqual("new", jwt.get_unverified_header(new.issue("bar", "foo"))["kid"])
+        self.assertEqual(["new", "old"], [key["kid"] for key in new.jwks["keys"]])
+
+    def test_validate_unknown_key(self):
+        token = TokenManager(keys=[{"kid": "old", "private_key": self.old}]).issue("bar", "foo")
+        manager = TokenManager(keys=[{"kid": "new", "private_key": self.new}])
+
+        with self.assertRaises(InvalidTokenError):
+            manager.validate(token)
+
+    def test_validate_forged_kid(self):
+        forged = TokenManager(keys=[{"kid": "new", "private_key": self.old}]).issue("bar", "foo")
+        manager = TokenManager(keys=[{"kid": "new", "private_key": self.new}])
+
+        with self.assertRaises(InvalidSignatureError):
+            manager.validate(forged)
+
+    def test_jwks(self):
+        manager = TokenManager(keys=[{"kid": "new", "private_key": self.new}])
+
+        observed = manager.jwks["keys"]
+
+        self.assertEqual(1, len(observed))
+        self.assertEqual(
+            {"kty": "OKP", "crv": "Ed25519", "x": ANY, "alg": "EdDSA", "use": "sig", "kid": "new"}, observed[0]
+        )
+        self.assertNotIn("d", observed[0])
+
+    def test_rs256(self):
+        manager = TokenManager(algorithm="RS256", ephemeral_keys=True)
+        token = manager.issue("bar", "foo")
+
+        self.assertEqual("RS256", jwt.get_unverified_header(token)["alg"])
+        self.assertEqual("bar", manager.validate(token)["sub"])
+        self.assertEqual("RSA", manager.jwks["keys"][0]["kty"])
+
+    def test_ephemeral_thumbprint(self):
+        manager = TokenManager(ephemeral_keys=True)
+        kid = jwt.get_unverified_header(manager.issue("bar", "foo"))["kid"]
+
+        self.assertEqual([kid], [key["kid"] for key in manager.jwks["keys"]])
+
+    def test_without_keys(self):
+        with self.assertRaises(ValueError):
+            TokenManager()
+
+    def test_from_config_environment(self):
+        with patch.dict(os.environ, {"MINOS_TOKENS_PRIVATE_KEY": self.new}):
+            manager = TokenManager.from_config(build_config())
+
+        public_key = load_pem_private_key(self.new.encode(), None).public_key()
+        self.assertEqual("bar", jwt.decode(manager.issue("bar", "foo"), public_key, algorithms=["EdDSA"])["sub"])
+
+    def test_from_config_ephemeral_keys(self):
+        with patch.dict(os.environ, {"MINOS_TOKENS_EPHEMERAL_KEYS": "true"}):
+            manager = TokenManager.from_config(build_config())
+
+        self.assertEqual(1, len(manager.jwks["keys"]))
+
+    def test_from_config_without_keys(self):
+        with self.assertRaises(ValueError):
+            TokenManager.from_config(build_config())
+
+    def test_without_private_key(self):
+        public_key = load_pem_private_key(self.old.encode(), None).public_key()
+        public_pem = public_key.public_bytes(Encoding.PEM, PublicFormat.SubjectPublicKeyInfo).decode()
+
+        with self.assertRaises(ValueError):
+            TokenManager(keys=[{"kid": "old", "public_key": public_pem}])
+
+
+def _private_key() -> str:
+    return Ed25519PrivateKey.generate().private_bytes(Encoding.PEM, PrivateFormat.PKCS8, NoEncryption()).decode()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+
+from aiohttp import (
+    web,
+)
+from aiohttp.test_utils import (
+    TestServer,
+)
+from jwt.exceptions import (
+    InvalidSignatureError,
+    InvalidTokenError,
+)
+
+from src import (
+    TokenManager,
+    TokenVerifier,
+)
+
+
+class TestTokenVerifier(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.manager = TokenManager(ephemeral_keys=True)
+        self.requests = 0
+
+        async def _get_jwks(request: web.Request) -> web.Response:
+            self.requests += 1
+            return web.json_response(self.manager.jwks)
+
+        app = web.Application()
+        app.router.add_get("/.well-known/jwks.json", _get_jwks)
+        self.server = TestServer(app)
+        await self.server.start_server()
+
+        self.verifier = TokenVerifier(str(self.server.make_url("/.well-known/jwks.json")), min_refresh_interval=0)
+
+    async def asyncTearDown(self) -> None:
+        await self.verifier.destroy()
+        await self.server.close()
+
+    async def test_verify(self):
+        await self.verifier.setup()
+        token = self.manager.issue("bar", "foo")
+
+        one = await self.verifier.verify(token)
+        two = await self.verifier.verify(token)
+
+        self.assertEqual("bar", one["sub"])
+        self.assertEqual(one, two)
+        self.assertEqual(1, self.requests)
+
+    async def test_verify_rotated(self):
+        await self.verifier.setup()
+        self.manager = TokenManager(ephemeral_keys=True)
+        token = self.manager.issue("bar", "foo")
+
+        observed = await self.verifier.verify(token)
+
+        self.assertEqual("bar", observed["sub"])
+        self.assertEqual(2, self.requests)
+
+    async def test_verify_unknown_key(self):
+        token = TokenManager(ephemeral_keys=True).issue("bar", "foo")
+
+        with self.assertRaises(InvalidTokenError):
+            await self.verifier.verify(token)
+
+    async def test_verify_invalid_signature(self):
+        await self.verifier.setup()
+        token = self.manager.issue("bar", "foo")
+        header, payload, signature = token.split(".")
+        forged = ".".join([header, TokenManager(ephemeral_keys=True).issue("other", "foo").split(".")[1], signature])
+
+        with self.assertRaises(InvalidSignatureError):
+            await self.verifier.verify(forged)
+
+    async def test_setup_unavailable(self):
+        verifier = TokenVerifier("http://localhost:1/.well-known/jwks.json", timeout=1)
+        await verifier.setup()
+
+        with self.assertRaises(InvalidTokenError):
+            await verifier.verify(self.manager.issue("bar", "foo"))
+        await verifier.destroy()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -26,6 +26,10 @@ from minos.saga import (
     SagaStatus,
 )
 
+from src import (
+    PasswordHasher,
+)
+
 
 class _FakeBroker(MinosSetup):
     """For testing purposes."""
@@ -80,6 +84,7 @@ def build_dependency_injector() -> DependencyInjector:
         transaction_repository=InMemoryTransactionRepository,
         event_repository=InMemoryEventRepository,
         snapshot_repository=InMemorySnapshotRepository,
+        password_hasher=PasswordHasher,
     )
 
 
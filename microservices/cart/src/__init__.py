@@ -9,7 +9,15 @@ from .commands import (
     UPDATE_CART_ITEM,
     CartCommandService,
 )
+from .identifiers import (
+    TimeOrderedEventRepository,
+    TimeOrderedUUIDGenerator,
+    uuid7,
+)
 from .queries import (
+    CartItemPropagator,
     CartQueryRepository,
     CartQueryService,
+    LRUCache,
+    PostgreSqlQueryRepository,
 )
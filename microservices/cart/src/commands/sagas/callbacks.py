@@ -10,7 +10,7 @@ from minos.saga import (
     SagaRequest,
 )
 
-_ReserveProductsQuery = ModelType.build("ValidateProductsQuery", {"quantities": dict[str, int]})
+_ReserveProductsQuery = ModelType.build("ValidateProductsQuery", {"quantities": dict[str, int], "step": str})
 
 
 def _reserve_products(context: SagaContext) -> SagaRequest:
@@ -19,7 +19,7 @@ def _reserve_products(context: SagaContext) -> SagaRequest:
     for product_id in product_uuids:
         quantities[str(product_id)] += context["quantity"]
 
-    return SagaRequest("ReserveProducts", _ReserveProductsQuery(quantities))
+    return SagaRequest("ReserveProducts", _ReserveProductsQuery(quantities, "reserve_products"))
 
 
 def _release_products(context: SagaContext) -> SagaRequest:
@@ -28,4 +28,4 @@ def _release_products(context: SagaContext) -> SagaRequest:
     for product_id in product_uuids:
         quantities[str(product_id)] -= context["quantity"]
 
-    return SagaRequest("ReserveProducts", _ReserveProductsQuery(quantities))
+    return SagaRequest("ReserveProducts", _ReserveProductsQuery(quantities, "release_products"))
@@ -20,7 +20,7 @@ def _reserve_products(context: SagaContext) -> SagaRequest:
     for item in cart.entries:
         quantities[str(item.product)] += item.quantity
 
-    return SagaRequest("ReserveProducts", _ReserveProductsQuery(quantities))
+    return SagaRequest("ReserveProducts", _ReserveProductsQuery(quantities, "reserve_products"))
 
 
 # noinspection PyUnusedLocal
@@ -34,7 +34,7 @@ def _release_products(context: SagaContext) -> SagaRequest:
     for item in cart.entries:
         quantities[str(item.product)] -= item.quantity
 
-    return SagaRequest("ReserveProducts", _ReserveProductsQuery(quantities))
+    return SagaRequest("ReserveProducts", _ReserveProductsQuery(quantities, "release_products"))
 
 
 async def _create_cart(context: SagaContext) -> SagaContext:
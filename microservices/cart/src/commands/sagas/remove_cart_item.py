@@ -16,7 +16,7 @@ from src.aggregates import (
     Cart,
 )
 
-_ReserveProductsQuery = ModelType.build("ValidateProductsQuery", {"quantities": dict[str, int]})
+_ReserveProductsQuery = ModelType.build("ValidateProductsQuery", {"quantities": dict[str, int], "step": str})
 
 
 async def _reserve_products(context: SagaContext) -> SagaRequest:
@@ -27,7 +27,7 @@ async def _reserve_products(context: SagaContext) -> SagaRequest:
     for product_id in product_uuids:
         quantities[str(product_id)] += get_product_quantity(cart, product_id)
 
-    return SagaRequest("ReserveProducts", _ReserveProductsQuery(quantities=quantities))
+    return SagaRequest("ReserveProducts", _ReserveProductsQuery(quantities=quantities, step="reserve_products"))
 
 
 # noinspection PyUnusedLocal
@@ -43,7 +43,7 @@ async def _release_products(context: SagaContext) -> SagaRequest:
     for product_id in product_uuids:
         quantities[str(product_id)] -= get_product_quantity(cart, product_id)
 
-    return SagaRequest("ReserveProducts", _ReserveProductsQuery(quantities=quantities))
+    return SagaRequest("ReserveProducts", _ReserveProductsQuery(quantities=quantities, step="release_products"))
 
 
 async def _remove_cart_item(context: SagaContext) -> SagaContext:
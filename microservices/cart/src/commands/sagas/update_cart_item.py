@@ -16,7 +16,7 @@ from src.aggregates import (
     Cart,
 )
 
-_ReserveProductsQuery = ModelType.build("ValidateProductsQuery", {"quantities": dict[str, int]})
+_ReserveProductsQuery = ModelType.build("ValidateProductsQuery", {"quantities": dict[str, int], "step": str})
 
 
 async def _release_or_reserve_products(context: SagaContext) -> SagaRequest:
@@ -43,7 +43,9 @@ async def _release_or_reserve_products(context: SagaContext) -> SagaRequest:
             else:
                 quantities[str(product_id)] += abs(q)
 
-    return SagaRequest("ReserveProducts", _ReserveProductsQuery(quantities=quantities))
+    return SagaRequest(
+        "ReserveProducts", _ReserveProductsQuery(quantities=quantities, step="release_or_reserve_products")
+    )
 
 
 # noinspection PyUnusedLocal
@@ -75,7 +77,7 @@ async def _compensation(context: SagaContext) -> SagaRequest:
             else:
                 quantities[str(product_id)] -= abs(q)
 
-    return SagaRequest("ReserveProducts", _ReserveProductsQuery(quantities=quantities))
+    return SagaRequest("ReserveProducts", _ReserveProductsQuery(quantities=quantities, step="compensation"))
 
 
 async def _update_cart_item(context: SagaContext) -> SagaContext:
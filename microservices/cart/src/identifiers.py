@@ -0,0 +1,74 @@
+from __future__ import (
+    annotations,
+)
+
+import os
+from threading import (
+    Lock,
+)
+from time import (
+    time_ns,
+)
+from uuid import (
+    UUID,
+)
+
+from minos.aggregate import (
+    EventEntry,
+    PostgreSqlEventRepository,
+)
+from minos.common import (
+    NULL_UUID,
+)
+
+
+class TimeOrderedUUIDGenerator:
+    """Time-Ordered UUID Generator class.
+
+    The identifiers follow the version 7 layout of RFC 9562: the first 48 bits contain the Unix timestamp in
+    milliseconds, the next 12 bits a counter that starts at a random value on each millisecond and the remaining 62
+    bits are random. As a result, the identifiers generated by the same process are strictly increasing, so that the
+    rows identified by them are appended to the right-most pages of the primary key indexes instead of being spread
+    over random pages.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._timestamp = 0
+        self._counter = 0
+
+    def __call__(self) -> UUID:
+        with self._lock:
+            timestamp = time_ns() // 1_000_000
+            if timestamp > self._timestamp:
+                self._timestamp = timestamp
+                self._counter = int.from_bytes(os.urandom(2), "big") & 0x7FF  # Leaves room to increase.
+            elif self._counter < 0xFFF:
+                self._counter += 1
+            else:
+                self._timestamp += 1  # The counter has overflowed, so the next millisecond is borrowed.
+                self._counter = 0
+            timestamp, counter = self._timestamp, self._counter
+
+        random = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+        return UUID(int=(timestamp & ((1 << 48) - 1)) << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | random)
+
+
+uuid7 = TimeOrderedUUIDGenerator()
+
+
+class TimeOrderedEventRepository(PostgreSqlEventRepository):
+    """Time-Ordered Event Repository class.
+
+    The identifiers of the new aggregates are generated with ``uuid7`` instead of the random ones generated by the
+    database, so that the aggregates and the read-model rows identified by them are inserted in creation order. It is
+    enabled by registering it as the ``event_repository`` injection.
+
+    Each microservice is built from its own directory, so this module is kept identical in every microservice that
+    stores aggregates (``make check-shared`` verifies it).
+    """
+
+    async def _submit(self, entry: EventEntry, **kwargs) -> EventEntry:
+        if entry.aggregate_uuid == NULL_UUID:
+            entry.aggregate_uuid = uuid7()
+        return await super()._submit(entry, **kwargs)
@@ -1,3 +1,12 @@
+from .abc import (
+    PostgreSqlQueryRepository,
+)
+from .caches import (
+    LRUCache,
+)
+from .propagators import (
+    CartItemPropagator,
+)
 from .repositories import (
     CartQueryRepository,
 )
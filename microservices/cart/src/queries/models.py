@@ -6,7 +6,9 @@ from minos.common import (
     ModelType,
 )
 from sqlalchemy import (
+    Boolean,
     Column,
+    Index,
     Integer,
     MetaData,
     Numeric,
@@ -36,6 +38,40 @@ CART_ITEM_TABLE = Table(
     Column("description", Text, nullable=False),
     Column("price", Numeric, nullable=False),
     ForeignKeyConstraint(["cart_id"], ["cart.uuid"], name="fk_cart", ondelete="CASCADE",),
+    Index("cart_items_cart_id_idx", "cart_id"),
+)
+CART_ENTRY_TABLE = Table(
+    "cart_entries",
+    META,
+    Column("cart_id", UUID_PG(as_uuid=True), primary_key=True),
+    Column("product_id", UUID_PG(as_uuid=True), primary_key=True),
+    Column("quantity", Integer, nullable=False),
+    ForeignKeyConstraint(["cart_id"], ["cart.uuid"], name="fk_cart_entry", ondelete="CASCADE",),
+)
+PROPAGATED_FIELDS = ("price", "title", "description")
+CART_PRODUCT_TABLE = Table(
+    "cart_products",
+    META,
+    Column("uuid", UUID_PG(as_uuid=True), primary_key=True),
+    Column("price", Numeric, nullable=True),
+    Column("price_version", Integer, nullable=False),
+    Column("title", Text, nullable=True),
+    Column("title_version", Integer, nullable=False),
+    Column("description", Text, nullable=True),
+    Column("description_version", Integer, nullable=False),
+)
+CART_PROPAGATION_TABLE = Table(
+    "cart_item_propagations",
+    META,
+    Column("product_id", UUID_PG(as_uuid=True), primary_key=True),
+    Column("price", Numeric, nullable=True),
+    Column("price_version", Integer, nullable=False),
+    Column("title", Text, nullable=True),
+    Column("title_version", Integer, nullable=False),
+    Column("description", Text, nullable=True),
+    Column("description_version", Integer, nullable=False),
+    Column("pending", Boolean, nullable=False),
+    Column("after", UUID_PG(as_uuid=True), nullable=True),
 )
 CartItemDTO = ModelType.build(
     "CartItemDTO",
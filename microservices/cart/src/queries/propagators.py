@@ -0,0 +1,180 @@
+from __future__ import (
+    annotations,
+)
+
+import logging
+from asyncio import (
+    CancelledError,
+    Task,
+    get_running_loop,
+    sleep,
+)
+from contextvars import (
+    Context,
+)
+from typing import (
+    Any,
+    Optional,
+)
+from uuid import (
+    UUID,
+)
+
+from minos.common import (
+    MinosConfig,
+    MinosConfigException,
+    MinosSetup,
+)
+
+from .repositories import (
+    CartQueryRepository,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CartItemPropagator(MinosSetup):
+    """Cart Item Propagator class.
+
+    The product changes are copied into the related cart items by a background task, in batches of bounded size, so
+    that a change on a popular product does not block the event handler. The changes are stored by the repository
+    before the event is acknowledged, merged by product version, and the progress of each product is stored together
+    with its batches, so that the pending work survives a failure or restart and is resumed on the next setup.
+
+    A failed batch is retried after a delay that doubles on every consecutive failure, up to ``max_retry_delay``
+    seconds, so that the worker outlives a database outage without flooding it.
+    """
+
+    def __init__(
+        self,
+        repository: CartQueryRepository,
+        *args,
+        batch_size: int = 500,
+        interval: float = 0,
+        retry_delay: float = 1,
+        max_retry_delay: float = 60,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.repository = repository
+        self.batch_size = batch_size
+        self.interval = interval
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+        self.propagated_products = 0
+        self.propagated_batches = 0
+        self.propagated_items = 0
+        self.failures = 0
+
+        self._current: Optional[tuple[UUID, int]] = None
+        self._resumed = False
+        self._task: Optional[Task] = None
+
+    @classmethod
+    def _from_config(
+        cls, *args, config: MinosConfig, cart_repository: CartQueryRepository, **kwargs
+    ) -> CartItemPropagator:
+        try:
+            # noinspection PyProtectedMember
+            kwargs = dict(config._get("propagation")) | kwargs
+        except MinosConfigException:
+            pass
+        return cls(cart_repository, *args, **kwargs)
+
+    async def _setup(self) -> None:
+        self._start()
+
+    async def _destroy(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, product_uuid: UUID, version: int, values: dict[str, Any]) -> None:
+        """Store a product change to be propagated into the related cart items.
+
+        :param product_uuid: The product identifier.
+        :param version: The product version.
+        :param values: The changed columns of the cart items.
+        :return: This method does not return anything.
+        """
+        if not values:
+            return
+
+        await self.repository.submit_propagation(product_uuid, version, values)
+        self._start()
+
+    def _start(self) -> None:
+        if self._task is None or self._task.done():
+            # The worker runs on an empty context, so that it is not bound to the unit of work of any submitter.
+            self._task = Context().run(get_running_loop().create_task, self._run())
+        else:
+            self._resumed = True
+
+    async def get_stats(self) -> dict[str, Any]:
+        """Get the propagation counters.
+
+        :return: A dictionary containing the number of pending products, the progress of the current one and the
+            number of propagated products, batches and cart items.
+        """
+        current = None
+        if self._current is not None:
+            current = {"product": str(self._current[0]), "items": self._current[1]}
+
+        return {
+            "pending": await self.repository.count_pending_propagations(),
+            "current": current,
+            "products": self.propagated_products,
+            "batches": self.propagated_batches,
+            "items": self.propagated_items,
+            "failures": self.failures,
+        }
+
+    async def _run(self) -> None:
+        self._resumed = False
+        delay = self.retry_delay
+        try:
+            while True:
+                try:
+                    propagated = await self.repository.propagate_batch(self.batch_size)
+                except CancelledError:
+                    raise
+                except Exception as exc:
+                    # The pending changes are kept, so the failed batch is retried after the delay.
+                    self.failures += 1
+                    logger.warning(f"The product changes could not be propagated, retrying in {delay}s: {exc!r}")
+                    await sleep(delay)
+                    delay = min(delay * 2, self.max_retry_delay)
+                    continue
+
+                delay = self.retry_delay
+
+                if propagated is None:
+                    # A change submitted while the last batch was running may have been skipped by it.
+                    if not self._resumed:
+                        return
+                    self._resumed = False
+                    continue
+
+                self._on_batch(*propagated)
+                await sleep(self.interval)
+        finally:
+            self._current = None
+
+    def _on_batch(self, product_uuid: UUID, cart_uuids: list[UUID]) -> None:
+        items = len(cart_uuids)
+        if self._current is not None and self._current[0] == product_uuid:
+            items += self._current[1]
+        self._current = (product_uuid, items)
+
+        self.propagated_batches += 1
+        self.propagated_items += len(cart_uuids)
+
+        if len(cart_uuids) < self.batch_size:
+            self._current = None
+            self.propagated_products += 1
+            logger.debug(f"The changes of the {product_uuid!s} product have been propagated into {items} cart items.")
@@ -2,6 +2,10 @@ from __future__ import (
     annotations,
 )
 
+from typing import (
+    Any,
+    Optional,
+)
 from uuid import (
     UUID,
 )
@@ -11,39 +15,91 @@ from minos.aggregate import (
 )
 from minos.common import (
     MinosConfig,
-    MinosSetup,
+    MinosConfigException,
 )
 from sqlalchemy import (
+    Table,
     and_,
-    create_engine,
+    case,
+    func,
+    or_,
+    select,
 )
-from sqlalchemy.orm import (
-    sessionmaker,
+from sqlalchemy.dialects.postgresql import (
+    Insert,
+    insert,
 )
 
+from .abc import (
+    PostgreSqlQueryRepository,
+)
+from .caches import (
+    LRUCache,
+)
 from .models import (
+    CART_ENTRY_TABLE,
     CART_ITEM_TABLE,
+    CART_PRODUCT_TABLE,
+    CART_PROPAGATION_TABLE,
     CART_TABLE,
     META,
+    PROPAGATED_FIELDS,
     CartDTO,
     CartItemDTO,
 )
 
 
-class CartQueryRepository(MinosSetup):
-    """Cart inventory repository"""
+class CartQueryRepository(PostgreSqlQueryRepository):
+    """Cart inventory repository
+
+    The cart snapshots are read through an in-process cache, which is invalidated by the operations performed from the
+    cart event handlers. The cache is disabled if its maximum size is zero.
 
-    def __init__(self, *args, **kwargs):
+    The product details can be projected in two ways. In the ``copy`` mode they are copied into each cart item, so
+    that every product change must be propagated into all the carts containing the product. In the ``lazy`` mode the
+    cart items only store the product identifier and quantity, and the details are joined at read time from a product
+    table that is updated once per product change. In that mode, the cached snapshots only hold the cart items, and the
+    product details are cached apart.
+    """
+
+    metadata = META
+
+    def __init__(
+        self, *args, product_join: str = "copy", cache_max_size: int = 1024, cache_ttl: Optional[float] = 5, **kwargs,
+    ):
         super().__init__(*args, **kwargs)
-        self.engine = create_engine("postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}".format(**kwargs))
-        self.session = sessionmaker(bind=self.engine)()
+        if product_join not in PRODUCT_JOINS:
+            raise ValueError(f"The product join must be one of {PRODUCT_JOINS!r}. Obtained: {product_join!r}")
+        self.product_join = product_join
+
+        self.cache = LRUCache(cache_max_size, cache_ttl) if cache_max_size > 0 else None
+        self.product_cache = LRUCache(cache_max_size, cache_ttl) if cache_max_size > 0 else None
 
-    async def _setup(self) -> None:
-        META.create_all(self.engine)
+    @property
+    def is_lazy(self) -> bool:
+        """Check if the product details are joined at read time.
+
+        :return: ``True`` if the product join mode is ``lazy`` or ``False`` otherwise.
+        """
+        return self.product_join == "lazy"
 
     @classmethod
     def _from_config(cls, *args, config: MinosConfig, **kwargs) -> CartQueryRepository:
-        return cls(*args, **(config.repository._asdict() | {"database": "cart_query_db"}) | kwargs)
+        return cls(
+            *args,
+            **(config.repository._asdict() | {"database": "cart_query_db"})
+            | cls._pool_config(config)
+            | cls._cache_config(config)
+            | kwargs,
+        )
+
+    @staticmethod
+    def _cache_config(config: MinosConfig) -> dict[str, Any]:
+        try:
+            # noinspection PyProtectedMember
+            return {f"cache_{k}": v for k, v in config._get("query_cache").items()}
+        except MinosConfigException:
+            return dict()
 
     async def create_cart(self, uuid: UUID, version: int, user_id: int) -> None:
         """Insert Payment amount
@@ -53,40 +109,147 @@ class CartQueryRepository(MinosSetup):
         :return: Nothing
         """
         query = CART_TABLE.insert().values(uuid=uuid, version=version, user_id=user_id)
-        self.engine.execute(query)
+        async with self.connection() as connection:
+            await connection.execute(query)
+
+        self._invalidate(uuid)
 
     async def get_cart_items(self, cart_id):
-        """Insert Payment amount
+        """Get a cart together with its items.
+
+        The cart and its items are fetched with a single statement, and the resulting snapshot is cached until the
+        cart or any of its items changes.
+
         :param cart_id: UUID
-        :return: Nothing
+        :return: A ``CartDTO`` instance or a dictionary containing the error.
         """
-        result = {}
+        if not isinstance(cart_id, UUID):
+            try:
+                cart_id = UUID(cart_id)
+            except ValueError:
+                return {"error": "Invalid Cart UUID"}
 
-        try:
-            # Get Cart information
-            cart_query = self.session.query(CART_TABLE).filter(CART_TABLE.columns.uuid == cart_id).one()
-        except Exception:
-            return {"error": "Invalid Cart UUID"}
+        if self.is_lazy:
+            return await self._get_cart_items_lazy(cart_id)
 
-        try:
-            # Get Cart Item information
-            cart_items_query = CART_ITEM_TABLE.select().where(CART_ITEM_TABLE.columns.cart_id == cart_id)
-            cart_item_results = self.engine.execute(cart_items_query)
-        except Exception:
-            return {"error": "An error occurred while obtaining Cart Items."}
+        if self.cache is not None and (cart := self.cache.get(cart_id)) is not None:
+            return cart
+
+        version = self.cache.version() if self.cache is not None else None
+        query = (
+            select([CART_TABLE.columns.uuid, CART_TABLE.columns.version, *CART_ITEM_TABLE.columns])
+            .select_from(CART_TABLE.outerjoin(CART_ITEM_TABLE))
+            .where(CART_TABLE.columns.uuid == cart_id)
+        )
+
+        async with self.connection() as connection:
+            try:
+                rows = await (await connection.execute(query)).fetchall()
+            except Exception:
+                rows = list()
+
+        if not rows:
+            return {"error": "Invalid Cart UUID"}
 
         try:
-            # Format CartItems to DTO
-            cart_items = [CartItemDTO(**row) for row in cart_item_results]
+            # Format CartItems to DTO, skipping the empty item of a cart without items
+            cart_items = [
+                CartItemDTO(**{column.name: row[column.name] for column in CART_ITEM_TABLE.columns})
+                for row in rows
+                if row["product_id"] is not None
+            ]
 
             # Format Cart DTO with Cart and CartItems attributes
-            result = CartDTO(**cart_query, products=cart_items)
+            result = CartDTO(uuid=rows[0]["uuid"], version=rows[0]["version"], products=cart_items)
         except Exception:
-            result = {"error": "An error occurred when formatting result."}
+            return {"error": "An error occurred when formatting result."}
+
+        if self.cache is not None:
+            self.cache.set(cart_id, result, version=version)
 
         return result
 
-    async def insert_cart_item(self, cart_uuid, item_uuid, quantity, item_title, item_description, item_price):
+    async def _get_cart_items_lazy(self, cart_id: UUID):
+        if self.cache is not None:
+            version, product_version = self.cache.version(), self.product_cache.version()
+        else:
+            version = product_version = None
+
+        snapshot = self.cache.get(cart_id) if self.cache is not None else None
+        if snapshot is None:
+            query = (
+                select(
+                    [
+                        CART_TABLE.columns.uuid.label("cart_id"),
+                        CART_TABLE.columns.version.label("cart_version"),
+                        CART_ENTRY_TABLE.columns.product_id,
+                        CART_ENTRY_TABLE.columns.quantity,
+                        *CART_PRODUCT_TABLE.columns,
+                    ]
+                )
+                .select_from(
+                    CART_TABLE.outerjoin(CART_ENTRY_TABLE).outerjoin(
+                        CART_PRODUCT_TABLE, CART_PRODUCT_TABLE.columns.uuid == CART_ENTRY_TABLE.columns.product_id
+                    )
+                )
+                .where(CART_TABLE.columns.uuid == cart_id)
+            )
+            async with self.connection() as connection:
+                try:
+                    rows = await (await connection.execute(query)).fetchall()
+                except Exception:
+                    rows = list()
+
+            if not rows:
+                return {"error": "Invalid Cart UUID"}
+
+            entries = [(row["product_id"], row["quantity"]) for row in rows if row["product_id"] is not None]
+            snapshot = (rows[0]["cart_version"], entries)
+            products = {row["uuid"]: dict(row) for row in rows if row["uuid"] is not None}
+
+            if self.cache is not None:
+                self.cache.set(cart_id, snapshot, version=version)
+                for product_uuid, product in products.items():
+                    self.product_cache.set(product_uuid, product, version=product_version)
+        else:
+            products = await self._get_products({product_uuid for product_uuid, _ in snapshot[1]}, product_version)
+
+        try:
+            cart_items = [
+                CartItemDTO(
+                    product_id=product_uuid,
+                    cart_id=cart_id,
+                    quantity=quantity,
+                    title=products[product_uuid]["title"],
+                    description=products[product_uuid]["description"],
+                    price=products[product_uuid]["price"],
+                )
+                for product_uuid, quantity in snapshot[1]
+            ]
+            return CartDTO(uuid=cart_id, version=snapshot[0], products=cart_items)
+        except Exception:
+            return {"error": "An error occurred when formatting result."}
+
+    async def _get_products(self, uuids: set[UUID], version: int) -> dict[UUID, dict[str, Any]]:
+        products = dict()
+        for product_uuid in uuids:
+            if (product := self.product_cache.get(product_uuid)) is not None:
+                products[product_uuid] = product
+
+        if missing := uuids - products.keys():
+            query = CART_PRODUCT_TABLE.select().where(CART_PRODUCT_TABLE.columns.uuid.in_(missing))
+            async with self.connection() as connection:
+                rows = await (await connection.execute(query)).fetchall()
+
+            for row in rows:
+                products[row["uuid"]] = dict(row)
+                self.product_cache.set(row["uuid"], products[row["uuid"]], version=version)
+
+        return products
+
+    async def insert_cart_item(
+        self, cart_uuid, item_uuid, quantity, item_title, item_description, item_price, item_version: int = 0
+    ):
         """Insert or Update Cart Item
         :param cart_uuid: UUID
         :param item_uuid: Customer ID
@@ -94,23 +257,35 @@ class CartQueryRepository(MinosSetup):
         :param item_title: Customer ID
         :param item_description: Customer ID
         :param item_price: Customer ID
+        :param item_version: The product version of the item details.
         :return: Nothing
         """
-        try:
-            # Insert new Cart Item Record
-            query = CART_ITEM_TABLE.insert().values(
-                product_id=item_uuid,
-                cart_id=cart_uuid,
-                quantity=quantity,
-                price=item_price,
-                title=item_title,
-                description=item_description,
-            )
-            self.engine.execute(query)
-        except Exception:
-            return {"error": "Error inserting Cart Item."}
+        if self.is_lazy:
+            values = {"title": item_title, "description": item_description, "price": item_price}
+            await self._upsert_cart_entry(cart_uuid, item_uuid, quantity, item_version, values)
+            return
+
+        # Insert new Cart Item Record. A replayed event updates the existing one instead of failing the unit of work.
+        query = insert(CART_ITEM_TABLE).values(
+            product_id=item_uuid,
+            cart_id=cart_uuid,
+            quantity=quantity,
+            price=item_price,
+            title=item_title,
+            description=item_description,
+        )
+        query = query.on_conflict_do_update(
+            index_elements=[CART_ITEM_TABLE.columns.product_id, CART_ITEM_TABLE.columns.cart_id],
+            set_={"quantity": query.excluded.quantity},
+        )
+        async with self.connection() as connection:
+            await connection.execute(query)
+
+        self._invalidate(cart_uuid)
 
-    async def update_cart_item(self, cart_uuid, item_uuid, quantity, item_title, item_description, item_price):
+    async def update_cart_item(
+        self, cart_uuid, item_uuid, quantity, item_title, item_description, item_price, item_version: int = 0
+    ):
         """Insert or Update Cart Item
         :param cart_uuid: UUID
         :param item_uuid: Customer ID
@@ -118,19 +293,59 @@ class CartQueryRepository(MinosSetup):
         :param item_title: Customer ID
         :param item_description: Customer ID
         :param item_price: Customer ID
+        :param item_version: The product version of the item details.
         :return: Nothing
         """
-        try:
-            cart_item_update_query = (
-                CART_ITEM_TABLE.update()
-                .values(quantity=quantity, price=item_price, title=item_title, description=item_description,)
-                .where(
-                    and_(CART_ITEM_TABLE.columns.product_id == item_uuid, CART_ITEM_TABLE.columns.cart_id == cart_uuid,)
-                )
-            )
-            self.engine.execute(cart_item_update_query)
-        except Exception:
-            return {"error": "Error updating Cart Item."}
+        if self.is_lazy:
+            values = {"title": item_title, "description": item_description, "price": item_price}
+            await self._upsert_cart_entry(cart_uuid, item_uuid, quantity, item_version, values)
+            return
+
+        cart_item_update_query = (
+            CART_ITEM_TABLE.update()
+            .values(quantity=quantity, price=item_price, title=item_title, description=item_description,)
+            .where(and_(CART_ITEM_TABLE.columns.product_id == item_uuid, CART_ITEM_TABLE.columns.cart_id == cart_uuid,))
+        )
+        async with self.connection() as connection:
+            await connection.execute(cart_item_update_query)
+
+        self._invalidate(cart_uuid)
+
+    async def _upsert_cart_entry(
+        self, cart_uuid: UUID, item_uuid: UUID, quantity: int, item_version: int, values: dict[str, Any]
+    ) -> None:
+        entry_query = insert(CART_ENTRY_TABLE).values(cart_id=cart_uuid, product_id=item_uuid, quantity=quantity)
+        entry_query = entry_query.on_conflict_do_update(
+            index_elements=[CART_ENTRY_TABLE.columns.cart_id, CART_ENTRY_TABLE.columns.product_id],
+            set_={"quantity": entry_query.excluded.quantity},
+        )
+        # The product details of the entry only override the stored ones that are older than the entry snapshot.
+        product_query = self._merge_by_version(CART_PRODUCT_TABLE, {"uuid": item_uuid}, item_version, values)
+        async with self.transaction() as connection:
+            await connection.execute(product_query)
+            await connection.execute(entry_query)
+
+        self._invalidate(cart_uuid)
+        self._invalidate_product(item_uuid)
+
+    async def update_product(self, uuid: UUID, version: int, **kwargs) -> None:
+        """Update the details of a product joined by the carts in the ``lazy`` mode.
+
+        The product is inserted if it is unknown yet, so that a change received before the first cart entry of the
+        product is not lost.
+
+        :param uuid: The product identifier.
+        :param version: The product version. The fields changed by a newer version are not updated.
+        :param kwargs: The product columns to be updated.
+        :return: This method does not return anything.
+        """
+        kwargs = {k: v if not isinstance(v, FieldDiff) else v.value for k, v in kwargs.items()}
+
+        query = self._merge_by_version(CART_PRODUCT_TABLE, {"uuid": uuid}, version, kwargs)
+        async with self.connection() as connection:
+            await connection.execute(query)
+
+        self._invalidate_product(uuid)
 
     async def update_cart_items(self, uuid: UUID, **kwargs) -> None:
         """Update an existing row.
@@ -141,8 +356,140 @@ class CartQueryRepository(MinosSetup):
         """
         kwargs = {k: v if not isinstance(v, FieldDiff) else v.value for k, v in kwargs.items()}
 
-        query = CART_ITEM_TABLE.update().where(CART_ITEM_TABLE.columns.product_id == uuid).values(**kwargs)
-        self.engine.execute(query)
+        query = (
+            CART_ITEM_TABLE.update()
+            .where(CART_ITEM_TABLE.columns.product_id == uuid)
+            .values(**kwargs)
+            .returning(CART_ITEM_TABLE.columns.cart_id)
+        )
+        async with self.connection() as connection:
+            result = await connection.execute(query)
+            cart_uuids = [row["cart_id"] async for row in result]
+
+        for cart_uuid in cart_uuids:
+            self._invalidate(cart_uuid)
+
+    async def update_cart_items_batch(
+        self, product_uuid: UUID, values: dict[str, Any], after: Optional[UUID] = None, limit: int = 500
+    ) -> list[UUID]:
+        """Update a bounded batch of the cart items related with a product.
+
+        The cart items are visited in cart order through the ``(product_id, cart_id)`` primary key, so that each batch
+        is a short transaction that starts where the previous one finished.
+
+        :param product_uuid: The product identifier.
+        :param values: The product columns to be updated.
+        :param after: The last cart identifier updated by the previous batch, or ``None`` to start from the first one.
+        :param limit: The maximum number of cart items to be updated.
+        :return: The sorted list of updated cart identifiers. It is shorter than ``limit`` on the last batch.
+        """
+        columns = CART_ITEM_TABLE.columns
+        batch = select([columns.cart_id]).where(columns.product_id == product_uuid)
+        if after is not None:
+            batch = batch.where(columns.cart_id > after)
+        batch = batch.order_by(columns.cart_id).limit(limit)
+
+        query = (
+            CART_ITEM_TABLE.update()
+            .where(columns.product_id == product_uuid)
+            .where(columns.cart_id.in_(batch.scalar_subquery()))
+            .values(**values)
+            .returning(columns.cart_id)
+        )
+        async with self.transaction() as connection:
+            result = await connection.execute(query)
+            cart_uuids = sorted([row["cart_id"] async for row in result])
+
+        for cart_uuid in cart_uuids:
+            self._invalidate(cart_uuid)
+
+        return cart_uuids
+
+    async def submit_propagation(self, product_uuid: UUID, version: int, values: dict[str, Any]) -> None:
+        """Store a product change to be propagated into the related cart items.
+
+        The pending changes of the same product are merged field by field, keeping the value of the newest product
+        version, so that a replayed or reordered event never overrides a newer value. The propagation of the product
+        is restarted with the merged values.
+
+        :param product_uuid: The product identifier.
+        :param version: The product version.
+        :param values: The changed columns of the cart items.
+        :return: This method does not return anything.
+        """
+        query = self._merge_by_version(
+            CART_PROPAGATION_TABLE, {"product_id": product_uuid}, version, values, pending=True, after=None
+        )
+        async with self.connection() as connection:
+            await connection.execute(query)
+
+    async def propagate_batch(self, limit: int = 500) -> Optional[tuple[UUID, list[UUID]]]:
+        """Propagate the next batch of a pending product change into the related cart items.
+
+        The pending change is locked while the batch is applied, and its progress is stored in the same transaction,
+        so that the propagation resumes where it stopped after a failure and concurrent workers skip it.
+
+        :param limit: The maximum number of cart items to be updated.
+        :return: A tuple containing the product identifier and the sorted list of updated cart identifiers, which is
+            shorter than ``limit`` on the last batch, or ``None`` if there are no pending changes.
+        """
+        columns = CART_PROPAGATION_TABLE.columns
+        query = (
+            CART_PROPAGATION_TABLE.select()
+            .where(columns.pending)
+            .order_by(columns.product_id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+
+        async with self.unit_of_work() as connection:
+            row = await (await connection.execute(query)).first()
+            if row is None:
+                return None
+
+            product_uuid = row["product_id"]
+            values = {name: row[name] for name in PROPAGATED_FIELDS if row[f"{name}_version"] >= 0}
+            cart_uuids = await self.update_cart_items_batch(product_uuid, values, row["after"], limit)
+
+            if len(cart_uuids) < limit:
+                progress = {"pending": False, "after": None}
+            else:
+                progress = {"after": cart_uuids[-1]}
+            await connection.execute(
+                CART_PROPAGATION_TABLE.update().where(columns.product_id == product_uuid).values(**progress)
+            )
+
+        return product_uuid, cart_uuids
+
+    async def count_pending_propagations(self) -> int:
+        """Count the product changes that have not been propagated yet.
+
+        :return: The number of products with pending changes.
+        """
+        query = select([func.count()]).select_from(CART_PROPAGATION_TABLE).where(CART_PROPAGATION_TABLE.columns.pending)
+        async with self.connection() as connection:
+            return await connection.scalar(query)
+
+    @staticmethod
+    def _merge_by_version(table: Table, key: dict[str, Any], version: int, values: dict[str, Any], **extra) -> Insert:
+        # Each propagated field is stored together with the product version that set it, so that the values of
+        # different versions are merged field by field and a replayed or reordered change never overrides a newer one.
+        row = key | extra
+        for name in PROPAGATED_FIELDS:
+            row[name] = values.get(name)
+            row[f"{name}_version"] = version if name in values else -1
+
+        query = insert(table).values(**row)
+        newer = {
+            name: query.excluded[f"{name}_version"] > table.columns[f"{name}_version"] for name in PROPAGATED_FIELDS
+        }
+
+        set_ = dict(extra)
+        for name in PROPAGATED_FIELDS:
+            set_[name] = case((newer[name], query.excluded[name]), else_=table.columns[name])
+            set_[f"{name}_version"] = func.greatest(table.columns[f"{name}_version"], query.excluded[f"{name}_version"])
+
+        return query.on_conflict_do_update(index_elements=list(key), set_=set_, where=or_(*newer.values()))
 
     async def delete_cart(self, cart_uuid: UUID) -> None:
         """Delete Payment
@@ -150,7 +497,10 @@ class CartQueryRepository(MinosSetup):
         :return: Nothing
         """
         cart_delete_query = CART_TABLE.delete().where(CART_TABLE.columns.uuid == cart_uuid)
-        self.engine.execute(cart_delete_query)
+        async with self.connection() as connection:
+            await connection.execute(cart_delete_query)
+
+        self._invalidate(cart_uuid)
 
     async def delete_cart_item(self, cart_uuid: UUID, product_uuid: UUID) -> None:
         """Delete Payment
@@ -158,7 +508,33 @@ class CartQueryRepository(MinosSetup):
         :param product_uuid: Item UUID
         :return: Nothing
         """
-        delete_cart_item_query = CART_ITEM_TABLE.delete().where(
-            and_(CART_ITEM_TABLE.columns.product_id == product_uuid, CART_ITEM_TABLE.columns.cart_id == cart_uuid)
+        table = CART_ENTRY_TABLE if self.is_lazy else CART_ITEM_TABLE
+        delete_cart_item_query = table.delete().where(
+            and_(table.columns.product_id == product_uuid, table.columns.cart_id == cart_uuid)
         )
-        self.engine.execute(delete_cart_item_query)
+        async with self.connection() as connection:
+            await connection.execute(delete_cart_item_query)
+
+        self._invalidate(cart_uuid)
+
+    def _invalidate(self, cart_uuid: UUID) -> None:
+        if self.cache is None:
+            return
+
+        def _fn() -> None:
+            # The reads started before this change obtained an older cache version, so their results are not cached.
+            self.cache.discard(cart_uuid)
+
+        self._after_commit(_fn)
+
+    def _invalidate_product(self, product_uuid: UUID) -> None:
+        if self.product_cache is None:
+            return
+
+        def _fn() -> None:
+            self.product_cache.discard(product_uuid)
+
+        self._after_commit(_fn)
+
+
+PRODUCT_JOINS = ("copy", "lazy")
@@ -1,9 +1,17 @@
+from typing import (
+    Optional,
+)
+
 from dependency_injector.wiring import (
     Provide,
+    inject,
 )
 from minos.aggregate import (
     AggregateDiff,
 )
+from minos.common import (
+    UUID_REGEX,
+)
 from minos.cqrs import (
     QueryService,
 )
@@ -14,6 +22,12 @@ from minos.networks import (
     enroute,
 )
 
+from .models import (
+    PROPAGATED_FIELDS,
+)
+from .propagators import (
+    CartItemPropagator,
+)
 from .repositories import (
     CartQueryRepository,
 )
@@ -24,7 +38,16 @@ class CartQueryService(QueryService):
 
     repository: CartQueryRepository = Provide["cart_repository"]
 
-    @enroute.rest.query("/carts/{uuid}", "GET")
+    @inject
+    def __init__(
+        self, *args, cart_propagator: Optional[CartItemPropagator] = Provide["cart_propagator"], **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        if isinstance(cart_propagator, Provide):
+            cart_propagator = None
+        self.propagator = cart_propagator
+
+    @enroute.rest.query(f"/carts/{{uuid:{UUID_REGEX.pattern}}}", "GET")
     @enroute.broker.query("GetCartQRS")
     async def get_cart_items(self, request: Request) -> Response:
         """Get cart items.
@@ -69,15 +92,17 @@ class CartQueryService(QueryService):
         """
         diff: AggregateDiff = await request.content()
 
-        for entry in diff["entries"]:
-            await self.repository.insert_cart_item(
-                diff.uuid,
-                entry.product.uuid,
-                entry.quantity,
-                entry.product.title,
-                entry.product.description,
-                entry.product.price,
-            )
+        async with self.repository.unit_of_work():
+            for entry in diff["entries"]:
+                await self.repository.insert_cart_item(
+                    diff.uuid,
+                    entry.product.uuid,
+                    entry.quantity,
+                    entry.product.title,
+                    entry.product.description,
+                    entry.product.price,
+                    entry.product.version,
+                )
 
     @enroute.broker.event("CartUpdated.entries.delete")
     async def cart_item_deleted(self, request: Request) -> None:
@@ -87,8 +112,9 @@ class CartQueryService(QueryService):
         """
         diff: AggregateDiff = await request.content()
 
-        for entry in diff["entries"]:
-            await self.repository.delete_cart_item(diff.uuid, entry.product.uuid)
+        async with self.repository.unit_of_work():
+            for entry in diff["entries"]:
+                await self.repository.delete_cart_item(diff.uuid, entry.product.uuid)
 
     @enroute.broker.event("CartUpdated.entries.update")
     async def cart_item_updated(self, request: Request) -> None:
@@ -98,15 +124,17 @@ class CartQueryService(QueryService):
         """
         diff: AggregateDiff = await request.content()
 
-        for entry in diff["entries"]:
-            await self.repository.update_cart_item(
-                diff.uuid,
-                entry.product.uuid,
-                entry.quantity,
-                entry.product.title,
-                entry.product.description,
-                entry.product.price,
-            )
+        async with self.repository.unit_of_work():
+            for entry in diff["entries"]:
+                await self.repository.update_cart_item(
+                    diff.uuid,
+                    entry.product.uuid,
+                    entry.quantity,
+                    entry.product.title,
+                    entry.product.description,
+                    entry.product.price,
+                    entry.product.version,
+                )
 
     @enroute.broker.event("ProductUpdated.price")
     @enroute.broker.event("ProductUpdated.title")
@@ -117,8 +145,29 @@ class CartQueryService(QueryService):
         :return: This method does not return anything.
         """
         diff: AggregateDiff = await request.content()
-        await self.repository.update_cart_items(uuid=diff.uuid, **diff.fields_diff)
-        print(diff)
+        values = {name: diff.get_one(name, return_diff=False) for name in PROPAGATED_FIELDS if name in diff.fields_diff}
+
+        if not values:
+            return
+
+        if self.repository.is_lazy:
+            await self.repository.update_product(diff.uuid, diff.version, **values)
+        elif self.propagator is not None:
+            await self.propagator.submit(diff.uuid, diff.version, values)
+        else:
+            await self.repository.update_cart_items(uuid=diff.uuid, **values)
+
+    # noinspection PyUnusedLocal
+    @enroute.rest.query("/carts/propagation", "GET")
+    async def get_propagation_stats(self, request: Request) -> Response:
+        """Get the progress of the product changes propagation.
+
+        :param request: A request without any content.
+        :return: A response containing the propagation counters.
+        """
+        if self.propagator is None:
+            return Response(None)
+        return Response(await self.propagator.get_stats())
 
     @enroute.broker.event("CartDeleted")
     async def cart_deleted(self, request: Request) -> None:
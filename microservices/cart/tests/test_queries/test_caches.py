@@ -0,0 +1,91 @@
+import unittest
+from unittest.mock import (
+    patch,
+)
+
+from src import (
+    LRUCache,
+)
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_get_miss(self):
+        cache = LRUCache()
+
+        self.assertIsNone(cache.get("foo"))
+        self.assertEqual({"size": 0, "hits": 0, "misses": 1, "evictions": 0}, cache.stats)
+
+    def test_get_hit(self):
+        cache = LRUCache()
+        cache.set("foo", 56)
+
+        self.assertEqual(56, cache.get("foo"))
+        self.assertEqual({"size": 1, "hits": 1, "misses": 0, "evictions": 0}, cache.stats)
+
+    def test_max_size(self):
+        cache = LRUCache(max_size=2)
+        cache.set("one", 1)
+        cache.set("two", 2)
+        cache.get("one")
+        cache.set("three", 3)
+
+        self.assertIn("one", cache)
+        self.assertNotIn("two", cache)
+        self.assertIn("three", cache)
+        self.assertEqual(1, cache.evictions)
+
+    def test_ttl(self):
+        cache = LRUCache(ttl=10)
+        with patch("src.queries.caches.monotonic", return_value=100):
+            cache.set("foo", 56)
+        with patch("src.queries.caches.monotonic", return_value=105):
+            self.assertEqual(56, cache.get("foo"))
+        with patch("src.queries.caches.monotonic", return_value=111):
+            self.assertIsNone(cache.get("foo"))
+
+        self.assertEqual(1, cache.evictions)
+        self.assertEqual(0, len(cache))
+
+    def test_discard(self):
+        cache = LRUCache()
+        cache.set("foo", 56)
+        cache.discard("foo")
+
+        self.assertNotIn("foo", cache)
+
+    def test_set_stale_version(self):
+        cache = LRUCache()
+        version = cache.version()
+        cache.discard("foo")
+
+        self.assertFalse(cache.set("foo", 56, version=version))
+        self.assertNotIn("foo", cache)
+
+        self.assertTrue(cache.set("foo", 56, version=cache.version()))
+        self.assertIn("foo", cache)
+
+    def test_set_stale_version_forgotten(self):
+        cache = LRUCache(max_size=1)
+        version = cache.version()
+        cache.discard("foo")
+        cache.discard("bar")
+
+        self.assertFalse(cache.set("foo", 56, version=version))
+
+    def test_set_other_key_invalidated(self):
+        cache = LRUCache()
+        version = cache.version()
+        cache.discard("bar")
+
+        self.assertTrue(cache.set("foo", 56, version=version))
+
+    def test_clear(self):
+        cache = LRUCache()
+        cache.set("foo", 56)
+        cache.clear()
+
+        self.assertEqual(0, len(cache))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import unittest
+from asyncio import (
+    Event,
+)
+from unittest.mock import (
+    AsyncMock,
+    MagicMock,
+    call,
+    patch,
+)
+from uuid import (
+    uuid4,
+)
+
+from src import (
+    CartItemPropagator,
+    CartQueryRepository,
+)
+from tests.utils import (
+    build_config,
+)
+
+
+class TestCartItemPropagator(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.carts = sorted(uuid4() for _ in range(5))
+        self.pending = dict()
+        self.updated = dict()
+
+        async def _submit(product_uuid, version, values):
+            self.pending[product_uuid] = [values, None]
+
+        async def _propagate(limit):
+            if not self.pending:
+                return None
+            product_uuid, (values, after) = next(iter(self.pending.items()))
+            carts = [cart for cart in self.carts if after is None or cart > after][:limit]
+            for cart in carts:
+                self.updated[(product_uuid, cart)] = values
+            if len(carts) < limit:
+                del self.pending[product_uuid]
+            else:
+                self.pending[product_uuid][1] = carts[-1]
+            return product_uuid, carts
+
+        self.repository = MagicMock(
+            submit_propagation=AsyncMock(side_effect=_submit),
+            propagate_batch=AsyncMock(side_effect=_propagate),
+            count_pending_propagations=AsyncMock(side_effect=lambda: len(self.pending)),
+        )
+        self.propagator = CartItemPropagator(self.repository, batch_size=2)
+
+    async def asyncTearDown(self) -> None:
+        await self.propagator.destroy()
+
+    def test_from_config(self):
+        repository = CartQueryRepository.from_config(build_config())
+        propagator = CartItemPropagator.from_config(build_config(), cart_repository=repository)
+
+        self.assertEqual(repository, propagator.repository)
+        self.assertEqual(500, propagator.batch_size)
+        self.assertEqual(0, propagator.interval)
+        self.assertEqual(1, propagator.retry_delay)
+        self.assertEqual(60, propagator.max_retry_delay)
+
+    async def test_submit(self):
+        product = uuid4()
+
+        await self.propagator.submit(product, 2, {"price": 3.5})
+        await self.propagator._task
+
+        self.assertEqual([((product, 2, {"price": 3.5}), {})], self.repository.submit_propagation.call_args_list)
+        self.assertEqual({(product, cart): {"price": 3.5} for cart in self.carts}, self.updated)
+        self.assertEqual(
+            {"pending": 0, "current": None, "products": 1, "batches": 3, "items": 5, "failures": 0},
+            await self.propagator.get_stats(),
+        )
+
+    async def test_submit_while_propagating(self):
+        first, second = uuid4(), uuid4()
+        self.carts = self.carts[:1]
+        started, release = Event(), Event()
+        propagate = self.repository.propagate_batch.side_effect
+
+        async def _blocking(limit):
+            if self.pending or started.is_set():
+                return await propagate(limit)
+            started.set()
+            await release.wait()
+            # The worker did not see the change submitted meanwhile.
+            return None
+
+        self.repository.propagate_batch.side_effect = _blocking
+
+        await self.propagator.submit(first, 2, {"title": "foo"})
+        await started.wait()
+        await self.propagator.submit(second, 3, {"price": 4.0})
+        self.assertEqual(1, (await self.propagator.get_stats())["pending"])
+
+        release.set()
+        await self.propagator._task
+
+        self.assertEqual({"price": 4.0}, self.updated[(second, self.carts[0])])
+        self.assertEqual(2, (await self.propagator.get_stats())["products"])
+
+    async def test_submit_empty(self):
+        await self.propagator.submit(uuid4(), 2, {})
+
+        self.assertEqual(0, self.repository.submit_propagation.call_count)
+        self.assertIsNone(self.propagator._task)
+
+    async def test_submit_raises(self):
+        product = uuid4()
+        self._fail(1)
+        self.propagator.retry_delay = 0
+
+        await self.propagator.submit(product, 2, {"price": 3.5})
+        await self.propagator._task
+
+        self.assertEqual({(product, cart): {"price": 3.5} for cart in self.carts}, self.updated)
+        self.assertEqual(
+            {"pending": 0, "current": None, "products": 1, "batches": 3, "items": 5, "failures": 1},
+            await self.propagator.get_stats(),
+        )
+
+    async def test_submit_raises_backoff(self):
+        self.carts = self.carts[:1]
+        self._fail(4)
+        self.propagator.max_retry_delay = 4
+
+        with patch("src.queries.propagators.sleep") as mock:
+            await self.propagator.submit(uuid4(), 2, {"price": 3.5})
+            await self.propagator._task
+
+        self.assertEqual([call(1), call(2), call(4), call(4), call(0)], mock.call_args_list)
+        self.assertEqual(4, (await self.propagator.get_stats())["failures"])
+        self.assertEqual(0, (await self.propagator.get_stats())["pending"])
+
+    def _fail(self, times: int) -> None:
+        propagate = self.repository.propagate_batch.side_effect
+
+        async def _failing(limit):
+            if self.propagator.failures < times:
+                raise ValueError()
+            return await propagate(limit)
+
+        self.repository.propagate_batch.side_effect = _failing
+
+    async def test_setup_resumes(self):
+        product = uuid4()
+        self.pending[product] = [{"price": 3.5}, self.carts[1]]
+
+        await self.propagator.setup()
+        await self.propagator._task
+
+        self.assertEqual({(product, cart): {"price": 3.5} for cart in self.carts[2:]}, self.updated)
+
+
+if __name__ == "__main__":
+    unittest.main()
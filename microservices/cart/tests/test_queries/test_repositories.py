@@ -0,0 +1,365 @@
+import unittest
+from contextlib import (
+    asynccontextmanager,
+)
+from unittest.mock import (
+    AsyncMock,
+    MagicMock,
+)
+from uuid import (
+    uuid4,
+)
+
+from psycopg2 import (
+    IntegrityError,
+)
+
+from src import (
+    CartQueryRepository,
+    PostgreSqlQueryRepository,
+)
+from tests.utils import (
+    build_config,
+)
+
+
+class TestCartQueryRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        self.config = build_config()
+
+    def test_subclass(self):
+        self.assertTrue(issubclass(CartQueryRepository, PostgreSqlQueryRepository))
+
+    def test_from_config(self):
+        repository = CartQueryRepository.from_config(self.config)
+
+        self.assertEqual("cart_query_db", repository.database)
+        self.assertEqual(self.config.repository.host, repository.host)
+        self.assertEqual(self.config.repository.port, repository.port)
+        self.assertEqual(5, repository.pool_size)
+        self.assertEqual(10, repository.max_overflow)
+        self.assertEqual(3600, repository.pool_recycle)
+        self.assertEqual(30000, repository.statement_timeout)
+        self.assertEqual(1024, repository.cache.max_size)
+        self.assertEqual(5, repository.cache.ttl)
+        self.assertEqual("copy", repository.product_join)
+        self.assertFalse(repository.is_lazy)
+        self.assertIsNone(repository.engine)
+
+    def test_from_config_with_kwargs(self):
+        repository = CartQueryRepository.from_config(self.config, pool_size=2, statement_timeout=None)
+
+        self.assertEqual(2, repository.pool_size)
+        self.assertIsNone(repository.statement_timeout)
+
+    def test_from_config_without_cache(self):
+        repository = CartQueryRepository.from_config(self.config, cache_max_size=0)
+
+        self.assertIsNone(repository.cache)
+        self.assertIsNone(repository.product_cache)
+
+    def test_from_config_unknown_product_join(self):
+        with self.assertRaises(ValueError):
+            CartQueryRepository.from_config(self.config, product_join="foo")
+
+
+class TestCartQueryRepositoryGetCartItems(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.repository = CartQueryRepository.from_config(build_config())
+        self.cart_uuid, self.product_uuid = uuid4(), uuid4()
+        item = {
+            "product_id": self.product_uuid,
+            "cart_id": self.cart_uuid,
+            "quantity": 2,
+            "title": "Cacao",
+            "description": "1KG",
+            "price": 3.5,
+        }
+        self.rows = [{"uuid": self.cart_uuid, "version": 1} | item]
+
+        self.execute = AsyncMock(side_effect=self._execute)
+
+        @asynccontextmanager
+        async def _connection():
+            yield MagicMock(execute=self.execute)
+
+        self.repository.connection = _connection
+
+    async def _execute(self, *args, **kwargs):
+        return MagicMock(fetchall=AsyncMock(return_value=self.rows))
+
+    async def test_get_cart_items(self):
+        observed = await self.repository.get_cart_items(self.cart_uuid)
+
+        self.assertEqual(self.cart_uuid, observed.uuid)
+        self.assertEqual([self.product_uuid], [item.product_id for item in observed.products])
+        self.assertEqual(1, self.execute.call_count)
+
+    async def test_get_cart_items_without_items(self):
+        columns = ["product_id", "cart_id", "quantity", "title", "description", "price"]
+        self.rows = [{"uuid": self.cart_uuid, "version": 1} | dict.fromkeys(columns)]
+
+        observed = await self.repository.get_cart_items(self.cart_uuid)
+
+        self.assertEqual([], observed.products)
+
+    async def test_get_cart_items_missing(self):
+        self.rows = []
+
+        observed = await self.repository.get_cart_items(self.cart_uuid)
+
+        self.assertEqual({"error": "Invalid Cart UUID"}, observed)
+
+    async def test_get_cart_items_cached(self):
+        expected = await self.repository.get_cart_items(str(self.cart_uuid))
+        observed = await self.repository.get_cart_items(self.cart_uuid)
+
+        self.assertEqual(expected, observed)
+        self.assertEqual(1, self.execute.call_count)
+
+    async def test_get_cart_items_invalidated(self):
+        await self.repository.get_cart_items(self.cart_uuid)
+        await self.repository.delete_cart_item(self.cart_uuid, self.product_uuid)
+        await self.repository.get_cart_items(self.cart_uuid)
+
+        self.assertEqual(3, self.execute.call_count)
+
+    async def test_insert_cart_item_raises(self):
+        await self.repository.get_cart_items(self.cart_uuid)
+        self.execute.side_effect = ValueError()
+
+        with self.assertRaises(ValueError):
+            await self.repository.insert_cart_item(self.cart_uuid, uuid4(), 1, "Milk", "1L", 1.0)
+
+    async def test_update_cart_item_raises(self):
+        self.execute.side_effect = ValueError()
+
+        with self.assertRaises(ValueError):
+            await self.repository.update_cart_item(self.cart_uuid, self.product_uuid, 1, "Cacao", "1KG", 3.5)
+
+
+class TestCartQueryRepositoryCartItems(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.repository = CartQueryRepository.from_config(build_config())
+        await self.repository.setup()
+
+        self.cart_uuid, self.product_uuid = uuid4(), uuid4()
+        await self.repository.create_cart(self.cart_uuid, 1, 1)
+
+    async def asyncTearDown(self) -> None:
+        await self.repository.destroy()
+
+    async def test_insert_cart_item_replayed(self):
+        async with self.repository.unit_of_work():
+            await self.repository.insert_cart_item(self.cart_uuid, self.product_uuid, 1, "Cacao", "1KG", 3.5)
+            await self.repository.insert_cart_item(self.cart_uuid, self.product_uuid, 2, "Cacao", "1KG", 3.5)
+
+        observed = await self.repository.get_cart_items(self.cart_uuid)
+
+        self.assertEqual([(self.product_uuid, 2)], [(item.product_id, item.quantity) for item in observed.products])
+
+    async def test_unit_of_work_rolled_back(self):
+        with self.assertRaises(IntegrityError):
+            async with self.repository.unit_of_work():
+                await self.repository.insert_cart_item(self.cart_uuid, self.product_uuid, 1, "Cacao", "1KG", 3.5)
+                await self.repository.insert_cart_item(uuid4(), self.product_uuid, 1, "Cacao", "1KG", 3.5)
+
+        observed = await self.repository.get_cart_items(self.cart_uuid)
+
+        self.assertEqual([], observed.products)
+
+    async def _propagate_all(self) -> None:
+        while await self.repository.propagate_batch(limit=2) is not None:
+            pass
+
+    async def _get_item(self) -> tuple[str, str, float]:
+        observed = await self.repository.get_cart_items(self.cart_uuid)
+        return next((item.title, item.description, item.price) for item in observed.products)
+
+    async def test_propagate(self):
+        carts = [uuid4() for _ in range(4)]
+        for cart_uuid in carts:
+            await self.repository.create_cart(cart_uuid, 1, 1)
+            await self.repository.insert_cart_item(cart_uuid, self.product_uuid, 1, "Cacao", "1KG", 3.5)
+
+        await self.repository.submit_propagation(self.product_uuid, 2, {"price": 4.0})
+        await self._propagate_all()
+
+        for cart_uuid in carts:
+            observed = await self.repository.get_cart_items(cart_uuid)
+            self.assertEqual([4.0], [item.price for item in observed.products])
+
+    async def test_propagate_merged_by_version(self):
+        await self.repository.insert_cart_item(self.cart_uuid, self.product_uuid, 1, "Cacao", "1KG", 3.5)
+
+        await self.repository.submit_propagation(self.product_uuid, 3, {"price": 5.0})
+        await self.repository.submit_propagation(self.product_uuid, 2, {"price": 4.0, "title": "Cola-Cao"})
+        await self._propagate_all()
+        self.assertEqual(("Cola-Cao", "1KG", 5.0), await self._get_item())
+
+        await self.repository.submit_propagation(self.product_uuid, 2, {"price": 4.0, "title": "Cola-Cao"})
+        await self.repository.submit_propagation(self.product_uuid, 4, {"description": "2KG"})
+        await self._propagate_all()
+        self.assertEqual(("Cola-Cao", "2KG", 5.0), await self._get_item())
+
+
+class TestCartQueryRepositoryProducts(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.repository = CartQueryRepository.from_config(build_config(), product_join="lazy")
+        await self.repository.setup()
+
+        self.cart_uuid, self.product_uuid = uuid4(), uuid4()
+        await self.repository.create_cart(self.cart_uuid, 1, 1)
+
+    async def asyncTearDown(self) -> None:
+        await self.repository.destroy()
+
+    async def _get_item(self) -> tuple[str, str, float]:
+        observed = await self.repository.get_cart_items(self.cart_uuid)
+        return next((item.title, item.description, item.price) for item in observed.products)
+
+    async def test_update_product(self):
+        await self.repository.insert_cart_item(self.cart_uuid, self.product_uuid, 1, "Cacao", "1KG", 3.5, 2)
+
+        await self.repository.update_product(self.product_uuid, 3, price=4.0)
+        await self.repository.update_product(self.product_uuid, 2, price=5.0, title="Cola-Cao")
+
+        self.assertEqual(("Cacao", "1KG", 4.0), await self._get_item())
+
+    async def test_update_product_before_entry(self):
+        await self.repository.update_product(self.product_uuid, 3, price=4.0)
+        await self.repository.insert_cart_item(self.cart_uuid, self.product_uuid, 1, "Cacao", "1KG", 3.5, 2)
+
+        self.assertEqual(("Cacao", "1KG", 4.0), await self._get_item())
+
+    async def test_insert_cart_item_newer_product(self):
+        await self.repository.insert_cart_item(self.cart_uuid, self.product_uuid, 1, "Cacao", "1KG", 3.5, 2)
+        await self.repository.update_cart_item(self.cart_uuid, self.product_uuid, 2, "Cola-Cao", "1KG", 4.0, 3)
+
+        self.assertEqual(("Cola-Cao", "1KG", 4.0), await self._get_item())
+
+
+class TestCartQueryRepositoryGetCartItemsLazy(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.repository = CartQueryRepository.from_config(build_config(), product_join="lazy")
+        self.cart_uuid, self.product_uuid = uuid4(), uuid4()
+        product = {"uuid": self.product_uuid, "version": 1, "title": "Cacao", "description": "1KG", "price": 3.5}
+        self.products = [product]
+        self.rows = [
+            {"cart_id": self.cart_uuid, "cart_version": 1, "product_id": self.product_uuid, "quantity": 2} | product
+        ]
+
+        self.execute = AsyncMock(side_effect=self._execute)
+
+        @asynccontextmanager
+        async def _connection():
+            yield MagicMock(execute=self.execute)
+
+        self.repository.connection = _connection
+
+    async def _execute(self, query, *args, **kwargs):
+        rows = self.products if "cart_entries" not in str(query) else self.rows
+        return MagicMock(fetchall=AsyncMock(return_value=rows))
+
+    async def test_get_cart_items(self):
+        observed = await self.repository.get_cart_items(self.cart_uuid)
+
+        self.assertEqual(self.cart_uuid, observed.uuid)
+        self.assertEqual(
+            [(self.product_uuid, 2, "Cacao", 3.5)],
+            [(i.product_id, i.quantity, i.title, i.price) for i in observed.products],
+        )
+        self.assertEqual(1, self.execute.call_count)
+
+    async def test_get_cart_items_cached(self):
+        expected = await self.repository.get_cart_items(self.cart_uuid)
+        observed = await self.repository.get_cart_items(self.cart_uuid)
+
+        self.assertEqual(expected, observed)
+        self.assertEqual(1, self.execute.call_count)
+
+    async def test_get_cart_items_product_invalidated(self):
+        await self.repository.get_cart_items(self.cart_uuid)
+        await self.repository.update_product(self.product_uuid, 2, price=4.0)
+        self.products = [self.products[0] | {"version": 2, "price": 4.0}]
+
+        observed = await self.repository.get_cart_items(self.cart_uuid)
+
+        self.assertEqual([4.0], [item.price for item in observed.products])
+        self.assertEqual(3, self.execute.call_count)
+        self.assertNotIn("cart_entries", str(self.execute.call_args_list[-1].args[0]))
+
+    async def test_get_cart_items_missing_product(self):
+        self.rows = [self.rows[0] | dict.fromkeys(["uuid", "version", "title", "description", "price"])]
+
+        observed = await self.repository.get_cart_items(self.cart_uuid)
+
+        self.assertEqual({"error": "An error occurred when formatting result."}, observed)
+
+
+class TestCartQueryRepositoryUnitOfWork(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.repository = CartQueryRepository.from_config(build_config(), already_setup=True)
+        self.connections = list()
+
+        @asynccontextmanager
+        async def _begin():
+            yield
+
+        @asynccontextmanager
+        async def _acquire():
+            connection = MagicMock(execute=AsyncMock(), begin=_begin)
+            self.connections.append(connection)
+            yield connection
+
+        self.repository._engine = MagicMock(acquire=_acquire)
+
+    async def test_connection(self):
+        async with self.repository.connection() as one:
+            pass
+        async with self.repository.connection() as two:
+            pass
+
+        self.assertEqual([one, two], self.connections)
+        self.assertNotEqual(one, two)
+
+    async def test_unit_of_work(self):
+        async with self.repository.unit_of_work() as expected:
+            async with self.repository.connection() as one:
+                pass
+            async with self.repository.transaction() as two:
+                pass
+            async with self.repository.unit_of_work() as three:
+                pass
+
+        self.assertEqual([expected], self.connections)
+        self.assertEqual(expected, one)
+        self.assertEqual(expected, two)
+        self.assertEqual(expected, three)
+
+    async def test_unit_of_work_after_commit(self):
+        observed = list()
+        async with self.repository.unit_of_work():
+            self.repository._after_commit(lambda: observed.append("foo"))
+            self.assertEqual([], observed)
+
+        self.assertEqual(["foo"], observed)
+
+    async def test_unit_of_work_after_commit_raises(self):
+        observed = list()
+        with self.assertRaises(ValueError):
+            async with self.repository.unit_of_work():
+                self.repository._after_commit(lambda: observed.append("foo"))
+                raise ValueError()
+
+        self.assertEqual([], observed)
+
+    async def test_after_commit_without_unit_of_work(self):
+        observed = list()
+        self.repository._after_commit(lambda: observed.append("foo"))
+
+        self.assertEqual(["foo"], observed)
+
+
+if __name__ == "__main__":
+    unittest.main()
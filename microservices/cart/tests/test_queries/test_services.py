@@ -4,6 +4,26 @@ from __future__ import (
 
 import sys
 import unittest
+from unittest.mock import (
+    AsyncMock,
+    MagicMock,
+)
+from uuid import (
+    uuid4,
+)
+
+from minos.aggregate import (
+    Action,
+    AggregateDiff,
+    FieldDiff,
+    FieldDiffContainer,
+)
+from minos.common import (
+    current_datetime,
+)
+from minos.networks import (
+    InMemoryRequest,
+)
 
 from src import (
     CartQueryService,
@@ -23,6 +43,56 @@ class TestCartQueryService(unittest.IsolatedAsyncioTestCase):
     async def asyncTearDown(self) -> None:
         await self.injector.unwire()
 
+    async def test_product_updated(self):
+        repository, propagator = AsyncMock(is_lazy=False), AsyncMock()
+        service = CartQueryService(cart_propagator=propagator)
+        service.repository = repository
+        diff = _build_product_diff()
+
+        await service.product_updated(InMemoryRequest(diff))
+
+        self.assertEqual([((diff.uuid, 2, {"price": 3.5, "title": "Cacao"}), {})], propagator.submit.call_args_list)
+        self.assertEqual(0, repository.update_cart_items.call_count)
+
+    async def test_product_updated_without_propagator(self):
+        repository = AsyncMock(is_lazy=False)
+        service = CartQueryService()
+        service.repository = repository
+        diff = _build_product_diff()
+
+        await service.product_updated(InMemoryRequest(diff))
+
+        self.assertEqual(
+            [((), {"uuid": diff.uuid, "price": 3.5, "title": "Cacao"})], repository.update_cart_items.call_args_list
+        )
+
+    async def test_product_updated_lazy(self):
+        repository, propagator = AsyncMock(is_lazy=True), MagicMock()
+        service = CartQueryService(cart_propagator=propagator)
+        service.repository = repository
+        diff = _build_product_diff()
+
+        await service.product_updated(InMemoryRequest(diff))
+
+        self.assertEqual([((diff.uuid, 2), {"price": 3.5, "title": "Cacao"})], repository.update_product.call_args_list)
+        self.assertEqual(0, propagator.submit.call_count)
+
+    async def test_get_propagation_stats(self):
+        service = CartQueryService(cart_propagator=MagicMock(get_stats=AsyncMock(return_value={"pending": 0})))
+
+        response = await service.get_propagation_stats(InMemoryRequest())
+
+        self.assertEqual({"pending": 0}, await response.content())
+
+
+def _build_product_diff() -> AggregateDiff:
+    fields_diff = FieldDiffContainer(
+        [FieldDiff("title", str, "Cacao"), FieldDiff("price", float, 3.5), FieldDiff("code", str, "abc")]
+    )
+    return AggregateDiff(
+        uuid4(), "src.aggregates.Product", 2, Action.UPDATE, created_at=current_datetime(), fields_diff=fields_diff
+    )
+
 
 if __name__ == "__main__":
     unittest.main()
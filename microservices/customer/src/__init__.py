@@ -5,6 +5,11 @@ from .aggregates import (
 from .commands import (
     CustomerCommandService,
 )
+from .identifiers import (
+    TimeOrderedEventRepository,
+    TimeOrderedUUIDGenerator,
+    uuid7,
+)
 from .queries import (
     CustomerQueryService,
 )
@@ -11,7 +11,18 @@ from .commands import (
     CREATE_ORDER,
     OrderCommandService,
 )
+from .identifiers import (
+    TimeOrderedEventRepository,
+    TimeOrderedUUIDGenerator,
+    uuid7,
+)
 from .queries import (
     OrderQueryRepository,
     OrderQueryService,
+    PostgreSqlQueryRepository,
+)
+from .rest import (
+    StreamingResponse,
+    StreamingRestHandler,
+    StreamingRestService,
 )
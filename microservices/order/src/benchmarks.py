@@ -0,0 +1,89 @@
+from __future__ import (
+    annotations,
+)
+
+from datetime import (
+    datetime,
+)
+from time import (
+    perf_counter,
+)
+from typing import (
+    Any,
+)
+from uuid import (
+    UUID,
+    uuid4,
+)
+
+from sqlalchemy import (
+    MetaData,
+)
+
+from .identifiers import (
+    uuid7,
+)
+from .queries import (
+    OrderQueryRepository,
+)
+from .queries.models import (
+    ORDER_TABLE,
+)
+
+
+async def benchmark_identifiers(
+    repository: OrderQueryRepository, rows: int = 10_000, batch_size: int = 100
+) -> list[dict[str, Any]]:
+    """Measure the insert throughput and the primary key index size of the order table with random (``uuid4``) and
+    time-ordered (``uuid7``) identifiers.
+
+    The rows are inserted into a temporary copy of the table, including its indexes, which is dropped once it has been
+    measured.
+
+    :param repository: The repository whose database is used.
+    :param rows: The number of rows inserted with each kind of identifier.
+    :param batch_size: The number of rows inserted by each statement.
+    :return: A list containing the kind of identifier together with the number of inserted rows per second and the
+        size of the primary key index in bytes.
+    """
+    generators = {"uuid4": uuid4, "uuid7": uuid7}
+
+    results = list()
+    for name, generate in generators.items():
+        table = ORDER_TABLE.to_metadata(MetaData(), name=f"benchmark_{ORDER_TABLE.name}_{name}")
+        relation = f'"{table.name}"'
+        async with repository.connection() as connection:
+            await connection.execute(f'CREATE TEMPORARY TABLE {relation} (LIKE "{ORDER_TABLE.name}" INCLUDING ALL)')
+            try:
+                started_at = perf_counter()
+                for offset in range(0, rows, batch_size):
+                    values = [_build_order(generate()) for _ in range(min(batch_size, rows - offset))]
+                    await connection.execute(table.insert().values(values))
+                elapsed = perf_counter() - started_at
+
+                index_size = await connection.scalar(
+                    "SELECT pg_relation_size(indexrelid) FROM pg_index "
+                    f"WHERE indrelid = '{relation}'::regclass AND indisprimary"
+                )
+            finally:
+                await connection.execute(f"DROP TABLE IF EXISTS {relation}")
+
+        results.append({"identifier": name, "rows": rows, "rows_per_second": rows / elapsed, "index_size": index_size})
+    return results
+
+
+def _build_order(uuid: UUID) -> dict[str, Any]:
+    now = datetime.now()
+    return {
+        "uuid": uuid,
+        "version": 1,
+        "ticket_uuid": uuid4(),
+        "payment_uuid": uuid4(),
+        "customer_uuid": uuid4(),
+        "total_amount": 30,
+        "payment_detail": {},
+        "shipment_detail": {},
+        "status": "created",
+        "created_at": now,
+        "updated_at": now,
+    }
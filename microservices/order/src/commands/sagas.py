@@ -1,6 +1,9 @@
 from collections import (
     defaultdict,
 )
+from typing import (
+    Optional,
+)
 from uuid import (
     UUID,
 )
@@ -20,9 +23,12 @@ from ..aggregates import (
     OrderStatus,
 )
 
-PurchaseProductsQuery = ModelType.build("PurchaseProductsQuery", {"quantities": dict[str, int]})
+PurchaseProductsQuery = ModelType.build(
+    "PurchaseProductsQuery",
+    {"quantities": dict[str, int], "allocations": Optional[dict[str, dict[str, int]]], "step": str},
+)
 TicketQuery = ModelType.build("TicketQuery", {"cart_uuid": UUID})
-PaymentQuery = ModelType.build("PaymentQuery", {"credit_number": int, "amount": float})
+PaymentQuery = ModelType.build("PaymentQuery", {"credit_number": int, "amount": float, "step": str})
 
 
 def _create_ticket(context: SagaContext) -> SagaRequest:
@@ -32,20 +38,22 @@ def _create_ticket(context: SagaContext) -> SagaRequest:
 
 async def _process_ticket_entries(context: SagaContext, response: SagaResponse) -> SagaContext:
     ticket = await response.content()
-    product_uuids = list()
+    quantities = defaultdict(int)
     for entry in ticket.entries.data.values():
-        product_uuids.append(str(entry.product))
-    context["ticket"] = dict(uuid=ticket.uuid, product_uuids=product_uuids, total_amount=ticket.total_price)
+        quantities[str(entry.product)] += entry.quantity
+    context["ticket"] = dict(uuid=ticket.uuid, quantities=dict(quantities), total_amount=ticket.total_price)
     return context
 
 
 def _purchase_products(context: SagaContext) -> SagaRequest:
-    product_uuids = context["ticket"]["product_uuids"]
-    quantities = defaultdict(int)
-    for product_uuid in product_uuids:
-        quantities[str(product_uuid)] += 1
+    quantities = context["ticket"]["quantities"]
+    return SagaRequest("PurchaseProducts", PurchaseProductsQuery(quantities, None, "purchase_products"))
+
 
-    return SagaRequest("PurchaseProducts", PurchaseProductsQuery(quantities))
+async def _process_purchase(context: SagaContext, response: SagaResponse) -> SagaContext:
+    value = await response.content()
+    context["purchase_allocations"] = value["allocations"]
+    return context
 
 
 # noinspection PyUnusedLocal
@@ -54,18 +62,19 @@ def _raise(context: SagaContext, response: SagaResponse) -> SagaContext:
 
 
 def _revert_purchase_products(context: SagaContext) -> SagaRequest:
-    product_uuids = context["ticket"]["product_uuids"]
-    quantities = defaultdict(int)
-    for product_uuid in product_uuids:
-        quantities[str(product_uuid)] -= 1
-
-    return SagaRequest("PurchaseProducts", PurchaseProductsQuery(quantities))
+    quantities = {product_uuid: -quantity for product_uuid, quantity in context["ticket"]["quantities"].items()}
+    # The units of the sharded products are given back to the same inventory slots from which they were taken.
+    allocations = {
+        product_uuid: {slot_uuid: -quantity for slot_uuid, quantity in allocation.items()}
+        for product_uuid, allocation in context["purchase_allocations"].items()
+    }
+    return SagaRequest("PurchaseProducts", PurchaseProductsQuery(quantities, allocations, "revert_purchase_products"))
 
 
 def _payment(context: SagaContext) -> SagaRequest:
     amount = context["ticket"]["total_amount"]
     card_number = context["payment_detail"].card_number
-    return SagaRequest("CreatePayment", PaymentQuery(card_number, amount))
+    return SagaRequest("CreatePayment", PaymentQuery(card_number, amount, "payment"))
 
 
 async def _get_payment(context: SagaContext, response: SagaResponse) -> SagaContext:
@@ -93,9 +102,11 @@ CREATE_ORDER = (
     .remote_step(_create_ticket)
     .on_success(_process_ticket_entries)
     .remote_step(_purchase_products)
+    .on_success(_process_purchase)
     .on_error(_raise)
     .on_failure(_revert_purchase_products)
     .remote_step(_payment)
     .on_success(_get_payment)
+    .on_error(_raise)
     .commit(_create_commit_callback)
 )
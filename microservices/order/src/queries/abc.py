@@ -0,0 +1,270 @@
+from __future__ import (
+    annotations,
+)
+
+from contextlib import (
+    asynccontextmanager,
+)
+from contextvars import (
+    ContextVar,
+)
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Optional,
+)
+from uuid import (
+    uuid4,
+)
+
+from aiopg.sa import (
+    Engine,
+    SAConnection,
+    create_engine,
+)
+from aiopg.sa.result import (
+    RowProxy,
+)
+from minos.common import (
+    MinosConfig,
+    MinosConfigException,
+    MinosSetup,
+)
+from sqlalchemy import (
+    MetaData,
+)
+from sqlalchemy.ext.compiler import (
+    compiles,
+)
+from sqlalchemy.schema import (
+    CreateIndex,
+    CreateTable,
+)
+from sqlalchemy.sql import (
+    ClauseElement,
+)
+from sqlalchemy.sql.base import (
+    Executable,
+)
+
+
+class PostgreSqlQueryRepository(MinosSetup):
+    """PostgreSql Query Repository base class.
+
+    The queries are executed through an asynchronous engine backed by a pool of connections, so that a slow query
+    does not block the event loop. Each operation acquires its own connection unless it runs within a unit of work, in
+    which case the connection of the unit of work is reused.
+
+    Each microservice is built from its own directory, so this module is kept identical in every microservice that
+    has query repositories (``make check-shared`` verifies it).
+    """
+
+    metadata: MetaData
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        database: str,
+        user: str,
+        password: str,
+        *args,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_recycle: int = 3600,
+        statement_timeout: Optional[int] = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.host = host
+        self.port = port
+        self.database = database
+        self.user = user
+        self.password = password
+
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_recycle = pool_recycle
+        self.statement_timeout = statement_timeout
+
+        self._engine = None
+        self._unit_of_work: ContextVar[Optional[_UnitOfWork]] = ContextVar(f"unit_of_work_{id(self)}", default=None)
+
+    @staticmethod
+    def _pool_config(config: MinosConfig) -> dict[str, Any]:
+        try:
+            # noinspection PyProtectedMember
+            return dict(config._get("query_repository"))
+        except MinosConfigException:
+            return dict()
+
+    async def _setup(self) -> None:
+        kwargs = dict()
+        if self.statement_timeout is not None:
+            kwargs["options"] = f"-c statement_timeout={self.statement_timeout}"
+
+        self._engine = await create_engine(
+            host=self.host,
+            port=self.port,
+            database=self.database,
+            user=self.user,
+            password=self.password,
+            minsize=self.pool_size,
+            maxsize=self.pool_size + self.max_overflow,
+            pool_recycle=self.pool_recycle,
+            **kwargs,
+        )
+
+        async with self._engine.acquire() as connection:
+            async with connection.begin():
+                # The replicas are set up concurrently, so they create and upgrade the tables one at a time. Otherwise,
+                # the locks taken by the index creation of one of them would deadlock with the upgrade of another one.
+                await connection.execute(_SETUP_LOCK_QUERY)
+                for table in self.metadata.sorted_tables:
+                    await connection.execute(CreateTable(table, if_not_exists=True))
+                    for index in table.indexes:
+                        await connection.execute(CreateIndex(index, if_not_exists=True))
+                await self._upgrade(connection)
+
+    async def _upgrade(self, connection: SAConnection) -> None:
+        """Upgrade the tables created by a previous version of the repository, if needed.
+
+        It is executed within the same transaction in which the missing tables are created, which holds a lock that
+        prevents the rest of replicas from setting up the repository at the same time.
+
+        :param connection: The connection to be used.
+        :return: This method does not return anything.
+        """
+
+    async def _destroy(self) -> None:
+        self._engine.close()
+        await self._engine.wait_closed()
+        self._engine = None
+
+    @property
+    def engine(self) -> Optional[Engine]:
+        """Get the asynchronous engine.
+
+        :return: An ``Engine`` instance or ``None`` if the repository is not set up yet.
+        """
+        return self._engine
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[SAConnection]:
+        """Acquire a connection from the pool, releasing it on exit.
+
+        If a unit of work is open on the current context, its connection is yielded instead.
+
+        :return: An asynchronous context manager that yields a ``SAConnection`` instance.
+        """
+        if (unit_of_work := self._unit_of_work.get()) is not None:
+            yield unit_of_work.connection
+            return
+
+        await self.setup()
+        async with self._engine.acquire() as connection:
+            yield connection
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[SAConnection]:
+        """Acquire a connection from the pool and open a transaction on it, committing it on exit.
+
+        If a unit of work is open on the current context, its connection is yielded instead, so that the changes are
+        committed together with the unit of work.
+
+        :return: An asynchronous context manager that yields a ``SAConnection`` instance.
+        """
+        if (unit_of_work := self._unit_of_work.get()) is not None:
+            yield unit_of_work.connection
+            return
+
+        async with self.connection() as connection:
+            async with connection.begin():
+                yield connection
+
+    @asynccontextmanager
+    async def unit_of_work(self) -> AsyncIterator[SAConnection]:
+        """Open a unit of work bound to the current request or event.
+
+        All the operations performed by the repository within the unit of work share a single pooled connection and
+        transaction, which is committed and released on exit. Nested calls join the outer unit of work. The unit of
+        work must not be shared by concurrent tasks, as a connection runs a single query at a time.
+
+        :return: An asynchronous context manager that yields a ``SAConnection`` instance.
+        """
+        if self._unit_of_work.get() is not None:
+            async with self.connection() as connection:
+                yield connection
+            return
+
+        async with self.transaction() as connection:
+            unit_of_work = _UnitOfWork(connection)
+            token = self._unit_of_work.set(unit_of_work)
+            try:
+                yield connection
+            finally:
+                self._unit_of_work.reset(token)
+
+        for callback in unit_of_work.callbacks:
+            callback()
+
+    def _after_commit(self, callback: Callable[[], None]) -> None:
+        """Run a callback once the current changes are committed.
+
+        :param callback: The function to be called. It is called immediately if there is no open unit of work.
+        :return: This method does not return anything.
+        """
+        if (unit_of_work := self._unit_of_work.get()) is not None:
+            unit_of_work.callbacks.append(callback)
+        else:
+            callback()
+
+    async def stream(
+        self, query: ClauseElement, batch_size: int = 500, factory: Optional[Callable[[RowProxy], Any]] = None
+    ) -> AsyncIterator[Any]:
+        """Iterate over the rows of a query through a server-side cursor, so that they are fetched in batches.
+
+        The connection is held until the iterator is exhausted or closed, so an iterator that may be abandoned must be
+        closed with ``aclose``. The rows are converted with ``factory`` within the iterator itself, so that it can be
+        returned (and closed) directly instead of being wrapped into another one.
+
+        :param query: The query to be executed.
+        :param batch_size: The number of rows fetched on each round trip.
+        :param factory: An optional function used to convert each row.
+        :return: An asynchronous iterator of ``RowProxy`` instances or of the values returned by ``factory``.
+        """
+        name = f"cursor_{uuid4().hex}"
+        async with self.transaction() as connection:
+            await connection.execute(_DeclareCursor(name, query))
+            while True:
+                result = await connection.execute(f"FETCH FORWARD {int(batch_size)} FROM {name}")
+                rows = await result.fetchall()
+                if not rows:
+                    break
+                for row in rows:
+                    yield row if factory is None else factory(row)
+            await connection.execute(f"CLOSE {name}")
+
+
+class _DeclareCursor(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, name: str, query: ClauseElement):
+        self.name = name
+        self.query = query
+
+
+@compiles(_DeclareCursor)
+def _compile_declare_cursor(element: _DeclareCursor, compiler, **kwargs) -> str:
+    # The query is compiled by the connection itself, so that its parameters are processed as usual.
+    return f"DECLARE {element.name} NO SCROLL CURSOR FOR {compiler.process(element.query, **kwargs)}"
+
+
+class _UnitOfWork:
+    def __init__(self, connection: SAConnection):
+        self.connection = connection
+        self.callbacks: list[Callable[[], None]] = list()
+
+
+_SETUP_LOCK_QUERY = "SELECT pg_advisory_xact_lock(hashtext('query_repository_setup'))"
@@ -12,6 +12,7 @@ from minos.common import (
 from sqlalchemy import (
     Column,
     DateTime,
+    Index,
     Integer,
     MetaData,
     Numeric,
@@ -40,6 +41,12 @@ ORDER_TABLE = Table(
     Column("created_at", DateTime),
     Column("updated_at", DateTime),
 )
+Index(
+    "order_customer_created_at_idx",
+    ORDER_TABLE.columns.customer_uuid,
+    ORDER_TABLE.columns.created_at.desc(),
+    ORDER_TABLE.columns.uuid.desc(),
+)
 
 OrderDTO = ModelType.build(
     "OrderDTO",
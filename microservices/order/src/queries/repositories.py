@@ -2,6 +2,22 @@ from __future__ import (
     annotations,
 )
 
+import json
+from base64 import (
+    urlsafe_b64decode,
+    urlsafe_b64encode,
+)
+from collections.abc import (
+    Iterable,
+)
+from datetime import (
+    datetime,
+)
+from typing import (
+    Any,
+    AsyncIterator,
+    Optional,
+)
 from uuid import (
     UUID,
 )
@@ -11,15 +27,14 @@ from minos.aggregate import (
 )
 from minos.common import (
     MinosConfig,
-    MinosSetup,
 )
 from sqlalchemy import (
-    create_engine,
-)
-from sqlalchemy.orm import (
-    sessionmaker,
+    tuple_,
 )
 
+from .abc import (
+    PostgreSqlQueryRepository,
+)
 from .models import (
     META,
     ORDER_TABLE,
@@ -29,21 +44,19 @@ from .models import (
 ORDER_ASC = "asc"
 ORDER_DESC = "desc"
 
+_HISTORY_ORDERING = (ORDER_TABLE.columns.created_at.desc(), ORDER_TABLE.columns.uuid.desc())
 
-class OrderQueryRepository(MinosSetup):
-    """ProductInventory Repository class."""
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.engine = create_engine("postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}".format(**kwargs))
-        self.session = sessionmaker(bind=self.engine)()
+class OrderQueryRepository(PostgreSqlQueryRepository):
+    """ProductInventory Repository class."""
 
-    async def _setup(self) -> None:
-        META.create_all(self.engine)
+    metadata = META
 
     @classmethod
     def _from_config(cls, *args, config: MinosConfig, **kwargs) -> OrderQueryRepository:
-        return cls(*args, **(config.repository._asdict() | {"database": "order_query_db"}) | kwargs)
+        return cls(
+            *args, **(config.repository._asdict() | {"database": "order_query_db"}) | cls._pool_config(config) | kwargs,
+        )
 
     async def create(self, **kwargs) -> None:
         """Create a new row.
@@ -64,7 +77,8 @@ class OrderQueryRepository(MinosSetup):
         kwargs.pop("customer")
 
         query = ORDER_TABLE.insert().values(**kwargs)
-        self.engine.execute(query)
+        async with self.connection() as connection:
+            await connection.execute(query)
 
     async def get(self, uuid: UUID) -> None:
         """Create a new row.
@@ -74,10 +88,11 @@ class OrderQueryRepository(MinosSetup):
         """
 
         query = ORDER_TABLE.select().where(ORDER_TABLE.columns.uuid == uuid)
-        res = self.engine.execute(query)
+        async with self.connection() as connection:
+            row = await (await connection.execute(query)).first()
 
         order = None
-        for row in res:
+        if row is not None:
             order = OrderDTO(**row)
 
         return order
@@ -89,9 +104,58 @@ class OrderQueryRepository(MinosSetup):
         :return: This method does not return anything.
         """
 
-        query = ORDER_TABLE.select().where(ORDER_TABLE.columns.customer_uuid == uuid)
-        res = self.engine.execute(query)
-
-        orders = [OrderDTO(**row) for row in res]
+        query = ORDER_TABLE.select().where(ORDER_TABLE.columns.customer_uuid == uuid).order_by(*_HISTORY_ORDERING)
+        async with self.connection() as connection:
+            res = await connection.execute(query)
+            orders = [OrderDTO(**row) async for row in res]
 
         return orders
+
+    async def get_page_by_user(
+        self, uuid: UUID, limit: int, after: Optional[str] = None, status: Optional[Iterable[str]] = None,
+    ) -> dict[str, Any]:
+        """Get a page of the orders of a user, from the newest to the oldest one, using keyset pagination.
+
+        :param uuid: The user identifier.
+        :param limit: The maximum number of orders to be retrieved.
+        :param after: The cursor returned by the previous page, or ``None`` to retrieve the first one.
+        :param status: The statuses to be retrieved. If ``None`` is given, the orders are not filtered by status.
+        :return: A dictionary containing the ``orders`` and the ``cursor`` of the next page, which is ``None`` if there
+            are no more orders.
+        """
+        columns = ORDER_TABLE.columns
+        query = ORDER_TABLE.select().where(columns.customer_uuid == uuid).order_by(*_HISTORY_ORDERING).limit(limit)
+        if after is not None:
+            query = query.where(tuple_(columns.created_at, columns.uuid) < tuple_(*self._decode_cursor(after)))
+        if status is not None:
+            query = query.where(columns.status.in_(list(status)))
+
+        async with self.connection() as connection:
+            rows = await (await connection.execute(query)).fetchall()
+
+        cursor = None
+        if len(rows) == limit:
+            cursor = self._encode_cursor(rows[-1]["created_at"], rows[-1]["uuid"])
+
+        return {"orders": [OrderDTO(**row) for row in rows], "cursor": cursor}
+
+    @staticmethod
+    def _encode_cursor(created_at: datetime, uuid: UUID) -> str:
+        return urlsafe_b64encode(json.dumps([created_at.isoformat(), str(uuid)]).encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+        try:
+            created_at, uuid = json.loads(urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(created_at), UUID(uuid)
+        except Exception as exc:
+            raise ValueError(f"The cursor is not valid: {cursor!r}") from exc
+
+    def stream_by_user(self, uuid: UUID) -> AsyncIterator[OrderDTO]:
+        """Iterate over the orders of a user without loading them at once.
+
+        :param uuid: The user identifier.
+        :return: An asynchronous iterator of ``OrderDTO`` instances.
+        """
+        query = ORDER_TABLE.select().where(ORDER_TABLE.columns.customer_uuid == uuid).order_by(*_HISTORY_ORDERING)
+        return self.stream(query, factory=lambda row: OrderDTO(**row))
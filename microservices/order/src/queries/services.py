@@ -18,10 +18,16 @@ from minos.networks import (
     enroute,
 )
 
+from ..rest import (
+    StreamingResponse,
+)
 from .repositories import (
     OrderQueryRepository,
 )
 
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
 
 class OrderQueryService(QueryService):
     """Order Query Service class."""
@@ -53,24 +59,44 @@ class OrderQueryService(QueryService):
     @enroute.broker.query("GetUserOrders")
     @enroute.rest.query(f"/orders/user/{{uuid:{UUID_REGEX.pattern}}}", "GET")
     async def get_user_orders(self, request: Request) -> Response:
-        """Get user orders.
+        """Get user orders, from the newest to the oldest one.
 
-        :param request: The ``Request`` instance that contains the order identifier.
-        :return: A ``Response`` instance containing the requested order.
+        If any of the ``limit``, ``after`` or ``status`` params is given, a single page is retrieved using keyset
+        pagination, together with the cursor of the next one. Otherwise, the whole history is retrieved.
+
+        :param request: The ``Request`` instance that contains the user identifier and the optional pagination params.
+        :return: A ``Response`` instance containing the requested orders.
         """
         if isinstance(request, RestRequest):
             params = await request.params()
-            uuid = params["uuid"]
         else:
-            content = await request.content()
-            uuid = content["uuid"]
+            params = await request.content()
+        uuid = params["uuid"]
 
-        try:
-            order = await self.repository.get_by_user(uuid)
-        except Exception as exc:
-            raise ResponseException(f"There was a problem while parsing the given request: {exc!r}")
+        if (content_type := StreamingResponse.requested(request)) is not None:
+            return StreamingResponse(self.repository.stream_by_user(uuid), content_type)
 
-        return Response(order)
+        if not any(key in params for key in ("limit", "after", "status")):
+            try:
+                order = await self.repository.get_by_user(uuid)
+            except Exception as exc:
+                raise ResponseException(f"There was a problem while parsing the given request: {exc!r}")
+
+            return Response(order)
+
+        status = params.get("status")
+        if isinstance(status, str):
+            status = status.split(",")
+
+        try:
+            limit = int(params.get("limit", DEFAULT_PAGE_SIZE))
+            if not 0 < limit <= MAX_PAGE_SIZE:
+                raise ValueError(f"The limit must be between 1 and {MAX_PAGE_SIZE}. Obtained: {limit!r}")
+            res = await self.repository.get_page_by_user(uuid, limit, params.get("after"), status)
+        except ValueError as exc:
+            raise ResponseException(f"The pagination params are not valid: {exc!r}")
+
+        return Response(res)
 
     @enroute.broker.event("OrderCreated")
     async def order_created(self, request: Request) -> None:
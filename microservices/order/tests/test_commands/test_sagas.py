@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import (
+    AsyncMock,
+    MagicMock,
+)
+from uuid import (
+    uuid4,
+)
+
+from minos.saga import (
+    SagaContext,
+)
+
+from src import (
+    PaymentDetail,
+)
+from src.commands.sagas import (
+    _payment,
+    _process_purchase,
+    _process_ticket_entries,
+    _purchase_products,
+    _revert_purchase_products,
+)
+
+
+class TestCreateOrderSaga(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.product_uuid, self.payment_uuid = uuid4(), uuid4()
+        self.context = SagaContext(
+            ticket={"uuid": uuid4(), "quantities": {str(self.product_uuid): 2}, "total_amount": 3.5},
+            payment_detail=PaymentDetail("John Doe", 1234, "10/30", "123"),
+        )
+        self.allocations = {str(self.product_uuid): {str(uuid4()): 2}}
+
+    async def test_process_ticket_entries(self):
+        other = uuid4()
+        entries = [
+            MagicMock(product=self.product_uuid, quantity=2),
+            MagicMock(product=other, quantity=1),
+            MagicMock(product=self.product_uuid, quantity=3),
+        ]
+        ticket = MagicMock(uuid=uuid4(), total_price=12.5)
+        ticket.entries.data = {uuid4(): entry for entry in entries}
+        response = MagicMock(content=AsyncMock(return_value=ticket))
+
+        context = await _process_ticket_entries(SagaContext(), response)
+
+        self.assertEqual(
+            {"uuid": ticket.uuid, "quantities": {str(self.product_uuid): 5, str(other): 1}, "total_amount": 12.5},
+            context["ticket"],
+        )
+
+    async def test_purchase_products(self):
+        request = _purchase_products(self.context)
+        content = await request.content()
+
+        self.assertEqual("PurchaseProducts", request.target)
+        self.assertEqual({str(self.product_uuid): 2}, content.quantities)
+        self.assertIsNone(content.allocations)
+        self.assertEqual("purchase_products", content.step)
+
+    async def test_process_purchase(self):
+        response = MagicMock(content=AsyncMock(return_value={"allocations": self.allocations}))
+
+        context = await _process_purchase(self.context, response)
+
+        self.assertEqual(self.allocations, context["purchase_allocations"])
+
+    async def test_revert_purchase_products(self):
+        self.context["purchase_allocations"] = self.allocations
+
+        request = _revert_purchase_products(self.context)
+        content = await request.content()
+
+        self.assertEqual("PurchaseProducts", request.target)
+        self.assertEqual({str(self.product_uuid): -2}, content.quantities)
+        slot_uuid = next(iter(self.allocations[str(self.product_uuid)]))
+        self.assertEqual({str(self.product_uuid): {slot_uuid: -2}}, content.allocations)
+        self.assertEqual("revert_purchase_products", content.step)
+
+    async def test_payment(self):
+        request = _payment(self.context)
+        content = await request.content()
+
+        self.assertEqual("CreatePayment", request.target)
+        self.assertEqual((1234, 3.5), (content.credit_number, content.amount))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from datetime import (
+    datetime,
+)
+from uuid import (
+    uuid4,
+)
+
+from src import (
+    OrderQueryRepository,
+    PostgreSqlQueryRepository,
+)
+from tests.utils import (
+    build_config,
+)
+
+
+class TestOrderQueryRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        self.config = build_config()
+
+    def test_subclass(self):
+        self.assertTrue(issubclass(OrderQueryRepository, PostgreSqlQueryRepository))
+
+    def test_from_config(self):
+        repository = OrderQueryRepository.from_config(self.config)
+
+        self.assertEqual("order_query_db", repository.database)
+        self.assertEqual(self.config.repository.host, repository.host)
+        self.assertEqual(self.config.repository.port, repository.port)
+        self.assertEqual(5, repository.pool_size)
+        self.assertEqual(10, repository.max_overflow)
+        self.assertEqual(3600, repository.pool_recycle)
+        self.assertEqual(30000, repository.statement_timeout)
+        self.assertIsNone(repository.engine)
+
+    def test_from_config_with_kwargs(self):
+        repository = OrderQueryRepository.from_config(self.config, pool_size=2, statement_timeout=None)
+
+        self.assertEqual(2, repository.pool_size)
+        self.assertIsNone(repository.statement_timeout)
+
+    def test_cursor(self):
+        created_at, uuid = datetime(2021, 10, 7, 12, 30, 5, 123), uuid4()
+        cursor = OrderQueryRepository._encode_cursor(created_at, uuid)
+
+        self.assertEqual((created_at, uuid), OrderQueryRepository._decode_cursor(cursor))
+
+    def test_cursor_invalid(self):
+        with self.assertRaises(ValueError):
+            OrderQueryRepository._decode_cursor("foo")
+
+
+if __name__ == "__main__":
+    unittest.main()
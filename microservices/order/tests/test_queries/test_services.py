@@ -7,7 +7,21 @@ import unittest
 from pathlib import (
     Path,
 )
+from unittest.mock import (
+    AsyncMock,
+)
+from uuid import (
+    uuid4,
+)
+
+from minos.networks import (
+    InMemoryRequest,
+    ResponseException,
+)
 
+from src import (
+    OrderQueryService,
+)
 from tests.utils import (
     build_dependency_injector,
 )
@@ -25,6 +39,36 @@ class TestOrderQueryService(unittest.IsolatedAsyncioTestCase):
     async def asyncTearDown(self) -> None:
         await self.injector.unwire()
 
+    async def test_get_user_orders(self):
+        service = OrderQueryService()
+        service.repository = AsyncMock()
+        service.repository.get_by_user.return_value = ["foo"]
+        uuid = uuid4()
+
+        response = await service.get_user_orders(InMemoryRequest({"uuid": uuid}))
+
+        self.assertEqual(["foo"], await response.content())
+        self.assertEqual([((uuid,), {})], service.repository.get_by_user.call_args_list)
+        self.assertEqual(0, service.repository.get_page_by_user.call_count)
+
+    async def test_get_user_orders_page(self):
+        service = OrderQueryService()
+        service.repository = AsyncMock()
+        service.repository.get_page_by_user.return_value = {"orders": [], "cursor": None}
+        uuid = uuid4()
+
+        response = await service.get_user_orders(InMemoryRequest({"uuid": uuid, "after": "bar", "status": "a,b"}))
+
+        self.assertEqual({"orders": [], "cursor": None}, await response.content())
+        self.assertEqual([((uuid, 20, "bar", ["a", "b"]), {})], service.repository.get_page_by_user.call_args_list)
+
+    async def test_get_user_orders_page_invalid_limit(self):
+        service = OrderQueryService()
+        service.repository = AsyncMock()
+
+        with self.assertRaises(ResponseException):
+            await service.get_user_orders(InMemoryRequest({"uuid": uuid4(), "limit": 1000}))
+
 
 if __name__ == "__main__":
     unittest.main()
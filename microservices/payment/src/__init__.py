@@ -4,6 +4,16 @@ from .aggregates import (
 from .commands import (
     PaymentCommandService,
 )
+from .idempotency import (
+    IdempotencyStore,
+    build_idempotency_key,
+    idempotent_command,
+)
+from .identifiers import (
+    TimeOrderedEventRepository,
+    TimeOrderedUUIDGenerator,
+    uuid7,
+)
 from .queries import (
     PaymentAmountRepository,
     PaymentQueryService,
@@ -0,0 +1,68 @@
+import sys
+import unittest
+from uuid import (
+    uuid4,
+)
+
+from minos.networks import (
+    BrokerMessageV1,
+    BrokerMessageV1Payload,
+    BrokerRequest,
+)
+
+from src import (
+    IdempotencyStore,
+    Payment,
+    PaymentCommandService,
+    idempotent_command,
+)
+from tests.utils import (
+    build_dependency_injector,
+)
+
+
+class _InMemoryIdempotencyStore(IdempotencyStore):
+    """For testing purposes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__("localhost", 5432, "test_db", "minos", "min0s", *args, **kwargs)
+        self.responses = dict()
+
+    async def claim(self, key: bytes, transaction_uuid=None):
+        if key in self.responses:
+            return self.responses[key]
+        self.responses[key] = None
+        return None
+
+    async def complete(self, key: bytes, response: bytes) -> None:
+        self.responses[key] = response
+
+    async def release(self, key: bytes) -> None:
+        del self.responses[key]
+
+
+class TestIdempotency(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.injector = build_dependency_injector()
+        await self.injector.wire(modules=[sys.modules[__name__]])
+
+        self.service = PaymentCommandService()
+        self.store = _InMemoryIdempotencyStore(topics=["CreatePayment"])
+
+    async def asyncTearDown(self) -> None:
+        await self.injector.unwire()
+
+    async def test_create_payment_redelivered(self):
+        message = BrokerMessageV1(
+            "CreatePayment", BrokerMessageV1Payload({"credit_number": 1234, "amount": 3.4}, {"saga": str(uuid4())})
+        )
+
+        one = await idempotent_command(BrokerRequest(message), self.service.create_payment, store=self.store)
+        two = await idempotent_command(BrokerRequest(message), self.service.create_payment, store=self.store)
+
+        self.assertIsInstance(await two.content(), Payment)
+        self.assertEqual(await one.content(), await two.content())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,30 @@
 from .aggregates import (
     Inventory,
+    InventorySlot,
     Product,
 )
 from .commands import (
     ProductCommandService,
 )
+from .idempotency import (
+    IdempotencyStore,
+    build_idempotency_key,
+    idempotent_command,
+)
+from .identifiers import (
+    TimeOrderedEventRepository,
+    TimeOrderedUUIDGenerator,
+    uuid7,
+)
 from .queries import (
+    LRUCache,
+    PostgreSqlQueryRepository,
     ProductQueryRepository,
     ProductQueryService,
+    ProjectionBatcher,
+)
+from .rest import (
+    StreamingResponse,
+    StreamingRestHandler,
+    StreamingRestService,
 )
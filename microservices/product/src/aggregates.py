@@ -5,18 +5,30 @@ from __future__ import (
 from asyncio import (
     gather,
 )
+from random import (
+    randrange,
+)
+from typing import (
+    Optional,
+)
 from uuid import (
     UUID,
 )
 
 from minos.aggregate import (
     Aggregate,
+    TransactionEntry,
     ValueObject,
 )
 
 
 class Product(Aggregate):
-    """Product class."""
+    """Product class.
+
+    The inventory can be optionally sharded across several ``InventorySlot`` instances. In that case, the reservations
+    and purchases are performed against the slots, so that they do not contend on the product version, and the
+    ``inventory`` field contains the totals computed by the last rebalance.
+    """
 
     code: str
     title: str
@@ -24,6 +36,15 @@ class Product(Aggregate):
     price: float
 
     inventory: Inventory
+    inventory_slots: Optional[list[UUID]]
+
+    @property
+    def is_sharded(self) -> bool:
+        """Check if the inventory is sharded across several slots.
+
+        :return: ``True`` if the inventory is sharded or ``False`` otherwise.
+        """
+        return bool(self.inventory_slots)
 
     def set_inventory_amount(self, amount: int) -> None:
         """Update the inventory amount.
@@ -41,57 +62,251 @@ class Product(Aggregate):
         """
         self.inventory = self.inventory.update_amount(amount_diff)
 
+    async def get_inventory_slots(self) -> list[InventorySlot]:
+        """Get the inventory slots of the product.
+
+        :return: A list of ``InventorySlot`` instances.
+        """
+        if not self.is_sharded:
+            return list()
+        return list(await gather(*(InventorySlot.get(uuid) for uuid in self.inventory_slots)))
+
+    async def shard_inventory(self, slots: int) -> None:
+        """Split the inventory across the given number of slots.
+
+        If the inventory was already sharded, the previous slots are merged before splitting it again. A number of
+        slots lower than two disables the sharded mode.
+
+        :param slots: The number of slots.
+        :return: This method does not return anything.
+        """
+        previous = await self.get_inventory_slots()
+        if previous:
+            self.inventory = Inventory.merge(*(slot.inventory for slot in previous))
+
+        if slots > 1:
+            created = await gather(
+                *(InventorySlot.create(self.uuid, inventory) for inventory in self.inventory.split(slots))
+            )
+            self.inventory_slots = [slot.uuid for slot in created]
+        else:
+            self.inventory_slots = None
+
+        await self.save()
+        await gather(*(slot.delete() for slot in previous))
+
+    async def update_inventory_slots_amount(self, amount_diff: int) -> None:
+        """Update the amount of a sharded inventory.
+
+        :param amount_diff: The difference from the actual amount.
+        :return: This method does not return anything.
+        """
+        slots = await self.get_inventory_slots()
+        slots[0].inventory = slots[0].inventory.update_amount(amount_diff)
+        await self._rebalance_inventory(slots)
+
+    async def set_inventory_slots_amount(self, amount: int) -> None:
+        """Set the amount of a sharded inventory.
+
+        :param amount: The new inventory amount.
+        :return: This method does not return anything.
+        """
+        slots = await self.get_inventory_slots()
+        amount_diff = amount - sum(slot.inventory.amount for slot in slots)
+        slots[0].inventory = slots[0].inventory.update_amount(amount_diff)
+        await self._rebalance_inventory(slots)
+
+    async def rebalance_inventory(self) -> None:
+        """Spread the available units evenly across the inventory slots and refresh the inventory totals.
+
+        :return: This method does not return anything.
+        """
+        await self._rebalance_inventory(await self.get_inventory_slots())
+
+    async def _rebalance_inventory(self, slots: list[InventorySlot]) -> None:
+        if not slots:
+            return
+
+        available = sum(slot.inventory.available for slot in slots)
+        share, remainder = divmod(available, len(slots))
+        for i, slot in enumerate(slots):
+            slot.inventory = slot.inventory.set_amount(slot.inventory.reserved + share + (i < remainder))
+
+        await gather(*(slot.save() for slot in slots))
+
+        self.inventory = Inventory.merge(*(slot.inventory for slot in slots))
+        await self.save()
+
     @classmethod
     async def reserve(cls, quantities: dict[UUID, int]) -> None:
         """Reserve product quantities.
 
-        :param quantities: A dictionary in which the keys are the ``Product`` identifiers and the values are
-        the number
+        The feasibility of the whole reservation is checked before anything is persisted, so an unsatisfiable
+        reservation does not store any event. When called from a saga step, the writes are performed within the
+        saga's transaction, so they are committed or rejected together.
+
+        :param quantities: A dictionary in which the keys are the ``Product`` identifiers and the values are the number
             of units to be reserved.
-        :return: ``True`` if all products can be satisfied or ``False`` otherwise.
+        :return: This method does not return anything.
         """
-        feasible = True
         products = await gather(*(Product.get(uuid) for uuid in quantities.keys()))
-        for product in products:
-            inventory = product.inventory
-            reserved = inventory.reserved
-            if feasible and (inventory.amount - reserved) < quantities[product.uuid]:
-                feasible = False
-            reserved += quantities[product.uuid]
-            product.inventory = Inventory(inventory.amount, reserved, inventory.sold)
-            await product.save()
-
-        if not feasible:
-            await cls.reserve({k: -v for k, v in quantities.items()})
+
+        sharded = [product for product in products if product.is_sharded]
+        products = [product for product in products if not product.is_sharded]
+
+        if not all(product.inventory.is_reservable(quantities[product.uuid]) for product in products):
             raise ValueError("The reservation query could not be satisfied.")
 
+        allocations = await gather(
+            *(InventorySlot.allocate(product, quantities[product.uuid], "available", "reserved") for product in sharded)
+        )
+        if not all(allocation is not None for allocation in allocations):
+            raise ValueError("The reservation query could not be satisfied.")
+
+        for product in products:
+            product.inventory = product.inventory.reserve(quantities[product.uuid])
+
+        slots = list()
+        for allocation in allocations:
+            for slot, quantity in allocation:
+                slot.inventory = slot.inventory.reserve(quantity)
+                slots.append(slot)
+
+        await _save_all(*products, *slots)
+
     @classmethod
-    async def purchase(cls, quantities: dict[UUID, int]) -> None:
+    async def purchase(
+        cls, quantities: dict[UUID, int], allocations: Optional[dict[UUID, dict[UUID, int]]] = None
+    ) -> dict[UUID, dict[UUID, int]]:
         """Purchase products.
 
-        :param quantities: A dictionary in which the keys are the ``Product`` identifiers and the values are
-        the number
-            of units to be reserved.
-        :return: ``True`` if all products can be satisfied or ``False`` otherwise.
+        The feasibility of the whole purchase is checked before anything is persisted. The units of the sharded
+        products are taken from their slots, and the per-slot allocation is returned so that the purchase can be
+        undone exactly by purchasing the opposite quantities with the opposite allocation.
+
+        :param quantities: A dictionary in which the keys are the ``Product`` identifiers and the values are the number
+            of units to be purchased. Negative values undo a previous purchase.
+        :param allocations: An optional dictionary in which the keys are the sharded ``Product`` identifiers and the
+            values are the number of units to be purchased on each ``InventorySlot``. If it is not given, the units are
+            allocated across the slots.
+        :return: A dictionary in which the keys are the sharded ``Product`` identifiers and the values are the number
+            of units purchased on each ``InventorySlot``.
         """
-        feasible = True
+        if allocations is None:
+            allocations = dict()
+
         products = await gather(*(Product.get(uuid) for uuid in quantities.keys()))
-        for product in products:
-            inventory = product.inventory
-            reserved = inventory.reserved
-            sold = inventory.sold
-            amount = inventory.amount - quantities[product.uuid]
-            if feasible and amount <= quantities[product.uuid]:
-                feasible = False
-            reserved -= quantities[product.uuid]
-            sold += quantities[product.uuid]
-            product.inventory = Inventory(amount, reserved, sold)
-            await product.save()
-
-        if not feasible:
-            await cls.purchase({k: -v for k, v in quantities.items()})
+
+        sharded = [product for product in products if product.is_sharded]
+        products = [product for product in products if not product.is_sharded]
+
+        if not all(product.inventory.is_purchasable(quantities[product.uuid]) for product in products):
             raise ValueError("The purchase products query could not be satisfied.")
 
+        slot_allocations = await gather(
+            *(
+                cls._allocate_purchase(product, quantities[product.uuid], allocations.get(product.uuid))
+                for product in sharded
+            )
+        )
+        if not all(allocation is not None for allocation in slot_allocations):
+            raise ValueError("The purchase products query could not be satisfied.")
+
+        for product in products:
+            product.inventory = product.inventory.purchase(quantities[product.uuid])
+
+        slots = list()
+        for allocation in slot_allocations:
+            for slot, quantity in allocation:
+                slot.inventory = slot.inventory.purchase(quantity)
+                slots.append(slot)
+
+        await _save_all(*products, *slots)
+
+        return {
+            product.uuid: {slot.uuid: quantity for slot, quantity in allocation}
+            for product, allocation in zip(sharded, slot_allocations)
+        }
+
+    @staticmethod
+    async def _allocate_purchase(
+        product: Product, quantity: int, allocation: Optional[dict[UUID, int]]
+    ) -> Optional[list[tuple[InventorySlot, int]]]:
+        if allocation is None:
+            return await InventorySlot.allocate(product, quantity, "reserved", "sold")
+
+        if sum(allocation.values()) != quantity or not set(allocation.keys()) <= set(product.inventory_slots):
+            return None
+        slots = await gather(*(InventorySlot.get(uuid) for uuid in allocation.keys()))
+        if not all(slot.inventory.is_purchasable(allocation[slot.uuid]) for slot in slots):
+            return None
+        return [(slot, allocation[slot.uuid]) for slot in slots]
+
+
+async def _save_all(*aggregates: Aggregate) -> None:
+    if len(aggregates) < 2:
+        await gather(*(aggregate.save() for aggregate in aggregates))
+        return
+
+    # The events are staged on a nested transaction, so that they are merged all together into the outer one (or
+    # committed, if there is no outer one) only if none of the saves has failed or conflicts with a concurrent write.
+    transaction = TransactionEntry(autocommit=False)
+    async with transaction:
+        try:
+            await gather(*(aggregate.save() for aggregate in aggregates))
+        except Exception:
+            await transaction.reject()
+            raise
+    await transaction.commit()
+
+
+class InventorySlot(Aggregate):
+    """Inventory Slot class.
+
+    Each slot holds a share of the inventory of a sharded ``Product``, so that it can be reserved independently.
+    """
+
+    product: UUID
+    inventory: Inventory
+
+    @staticmethod
+    async def allocate(
+        product: Product, quantity: int, source: str, target: str
+    ) -> Optional[list[tuple[InventorySlot, int]]]:
+        """Allocate the given quantity across the inventory slots of a product.
+
+        The units are taken from the ``source`` counter of the slots, or from the ``target`` one if the quantity is
+        negative. The slots are visited starting from a random one, so that concurrent allocations are spread across
+        them, and a single slot is preferred if it can satisfy the whole quantity.
+
+        :param product: The sharded product.
+        :param quantity: The number of units to be allocated. Negative values undo a previous allocation.
+        :param source: The name of the inventory counter from which the units are taken.
+        :param target: The name of the inventory counter to which the units are moved.
+        :return: A list of ``(slot, quantity)`` pairs or ``None`` if the quantity cannot be satisfied.
+        """
+        sign, counter = (1, source) if quantity >= 0 else (-1, target)
+        remaining = abs(quantity)
+
+        slots = await product.get_inventory_slots()
+        offset = randrange(len(slots))
+        slots = slots[offset:] + slots[:offset]
+
+        for slot in slots:
+            if remaining <= getattr(slot.inventory, counter):
+                return [(slot, sign * remaining)]
+
+        allocation = list()
+        for slot in slots:
+            current = min(remaining, getattr(slot.inventory, counter))
+            if current > 0:
+                allocation.append((slot, sign * current))
+                remaining -= current
+            if not remaining:
+                return allocation
+
+        return None
+
 
 class Inventory(ValueObject):
     """Inventory Object Value class."""
@@ -123,3 +338,69 @@ class Inventory(ValueObject):
         :return: An ``Inventory`` instance.
         """
         return Inventory(self.amount + amount_diff, self.reserved, self.sold)
+
+    def is_reservable(self, quantity: int) -> bool:
+        """Check if the given quantity can be reserved.
+
+        :param quantity: The number of units to be reserved. Negative values release already reserved units.
+        :return: ``True`` if the quantity can be reserved or ``False`` otherwise.
+        """
+        return quantity <= self.amount - self.reserved
+
+    def reserve(self, quantity: int) -> Inventory:
+        """Create a new inventory with updated reserved units.
+
+        :param quantity: The number of units to be reserved. Negative values release already reserved units.
+        :return: An ``Inventory`` instance.
+        """
+        return Inventory(self.amount, self.reserved + quantity, self.sold)
+
+    def is_purchasable(self, quantity: int) -> bool:
+        """Check if the given quantity can be purchased.
+
+        :param quantity: The number of reserved units to be sold. Negative values undo already sold units.
+        :return: ``True`` if the quantity can be purchased or ``False`` otherwise.
+        """
+        if quantity >= 0:
+            return quantity <= self.reserved
+        return -quantity <= self.sold
+
+    def purchase(self, quantity: int) -> Inventory:
+        """Create a new inventory in which the given reserved units are sold.
+
+        :param quantity: The number of units to be sold. Negative values undo already sold units.
+        :return: An ``Inventory`` instance.
+        """
+        return Inventory(self.amount - quantity, self.reserved - quantity, self.sold + quantity)
+
+    @property
+    def available(self) -> int:
+        """Get the number of units that can be reserved.
+
+        :return: An integer value.
+        """
+        return self.amount - self.reserved
+
+    def split(self, parts: int) -> list[Inventory]:
+        """Split the inventory into the given number of parts, as evenly as possible.
+
+        :param parts: The number of parts.
+        :return: A list of ``Inventory`` instances.
+        """
+        return [
+            Inventory(*(value // parts + (i < value % parts) for value in (self.amount, self.reserved, self.sold)))
+            for i in range(parts)
+        ]
+
+    @staticmethod
+    def merge(*inventories: Inventory) -> Inventory:
+        """Merge the given inventories into a single one.
+
+        :param inventories: The inventories to be merged.
+        :return: An ``Inventory`` instance.
+        """
+        return Inventory(
+            sum(inventory.amount for inventory in inventories),
+            sum(inventory.reserved for inventory in inventories),
+            sum(inventory.sold for inventory in inventories),
+        )
@@ -6,6 +6,7 @@ from uuid import (
 
 from minos.aggregate import (
     AggregateNotFoundException,
+    Condition,
     DeletedAggregateException,
 )
 from minos.common import (
@@ -67,8 +68,11 @@ class ProductCommandService(CommandService):
         amount = content["amount"]
 
         product = await Product.get(uuid)
-        product.set_inventory_amount(amount)
-        await product.save()
+        if product.is_sharded:
+            await product.set_inventory_slots_amount(amount)
+        else:
+            product.set_inventory_amount(amount)
+            await product.save()
 
         return Response(product)
 
@@ -85,11 +89,45 @@ class ProductCommandService(CommandService):
         amount_diff = content["amount_diff"]
 
         product = await Product.get(uuid)
-        product.update_inventory_amount(amount_diff)
-        await product.save()
+        if product.is_sharded:
+            await product.update_inventory_slots_amount(amount_diff)
+        else:
+            product.update_inventory_amount(amount_diff)
+            await product.save()
 
         return Response(product)
 
+    @enroute.rest.command(f"/products/{{uuid:{UUID_REGEX.pattern}}}/inventory/slots", "PUT")
+    async def shard_inventory(self, request: RestRequest) -> Response:
+        """Split the product inventory across the given number of slots.
+
+        :param request: ``Request`` that contains the needed information.
+        :return: ``Response`` containing the updated product.
+        """
+        content = await request.content()
+        params = await request.params()
+        uuid = params["uuid"]
+        slots = content["slots"]
+
+        product = await Product.get(uuid)
+        await product.shard_inventory(slots)
+
+        return Response(product)
+
+    # noinspection PyUnusedLocal
+    @enroute.periodic.event("* * * * *")
+    async def rebalance_inventories(self, request: Request) -> None:
+        """Rebalance the inventory slots of the sharded products.
+
+        :param request: A request without any content.
+        :return: This method does not return anything.
+        """
+        async for product in Product.find(Condition.NOT(Condition.EQUAL("inventory_slots", None))):
+            try:
+                await product.rebalance_inventory()
+            except Exception as exc:
+                logger.warning(f"The inventory of {product.uuid!r} could not be rebalanced: {exc!r}")
+
     @update_inventory.check(max_attempts=1)
     @update_inventory_diff.check()
     async def check_positive_inventory(self, request: RestRequest) -> bool:
@@ -175,6 +213,8 @@ class ProductCommandService(CommandService):
 
         try:
             product = await Product.get(uuid)
+            if product.is_sharded:
+                await product.shard_inventory(0)
             await product.delete()
         except (DeletedAggregateException, AggregateNotFoundException):
             raise ResponseException("The product does not exist.")
@@ -198,19 +238,29 @@ class ProductCommandService(CommandService):
             raise ResponseException(f"There is not enough product amount: {exc!r}")
 
     @enroute.broker.command("PurchaseProducts")
-    async def purchase_products(self, request: Request) -> None:
+    async def purchase_products(self, request: Request) -> Response:
         """Purchase the requested quantities of products.
 
-        :param: request: The ``Request`` instance that contains the quantities dictionary.
-        :return: A ``Response containing a ``ValidProductInventoryList`` DTO.
+        :param: request: The ``Request`` instance that contains the quantities dictionary and, optionally, the per-slot
+            allocations of the sharded products.
+        :return: A ``Response`` containing the per-slot allocations of the sharded products, which must be sent back
+            with the opposite quantities to undo the purchase.
         """
         content = await request.content()
 
         quantities = {UUID(k): v for k, v in content["quantities"].items()}
+        allocations = None
+        if "allocations" in content and (raw := content["allocations"]) is not None:
+            allocations = {UUID(k): {UUID(slot): v for slot, v in allocation.items()} for k, allocation in raw.items()}
 
         try:
-            await Product.purchase(quantities)
+            allocations = await Product.purchase(quantities, allocations)
         except (AggregateNotFoundException, DeletedAggregateException) as exc:
             raise ResponseException(f"Some products do not exist: {exc!r}")
         except Exception as exc:
             raise ResponseException(f"There is not enough product amount: {exc!r}")
+
+        allocations = {
+            str(k): {str(slot): v for slot, v in allocation.items()} for k, allocation in allocations.items()
+        }
+        return Response({"allocations": allocations})
@@ -0,0 +1,262 @@
+from __future__ import (
+    annotations,
+)
+
+import json
+import logging
+from asyncio import (
+    sleep,
+)
+from collections.abc import (
+    Awaitable,
+    Callable,
+    Iterable,
+)
+from hashlib import (
+    sha256,
+)
+from time import (
+    monotonic,
+)
+from typing import (
+    Optional,
+)
+from uuid import (
+    UUID,
+)
+
+from dependency_injector.wiring import (
+    Provide,
+    inject,
+)
+from minos.aggregate import (
+    TRANSACTION_CONTEXT_VAR,
+)
+from minos.common import (
+    AvroDataEncoder,
+    MinosConfig,
+    MinosConfigException,
+    PostgreSqlMinosDatabase,
+)
+from minos.networks import (
+    BrokerMessage,
+    BrokerMessageV1Payload,
+    BrokerMessageV1Status,
+    BrokerRequest,
+    Request,
+    Response,
+    ResponseException,
+)
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "idempotency_key"
+
+
+class IdempotencyStore(PostgreSqlMinosDatabase):
+    """Idempotency Store class.
+
+    The responses of the processed commands are stored by the digest of the request, so that a redelivered request is
+    answered with the stored response instead of being executed again. A request is claimed for ``lease`` seconds
+    while it is being executed and its response is kept for ``ttl`` seconds, after which its entry may be reclaimed.
+
+    The changes of a command received within a saga are stored on the saga transaction, which is committed or rejected
+    later by the saga, so each entry is bound to that transaction: once the transaction is rejected, its changes are
+    discarded and the entry is reclaimed, so that the request is executed again instead of being replayed. The store
+    must share the database of the transaction repository.
+
+    Each microservice is built from its own directory, so this module is kept identical in every microservice that
+    has idempotent commands (``make check-shared`` verifies it).
+    """
+
+    def __init__(
+        self,
+        *args,
+        topics: Iterable[str] = tuple(),
+        ttl: float = 86400,
+        lease: float = 60,
+        poll_interval: float = 0.1,
+        purge_interval: float = 3600,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.topics = frozenset(topics)
+        self.ttl = ttl
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.purge_interval = purge_interval
+
+        self._last_purge = monotonic()
+
+    @classmethod
+    def _from_config(cls, *args, config: MinosConfig, **kwargs) -> IdempotencyStore:
+        try:
+            # noinspection PyProtectedMember
+            kwargs = dict(config._get("idempotency")) | kwargs
+        except MinosConfigException:
+            pass
+        return cls(*args, **(config.repository._asdict() | kwargs))
+
+    async def _setup(self) -> None:
+        await self.submit_query(_CREATE_TABLE_QUERY)
+
+    async def claim(self, key: bytes, transaction_uuid: Optional[UUID] = None) -> Optional[bytes]:
+        """Claim the execution of a request.
+
+        If the request is being executed by another consumer, it waits until the request is completed or its lease
+        expires.
+
+        :param key: The digest of the request.
+        :param transaction_uuid: The identifier of the transaction in which the request is executed, if any.
+        :return: The stored response if the request was already processed or ``None`` if it has been claimed.
+        """
+        if monotonic() - self._last_purge > self.purge_interval:
+            await self.purge()
+
+        while True:
+            rows = [
+                row
+                async for row in self.submit_query_and_iter(
+                    _CLAIM_QUERY, {"key": key, "transaction_uuid": transaction_uuid, "lease": self.lease}
+                )
+            ]
+            if rows:
+                claimed, response = rows[0]
+                if claimed:
+                    return None
+                if response is not None:
+                    return bytes(response)
+            await sleep(self.poll_interval)
+
+    async def complete(self, key: bytes, response: bytes) -> None:
+        """Store the response of a claimed request.
+
+        :param key: The digest of the request.
+        :param response: The encoded response.
+        :return: This method does not return anything.
+        """
+        await self.submit_query(_COMPLETE_QUERY, {"key": key, "response": response, "ttl": self.ttl})
+
+    async def release(self, key: bytes) -> None:
+        """Release a claimed request without storing any response, so that it can be executed again.
+
+        :param key: The digest of the request.
+        :return: This method does not return anything.
+        """
+        await self.submit_query(_RELEASE_QUERY, {"key": key})
+
+    async def purge(self) -> None:
+        """Delete the expired entries.
+
+        :return: This method does not return anything.
+        """
+        self._last_purge = monotonic()
+        await self.submit_query(_PURGE_QUERY)
+
+
+def build_idempotency_key(message: BrokerMessage) -> bytes:
+    """Build the digest that identifies a request.
+
+    The requests sent within a saga execution (or with an explicit ``idempotency_key`` header) are identified by their
+    scope, topic and content, so that a request sent again by the saga is also recognized. Otherwise, the message
+    identifier is used, which is kept on redelivery.
+
+    The remote steps of a saga cannot set any header, so the requests sent to the same topic from different steps are
+    told apart by the ``step`` field of their content.
+
+    :param message: The received message.
+    :return: A ``bytes`` digest.
+    """
+    scope = message.headers.get(IDEMPOTENCY_KEY_HEADER) or message.headers.get("saga")
+    if scope is None:
+        raw = f"{message.topic}:{message.identifier!s}".encode()
+    else:
+        content = json.dumps(AvroDataEncoder(message.content).build(), sort_keys=True)
+        raw = f"{message.topic}:{scope}:{content}".encode()
+    return sha256(raw).digest()
+
+
+@inject
+async def idempotent_command(
+    request: Request,
+    inner: Callable[[Request], Awaitable[Optional[Response]]],
+    store: IdempotencyStore = Provide["idempotency_store"],
+) -> Optional[Response]:
+    """Execute the command at most once per request, replaying the stored response if it was already processed.
+
+    :param request: The request containing the data.
+    :param inner: The inner handling function to be executed.
+    :param store: The idempotency store.
+    :return: The response generated by the inner handling function or the stored one.
+    """
+    if isinstance(store, Provide) or not isinstance(request, BrokerRequest) or request.raw.topic not in store.topics:
+        return await inner(request)
+
+    key = build_idempotency_key(request.raw)
+    transaction = TRANSACTION_CONTEXT_VAR.get()
+    transaction_uuid = transaction.uuid if transaction is not None else None
+
+    if (stored := await store.claim(key, transaction_uuid)) is not None:
+        logger.info(f"Replaying the stored response of a {request.raw.topic!r} request...")
+        payload = BrokerMessageV1Payload.from_avro_bytes(stored)
+        if not payload.ok:
+            raise ResponseException(payload.content)
+        return Response(payload.content)
+
+    try:
+        response = await inner(request)
+    except ResponseException as exc:
+        await store.complete(key, BrokerMessageV1Payload(str(exc), status=BrokerMessageV1Status.ERROR).avro_bytes)
+        raise
+    except Exception:
+        await store.release(key)
+        raise
+
+    content = await response.content() if response is not None else None
+    await store.complete(key, BrokerMessageV1Payload(content).avro_bytes)
+    return response
+
+
+_CREATE_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS processed_command (
+    key BYTEA NOT NULL PRIMARY KEY,
+    transaction_uuid UUID,
+    response BYTEA,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+""".strip()
+
+_CLAIM_QUERY = """
+WITH claimed AS (
+    INSERT INTO processed_command (key, transaction_uuid, response, expires_at)
+    VALUES (%(key)s, %(transaction_uuid)s, NULL, NOW() + %(lease)s * INTERVAL '1 second')
+    ON CONFLICT (key)
+    DO
+       UPDATE SET transaction_uuid = EXCLUDED.transaction_uuid, response = NULL, expires_at = EXCLUDED.expires_at
+       WHERE processed_command.expires_at < NOW()
+          OR processed_command.transaction_uuid IN (
+              SELECT uuid FROM aggregate_transaction WHERE status = 'rejected'
+          )
+    RETURNING key
+)
+SELECT TRUE, NULL::BYTEA FROM claimed
+UNION ALL
+SELECT FALSE, response FROM processed_command
+WHERE key = %(key)s AND expires_at >= NOW() AND NOT EXISTS (SELECT 1 FROM claimed);
+""".strip()
+
+_COMPLETE_QUERY = """
+UPDATE processed_command
+SET response = %(response)s, expires_at = NOW() + %(ttl)s * INTERVAL '1 second'
+WHERE key = %(key)s;
+""".strip()
+
+_RELEASE_QUERY = """
+DELETE FROM processed_command
+WHERE key = %(key)s AND response IS NULL;
+""".strip()
+
+_PURGE_QUERY = """
+DELETE FROM processed_command
+WHERE expires_at < NOW();
+""".strip()
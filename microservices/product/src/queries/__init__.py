@@ -1,3 +1,12 @@
+from .abc import (
+    PostgreSqlQueryRepository,
+)
+from .batchers import (
+    ProjectionBatcher,
+)
+from .caches import (
+    LRUCache,
+)
 from .repositories import (
     ProductQueryRepository,
 )
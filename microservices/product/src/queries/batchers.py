@@ -0,0 +1,136 @@
+from __future__ import (
+    annotations,
+)
+
+import logging
+from asyncio import (
+    Future,
+    Task,
+    TimerHandle,
+    gather,
+    get_running_loop,
+)
+from contextvars import (
+    Context,
+)
+from typing import (
+    Optional,
+)
+
+from minos.aggregate import (
+    AggregateDiff,
+)
+from minos.common import (
+    MinosConfig,
+    MinosConfigException,
+    MinosSetup,
+)
+
+from .repositories import (
+    ProductQueryRepository,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ProjectionBatcher(MinosSetup):
+    """Projection Batcher class.
+
+    The product events handled concurrently are applied together through ``ProductQueryRepository.project``, so that a
+    backlog of events is projected with a few multi-row statements per transaction instead of one statement and one
+    commit per event. Each submitter waits until its event has been committed, so that the broker only acknowledges
+    projected events.
+
+    A batch is flushed after ``window`` milliseconds (the next loop iteration by default) unless another batch is
+    already being projected, in which case the events wait for it to finish, so that batches only grow when the
+    database is the bottleneck. A batch cannot hold more events than the number of requests handled concurrently by
+    the broker handler (15 by default), so ``max_size`` is sized to it. Only the product read model is batched: the
+    cart and ticket projections of product events are still applied one by one.
+    """
+
+    def __init__(self, repository: ProductQueryRepository, *args, window: float = 0, max_size: int = 15, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.repository = repository
+        self.window = window
+        self.max_size = max_size
+
+        self._pending: list[tuple[AggregateDiff, Future]] = list()
+        self._timer: Optional[TimerHandle] = None
+        self._tasks: set[Task] = set()
+
+    @classmethod
+    def _from_config(
+        cls, *args, config: MinosConfig, product_repository: ProductQueryRepository, **kwargs
+    ) -> ProjectionBatcher:
+        try:
+            # noinspection PyProtectedMember
+            kwargs = dict(config._get("projections")) | kwargs
+        except MinosConfigException:
+            pass
+        return cls(product_repository, *args, **kwargs)
+
+    async def _destroy(self) -> None:
+        self._flush()
+        await gather(*self._tasks, return_exceptions=True)
+
+    async def submit(self, diff: AggregateDiff) -> None:
+        """Project a product event within the next batch.
+
+        :param diff: The product difference to be projected.
+        :return: This method does not return anything.
+        """
+        loop = get_running_loop()
+        future = loop.create_future()
+        self._pending.append((diff, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None and not self._tasks:
+            self._timer = loop.call_later(self.window / 1000, self._flush)
+
+        await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, list()
+
+        # The batch is processed on an empty context, so that it is not bound to the context of any submitter.
+        task = Context().run(get_running_loop().create_task, self._process(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: Task) -> None:
+        self._tasks.discard(task)
+        if not self._tasks:
+            # The events submitted while the previous batch was being projected are not delayed any longer.
+            self._flush()
+
+    async def _process(self, batch: list[tuple[AggregateDiff, Future]]) -> None:
+        logger.debug(f"Projecting a batch of {len(batch)} product events...")
+        try:
+            await self.repository.project([diff for diff, _ in batch])
+            results = [None] * len(batch)
+        except Exception as exc:
+            logger.warning(f"The batch could not be projected, so each event is projected apart: {exc!r}")
+            results = [await self._process_one(diff) for diff, _ in batch]
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if result is None:
+                future.set_result(None)
+            else:
+                future.set_exception(result)
+
+    async def _process_one(self, diff: AggregateDiff) -> Optional[Exception]:
+        try:
+            await self.repository.project([diff])
+        except Exception as exc:
+            return exc
+        return None
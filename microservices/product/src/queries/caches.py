@@ -0,0 +1,128 @@
+from __future__ import (
+    annotations,
+)
+
+from collections import (
+    OrderedDict,
+)
+from collections.abc import (
+    Hashable,
+)
+from time import (
+    monotonic,
+)
+from typing import (
+    Any,
+    Optional,
+)
+
+
+class LRUCache:
+    """Least Recently Used Cache class.
+
+    The entries are evicted when the maximum size is reached or when they are older than the time to live. Every
+    invalidation of a key bumps the version of the cache, so a value is only stored if its key has not been invalidated
+    since the version obtained before reading it.
+
+    Each microservice is built from its own directory, so this module is kept identical in every microservice that
+    caches its queries (``make check-shared`` verifies it).
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._versions: OrderedDict[Hashable, int] = OrderedDict()
+        self._last_version = 0
+        self._evicted_version = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get the value related with the given key.
+
+        :param key: The key of the entry.
+        :return: The stored value or ``None`` if it is missing or expired.
+        """
+        if key not in self._entries:
+            self.misses += 1
+            return None
+
+        created_at, value = self._entries[key]
+        if self.ttl is not None and monotonic() - created_at > self.ttl:
+            del self._entries[key]
+            self.evictions += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def version(self) -> int:
+        """Get the current version of the cache.
+
+        :return: An integer value that increases every time a key is invalidated.
+        """
+        return self._last_version
+
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None) -> bool:
+        """Store a value.
+
+        :param key: The key of the entry.
+        :param value: The value to be stored.
+        :param version: The version of the cache obtained before reading the value. If the key has been invalidated
+            since then, the value is not stored.
+        :return: ``True`` if the value has been stored or ``False`` otherwise.
+        """
+        if version is not None and version < self._versions.get(key, self._evicted_version):
+            return False
+
+        self._entries[key] = (monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+        return True
+
+    def discard(self, key: Hashable) -> None:
+        """Remove the entry related with the given key and bump the version of the cache.
+
+        :param key: The key of the entry.
+        :return: This method does not return anything.
+        """
+        self._entries.pop(key, None)
+
+        self._last_version += 1
+        self._versions[key] = self._last_version
+        self._versions.move_to_end(key)
+        while len(self._versions) > self.max_size:
+            # The forgotten keys fall back to the newest evicted version, so older reads are still rejected.
+            _, version = self._versions.popitem(last=False)
+            self._evicted_version = max(self._evicted_version, version)
+
+    def clear(self) -> None:
+        """Remove all the entries.
+
+        :return: This method does not return anything.
+        """
+        self._entries.clear()
+        self._versions.clear()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Get the cache counters.
+
+        :return: A dictionary containing the size, hits, misses and evictions.
+        """
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
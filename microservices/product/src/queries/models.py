@@ -6,12 +6,16 @@ from minos.common import (
     ModelType,
 )
 from sqlalchemy import (
+    Boolean,
     Column,
+    Index,
     Integer,
     MetaData,
     Numeric,
     Table,
     Text,
+    case,
+    cast,
 )
 from sqlalchemy.dialects.postgresql import UUID as UUID_PG
 
@@ -26,10 +30,33 @@ PRODUCT_TABLE = Table(
     Column("description", Text, nullable=False),
     Column("price", Numeric, nullable=False),
     Column("reviews_count", Integer, default=0),
-    Column("reviews_score", Numeric, default=0),
+    Column("reviews_total", Integer, default=0),
     Column("inventory_amount", Integer, nullable=False),
     Column("inventory_reserved", Integer, nullable=False),
     Column("inventory_sold", Integer, nullable=False),
+    Index("product_price_uuid_idx", "price", "uuid"),
+)
+
+# The rating average is derived from the exact score total on every read instead of being stored.
+PRODUCT_COLUMNS = {name: column for name, column in PRODUCT_TABLE.columns.items() if name != "reviews_total"} | {
+    "reviews_score": case(
+        (
+            PRODUCT_TABLE.columns.reviews_count > 0,
+            cast(PRODUCT_TABLE.columns.reviews_total, Numeric) / PRODUCT_TABLE.columns.reviews_count,
+        ),
+        else_=0,
+    ).label("reviews_score"),
+}
+
+PRODUCT_REVIEW_TABLE = Table(
+    "product_review",
+    META,
+    Column("uuid", UUID_PG(as_uuid=True), primary_key=True),
+    Column("product_uuid", UUID_PG(as_uuid=True), index=True),
+    Column("score", Integer),
+    Column("deleted", Boolean, nullable=False, default=False),
+    Column("version", Integer, nullable=False),
+    Column("counted_score", Integer),
 )
 
 ProductDTO = ModelType.build(
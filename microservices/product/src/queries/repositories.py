@@ -2,58 +2,197 @@ from __future__ import (
     annotations,
 )
 
+import json
+from base64 import (
+    urlsafe_b64decode,
+    urlsafe_b64encode,
+)
+from collections import (
+    defaultdict,
+)
+from collections.abc import (
+    Iterable,
+)
+from decimal import (
+    Decimal,
+)
+from operator import (
+    attrgetter,
+)
 from typing import (
+    Any,
+    AsyncIterator,
     Optional,
 )
 from uuid import (
     UUID,
 )
 
+from aiopg.sa import (
+    SAConnection,
+)
 from minos.aggregate import (
+    Action,
+    AggregateDiff,
     FieldDiff,
 )
 from minos.common import (
     MinosConfig,
-    MinosSetup,
+    MinosConfigException,
 )
 from sqlalchemy import (
-    create_engine,
+    and_,
+    case,
+    column,
+    func,
+    not_,
+    or_,
+    select,
+    tuple_,
+    values,
+)
+from sqlalchemy.dialects.postgresql import (
+    insert,
 )
 
+from .abc import (
+    PostgreSqlQueryRepository,
+)
+from .caches import (
+    LRUCache,
+)
 from .models import (
     META,
+    PRODUCT_COLUMNS,
+    PRODUCT_REVIEW_TABLE,
     PRODUCT_TABLE,
     ProductDTO,
 )
 
 
-class ProductQueryRepository(MinosSetup):
-    """ProductInventory Repository class."""
+class ProductQueryRepository(PostgreSqlQueryRepository):
+    """ProductInventory Repository class.
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.engine = create_engine("postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}".format(**kwargs))
+    The products are read through an in-process cache, which is invalidated by the writes performed from the event
+    handlers. The cache is local to each replica, while each event is only handled by one of them, so the entries of the
+    rest of replicas are not invalidated: their time to live is kept short on purpose, as it bounds how long they can
+    serve a stale product.
+    """
 
-    async def _setup(self) -> None:
-        META.create_all(self.engine)
+    metadata = META
+
+    def __init__(self, *args, cache_max_size: int = 1024, cache_ttl: Optional[float] = 5, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = LRUCache(cache_max_size, cache_ttl)
 
     @classmethod
     def _from_config(cls, *args, config: MinosConfig, **kwargs) -> ProductQueryRepository:
-        return cls(*args, **(config.repository._asdict() | {"database": "product_query_db"}) | kwargs)
+        return cls(
+            *args,
+            **(config.repository._asdict() | {"database": "product_query_db"})
+            | cls._pool_config(config)
+            | cls._cache_config(config)
+            | kwargs,
+        )
+
+    @staticmethod
+    def _cache_config(config: MinosConfig) -> dict[str, Any]:
+        try:
+            # noinspection PyProtectedMember
+            return {f"cache_{k}": v for k, v in config._get("query_cache").items()}
+        except MinosConfigException:
+            return dict()
+
+    async def _upgrade(self, connection: SAConnection) -> None:
+        # The rating average used to be stored, so that the score total had to be recomputed from it on every review
+        # change. The total is stored now, and it is rebuilt from the counted reviews of each product.
+        result = await connection.execute(_HAS_REVIEWS_TOTAL_QUERY)
+        if await result.first() is not None:
+            return
+
+        await connection.execute(_UPGRADE_REVIEWS_TOTAL_QUERY)
 
     async def get_all(self) -> ProductDTO:
         """Create a new row.
 
         :return: This method does not return anything.
         """
+        if (products := self.cache.get(_CATALOG_KEY)) is not None:
+            return products
 
-        query = PRODUCT_TABLE.select()
-        result = self.engine.execute(query)
-
-        products = [ProductDTO(**row) for row in result]
+        version = self.cache.version()
+        query = select(PRODUCT_COLUMNS.values())
+        async with self.connection() as connection:
+            result = await connection.execute(query)
+            products = [ProductDTO(**row) async for row in result]
 
+        self.cache.set(_CATALOG_KEY, products, version=version)
         return products
 
+    def stream_all(self) -> AsyncIterator[ProductDTO]:
+        """Iterate over all the products without loading them at once.
+
+        :return: An asynchronous iterator of ``ProductDTO`` instances.
+        """
+        return self.stream(
+            select(PRODUCT_COLUMNS.values()).order_by(PRODUCT_TABLE.columns.uuid), factory=lambda row: ProductDTO(**row)
+        )
+
+    async def get_page(
+        self, limit: int, after: Optional[str] = None, order_by: str = "uuid", fields: Optional[Iterable[str]] = None,
+    ) -> dict[str, Any]:
+        """Get a page of products using keyset pagination.
+
+        :param limit: The maximum number of products to be retrieved.
+        :param after: The cursor returned by the previous page, or ``None`` to retrieve the first one.
+        :param order_by: The ordering key. It can be ``"uuid"`` or ``"price"`` (in which case ties are broken by uuid).
+        :param fields: The columns to be retrieved. If ``None`` is given, the ``ProductDTO`` fields are retrieved.
+        :return: A dictionary containing the ``products`` and the ``cursor`` of the next page, which is ``None`` if
+            there are no more products.
+        """
+        if order_by not in PAGE_ORDERINGS:
+            raise ValueError(f"The ordering must be one of {PAGE_ORDERINGS!r}. Obtained: {order_by!r}")
+
+        if fields is None:
+            fields = ProductDTO.type_hints.keys()
+        fields = list(dict.fromkeys(fields))
+        if unknown := set(fields) - PRODUCT_COLUMNS.keys():
+            raise ValueError(f"The following fields do not exist: {sorted(unknown)!r}")
+
+        keys = [PRODUCT_TABLE.columns[key] for key in PAGE_ORDERINGS[order_by]]
+        columns = list(dict.fromkeys([*(PRODUCT_COLUMNS[field] for field in fields), *keys]))
+
+        query = select(columns).order_by(*keys).limit(limit)
+        if after is not None:
+            query = query.where(tuple_(*keys) > tuple_(*self._decode_cursor(after, order_by)))
+
+        async with self.connection() as connection:
+            result = await connection.execute(query)
+            rows = await result.fetchall()
+
+        products = [{field: _to_primitive(row[field]) for field in fields} for row in rows]
+
+        cursor = None
+        if len(rows) == limit:
+            cursor = self._encode_cursor([rows[-1][key.name] for key in keys])
+
+        return {"products": products, "cursor": cursor}
+
+    @staticmethod
+    def _encode_cursor(values: list[Any]) -> str:
+        return urlsafe_b64encode(json.dumps([str(value) for value in values]).encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str, order_by: str) -> list[Any]:
+        try:
+            keys = PAGE_ORDERINGS[order_by]
+            values = json.loads(urlsafe_b64decode(cursor.encode()))
+            if len(values) != len(keys):
+                raise ValueError(f"The cursor must contain {len(keys)} values. Obtained: {values!r}")
+            return [_CURSOR_PARSERS[key](value) for key, value in zip(keys, values)]
+        except Exception as exc:
+            raise ValueError(f"The cursor is not valid: {cursor!r}") from exc
+
     async def get(self, product_uuid: UUID) -> Optional[ProductDTO]:
         """Create a new row.
 
@@ -61,12 +200,22 @@ class ProductQueryRepository(MinosSetup):
         :return: This method does not return anything.
         """
 
-        query = PRODUCT_TABLE.select().where(PRODUCT_TABLE.columns.uuid == product_uuid)
-        result = self.engine.execute(query)
-        product = None
+        if not isinstance(product_uuid, UUID):
+            product_uuid = UUID(product_uuid)
+
+        if (product := self.cache.get(product_uuid)) is not None:
+            return product
+
+        version = self.cache.version()
+        query = select(PRODUCT_COLUMNS.values()).where(PRODUCT_TABLE.columns.uuid == product_uuid)
+        async with self.connection() as connection:
+            result = await connection.execute(query)
+            row = await result.first()
 
-        for row in result:
+        product = None
+        if row is not None:
             product = ProductDTO(**row)
+            self.cache.set(product_uuid, product, version=version)
 
         return product
 
@@ -75,9 +224,10 @@ class ProductQueryRepository(MinosSetup):
 
         :return: a list of dto instances.
         """
-        query = PRODUCT_TABLE.select().where(PRODUCT_TABLE.columns.inventory_amount == 0)
-        result = self.engine.execute(query)
-        return [ProductDTO(**row) for row in result]
+        query = select(PRODUCT_COLUMNS.values()).where(PRODUCT_TABLE.columns.inventory_amount == 0)
+        async with self.connection() as connection:
+            result = await connection.execute(query)
+            return [ProductDTO(**row) async for row in result]
 
     async def create(self, **kwargs) -> None:
         """Create a new row.
@@ -85,16 +235,13 @@ class ProductQueryRepository(MinosSetup):
         :param kwargs: The parameters of the creation query.
         :return: This method does not return anything.
         """
-        kwargs = {k: v if not isinstance(v, FieldDiff) else v.value for k, v in kwargs.items()}
-
-        kwargs["inventory_amount"] = kwargs["inventory"]["amount"]
-        kwargs["inventory_reserved"] = kwargs["inventory"]["reserved"]
-        kwargs["inventory_sold"] = kwargs["inventory"]["sold"]
-
-        kwargs.pop("inventory")
+        kwargs = self._to_row(kwargs)
 
         query = PRODUCT_TABLE.insert().values(**kwargs)
-        self.engine.execute(query)
+        async with self.connection() as connection:
+            await connection.execute(query)
+
+        self._invalidate(kwargs["uuid"])
 
     async def update(self, uuid: UUID, **kwargs) -> None:
         """Update an existing row.
@@ -103,17 +250,26 @@ class ProductQueryRepository(MinosSetup):
         :param kwargs: The parameters to be updated.
         :return: This method does not return anything.
         """
-        kwargs = {k: v if not isinstance(v, FieldDiff) else v.value for k, v in kwargs.items()}
+        kwargs = self._to_row(kwargs)
 
-        if "inventory" in kwargs:
-            kwargs["inventory_amount"] = kwargs["inventory"]["amount"]
-            kwargs["inventory_reserved"] = kwargs["inventory"]["reserved"]
-            kwargs["inventory_sold"] = kwargs["inventory"]["sold"]
+        query = PRODUCT_TABLE.update().where(PRODUCT_TABLE.columns.uuid == uuid).values(**kwargs)
+        async with self.connection() as connection:
+            await connection.execute(query)
 
-            kwargs.pop("inventory")
+        self._invalidate(uuid)
 
-        query = PRODUCT_TABLE.update().where(PRODUCT_TABLE.columns.uuid == uuid).values(**kwargs)
-        self.engine.execute(query)
+    @staticmethod
+    def _to_row(fields: dict[str, Any]) -> dict[str, Any]:
+        row = {k: v if not isinstance(v, FieldDiff) else v.value for k, v in fields.items()}
+
+        if "inventory" in row:
+            inventory = row.pop("inventory")
+            row["inventory_amount"] = inventory["amount"]
+            row["inventory_reserved"] = inventory["reserved"]
+            row["inventory_sold"] = inventory["sold"]
+
+        row.pop("inventory_slots", None)
+        return row
 
     async def delete(self, uuid: UUID) -> None:
         """Delete an entry from the database.
@@ -122,4 +278,198 @@ class ProductQueryRepository(MinosSetup):
         :return: This method does not return anything.
         """
         query = PRODUCT_TABLE.delete().where(PRODUCT_TABLE.columns.uuid == uuid)
-        self.engine.execute(query)
+        async with self.connection() as connection:
+            await connection.execute(query)
+
+        self._invalidate(uuid)
+
+    async def project(self, diffs: Iterable[AggregateDiff]) -> None:
+        """Apply a batch of product events within a single transaction.
+
+        The events are folded per product, so that each product is written at most once, and the writes are grouped
+        into multi-row statements. Rows that already have a newer version are not overwritten, so replaying events
+        that have been already projected is harmless.
+
+        :param diffs: The ``ProductCreated``, ``ProductUpdated`` and ``ProductDeleted`` differences to be applied.
+        :return: This method does not return anything.
+        """
+        folded = self.fold(diffs)
+        if not folded:
+            return
+
+        deleted = [uuid for uuid, (action, _) in folded.items() if action == Action.DELETE]
+        created = _group_by_columns(row for action, row in folded.values() if action == Action.CREATE)
+        updated = _group_by_columns(row for action, row in folded.values() if action == Action.UPDATE)
+
+        async with self.transaction() as connection:
+            if deleted:
+                await connection.execute(PRODUCT_TABLE.delete().where(PRODUCT_TABLE.columns.uuid.in_(deleted)))
+
+            for columns, rows in created.items():
+                query = insert(PRODUCT_TABLE).values(rows)
+                query = query.on_conflict_do_update(
+                    index_elements=[PRODUCT_TABLE.columns.uuid],
+                    set_={name: query.excluded[name] for name in columns if name != "uuid"},
+                    where=PRODUCT_TABLE.columns.version < query.excluded.version,
+                )
+                await connection.execute(query)
+
+            for columns, rows in updated.items():
+                source = values(*(column(name, PRODUCT_TABLE.columns[name].type) for name in columns), name="source")
+                source = source.data([tuple(row[name] for name in columns) for row in rows])
+                await connection.execute(
+                    PRODUCT_TABLE.update()
+                    .where(PRODUCT_TABLE.columns.uuid == source.columns.uuid)
+                    .where(PRODUCT_TABLE.columns.version < source.columns.version)
+                    .values({name: source.columns[name] for name in columns if name != "uuid"})
+                )
+
+        for uuid, (_, row) in folded.items():
+            self._invalidate(uuid)
+
+    @classmethod
+    def fold(cls, diffs: Iterable[AggregateDiff]) -> dict[UUID, tuple[Action, dict[str, Any]]]:
+        """Fold a sequence of product events into a single write per product.
+
+        :param diffs: The product differences to be folded. They do not need to be sorted.
+        :return: A dictionary in which the keys are the product identifiers and the values are pairs containing the
+            action to be performed (``CREATE`` behaves as an upsert) and the latest values of the changed columns.
+        """
+        folded = dict()
+        for diff in sorted(diffs, key=attrgetter("version")):
+            previous = folded.get(diff.uuid)
+            if diff.action == Action.DELETE:
+                folded[diff.uuid] = (Action.DELETE, {"uuid": diff.uuid, "version": diff.version})
+                continue
+
+            row = cls._to_row(dict(diff.fields_diff)) | {"uuid": diff.uuid, "version": diff.version}
+            if diff.action == Action.CREATE or previous is None:
+                folded[diff.uuid] = (diff.action, row)
+            elif previous[0] != Action.DELETE:
+                folded[diff.uuid] = (previous[0], previous[1] | row)
+
+        return folded
+
+    async def create_review(self, uuid: UUID, product_uuid: UUID, score: int, version: int) -> None:
+        """Add a review to the rating of a product.
+
+        :param uuid: The review identifier.
+        :param product_uuid: The product identifier.
+        :param score: The review score.
+        :param version: The review version.
+        :return: This method does not return anything.
+        """
+        await self._apply_review(uuid, version, product_uuid=product_uuid, score=score)
+
+    async def update_review_score(self, uuid: UUID, score: int, version: int) -> None:
+        """Apply the score change of a review to the rating of its product.
+
+        :param uuid: The review identifier.
+        :param score: The new review score.
+        :param version: The review version.
+        :return: This method does not return anything.
+        """
+        await self._apply_review(uuid, version, score=score)
+
+    async def delete_review(self, uuid: UUID, version: int) -> None:
+        """Remove a review from the rating of its product.
+
+        :param uuid: The review identifier.
+        :param version: The review version.
+        :return: This method does not return anything.
+        """
+        await self._apply_review(uuid, version, deleted=True)
+
+    async def _apply_review(
+        self,
+        uuid: UUID,
+        version: int,
+        product_uuid: Optional[UUID] = None,
+        score: Optional[int] = None,
+        deleted: bool = False,
+    ) -> None:
+        # The review is upserted only if the event is newer than the stored one, except for the product, which is only
+        # known from the creation event and so it is taken even if a newer event arrived first. The ``counted_score``
+        # column keeps the score counted on the product rating before this change, so that it can be reverted.
+        columns = PRODUCT_REVIEW_TABLE.columns
+        is_newer = columns.version < version
+        counted = case((and_(columns.product_uuid.isnot(None), not_(columns.deleted)), columns.score))
+        stored_score = columns.score if score is None else case((is_newer, score), else_=columns.score)
+        query = (
+            insert(PRODUCT_REVIEW_TABLE)
+            .values(uuid=uuid, product_uuid=product_uuid, score=score, deleted=deleted, version=version)
+            .on_conflict_do_update(
+                index_elements=[columns.uuid],
+                set_={
+                    "product_uuid": func.coalesce(columns.product_uuid, product_uuid),
+                    "score": stored_score,
+                    "deleted": case((is_newer, deleted), else_=columns.deleted),
+                    "version": func.greatest(columns.version, version),
+                    "counted_score": counted,
+                },
+                where=is_newer if product_uuid is None else or_(is_newer, columns.product_uuid.is_(None)),
+            )
+            .returning(columns.product_uuid, columns.counted_score, counted.label("current_score"))
+        )
+
+        async with self.transaction() as connection:
+            result = await connection.execute(query)
+            row = await result.first()
+            if row is None:
+                return  # The change is stale.
+
+            product_uuid, previous, current = row["product_uuid"], row["counted_score"], row["current_score"]
+            if product_uuid is None or previous == current:
+                return  # The product is still unknown or its rating does not change.
+
+            count_diff = (current is not None) - (previous is not None)
+            total_diff = (current or 0) - (previous or 0)
+            await connection.execute(
+                PRODUCT_TABLE.update()
+                .where(PRODUCT_TABLE.columns.uuid == product_uuid)
+                .values(
+                    reviews_count=func.coalesce(PRODUCT_TABLE.columns.reviews_count, 0) + count_diff,
+                    reviews_total=func.coalesce(PRODUCT_TABLE.columns.reviews_total, 0) + total_diff,
+                )
+            )
+
+        self._invalidate(product_uuid)
+
+    def _invalidate(self, uuid: UUID) -> None:
+        # The reads started before this change obtained an older cache version, so their results are not cached.
+        self.cache.discard(uuid)
+        self.cache.discard(_CATALOG_KEY)
+
+
+_CATALOG_KEY = "__catalog__"
+
+_HAS_REVIEWS_TOTAL_QUERY = """
+SELECT 1
+FROM information_schema.columns
+WHERE table_schema = current_schema() AND table_name = 'product' AND column_name = 'reviews_total'
+""".strip()
+
+_UPGRADE_REVIEWS_TOTAL_QUERY = """
+ALTER TABLE product ADD COLUMN reviews_total INTEGER DEFAULT 0;
+UPDATE product SET reviews_total = COALESCE(
+    (SELECT SUM(score) FROM product_review WHERE product_uuid = product.uuid AND NOT deleted), 0
+);
+ALTER TABLE product DROP COLUMN reviews_score;
+""".strip()
+
+PAGE_ORDERINGS = {"uuid": ("uuid",), "price": ("price", "uuid")}
+
+_CURSOR_PARSERS = {"uuid": UUID, "price": Decimal}
+
+
+def _group_by_columns(rows: Iterable[dict[str, Any]]) -> dict[tuple[str, ...], list[dict[str, Any]]]:
+    groups = defaultdict(list)
+    for row in rows:
+        groups[tuple(sorted(row))].append(row)
+    return groups
+
+
+def _to_primitive(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
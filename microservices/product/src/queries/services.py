@@ -1,5 +1,10 @@
+from typing import (
+    Optional,
+)
+
 from dependency_injector.wiring import (
     Provide,
+    inject,
 )
 from minos.aggregate import (
     AggregateDiff,
@@ -18,25 +23,71 @@ from minos.networks import (
     enroute,
 )
 
+from ..rest import (
+    StreamingResponse,
+)
+from .batchers import (
+    ProjectionBatcher,
+)
 from .repositories import (
     ProductQueryRepository,
 )
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
 
 class ProductQueryService(QueryService):
     """Product Query Service class."""
 
     repository: ProductQueryRepository = Provide["product_repository"]
 
+    @inject
+    def __init__(
+        self, *args, projection_batcher: Optional[ProjectionBatcher] = Provide["projection_batcher"], **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        if isinstance(projection_batcher, Provide):
+            projection_batcher = None
+        self.projection_batcher = projection_batcher
+
     @enroute.rest.query("/products", "GET")
+    @enroute.broker.query("GetProducts")
     async def get_all_products(self, request: Request) -> Response:
         """Get all products.
 
-        :param request: The ``Request`` instance that contains the product identifiers.
+        If any of the ``limit``, ``after``, ``order_by`` or ``fields`` params is given, a single page is retrieved
+        using keyset pagination, together with the cursor of the next one. If streaming is requested, the whole
+        catalog is streamed instead.
+
+        :param request: The ``Request`` instance that contains the optional pagination params.
         :return: A ``Response`` instance containing the requested products.
         """
-
-        res = await self.repository.get_all()
+        if (content_type := StreamingResponse.requested(request)) is not None:
+            return StreamingResponse(self.repository.stream_all(), content_type)
+
+        if isinstance(request, RestRequest):
+            params = await request.params() if request.has_params else dict()
+        else:
+            params = await request.content() if request.has_content else dict()
+
+        if not any(key in params for key in ("limit", "after", "order_by", "fields")):
+            res = await self.repository.get_all()
+            return Response(res)
+
+        after = params.get("after")
+        order_by = params.get("order_by", "uuid")
+        fields = params.get("fields")
+        if isinstance(fields, str):
+            fields = fields.split(",")
+
+        try:
+            limit = int(params.get("limit", DEFAULT_PAGE_SIZE))
+            if not 0 < limit <= MAX_PAGE_SIZE:
+                raise ValueError(f"The limit must be between 1 and {MAX_PAGE_SIZE}. Obtained: {limit!r}")
+            res = await self.repository.get_page(limit, after, order_by, fields)
+        except ValueError as exc:
+            raise ResponseException(f"The pagination params are not valid: {exc!r}")
 
         return Response(res)
 
@@ -65,6 +116,16 @@ class ProductQueryService(QueryService):
         uuids = await self.repository.get_without_stock()
         return Response(uuids)
 
+    # noinspection PyUnusedLocal
+    @enroute.rest.query("/products/cache", "GET")
+    async def get_cache_stats(self, request: Request) -> Response:
+        """Get the counters of the product cache.
+
+        :param request: A request without any content.
+        :return: A response containing the size, hits, misses and evictions of the cache.
+        """
+        return Response(self.repository.cache.stats)
+
     @enroute.broker.query("GetMostSoldProducts")
     def get_most_sold_products(self, request: Request) -> Response:
         """Get the most sold products.
@@ -82,7 +143,10 @@ class ProductQueryService(QueryService):
         :return: This method does not return anything.
         """
         diff: AggregateDiff = await request.content()
-        await self.repository.create(uuid=diff.uuid, version=diff.version, **diff.fields_diff)
+        if self.projection_batcher is not None:
+            await self.projection_batcher.submit(diff)
+        else:
+            await self.repository.create(uuid=diff.uuid, version=diff.version, **diff.fields_diff)
 
     @enroute.broker.event("ProductUpdated")
     async def product_updated(self, request: Request) -> None:
@@ -92,7 +156,10 @@ class ProductQueryService(QueryService):
         :return: This method does not return anything.
         """
         diff: AggregateDiff = await request.content()
-        await self.repository.update(uuid=diff.uuid, version=diff.version, **diff.fields_diff)
+        if self.projection_batcher is not None:
+            await self.projection_batcher.submit(diff)
+        else:
+            await self.repository.update(uuid=diff.uuid, version=diff.version, **diff.fields_diff)
 
     @enroute.broker.event("ProductDeleted")
     async def product_deleted(self, request: Request) -> None:
@@ -102,24 +169,39 @@ class ProductQueryService(QueryService):
         :return: This method does not return anything.
         """
         diff: AggregateDiff = await request.content()
-        await self.repository.delete(diff.uuid)
+        if self.projection_batcher is not None:
+            await self.projection_batcher.submit(diff)
+        else:
+            await self.repository.delete(diff.uuid)
 
     @enroute.broker.event("ReviewCreated")
     async def review_created(self, request: Request) -> None:
-        """Handle review created or updated events.
+        """Handle review created events.
 
         :param request: A request instance containing the aggregate difference.
         :return: This method does not return anything.
         """
         diff: AggregateDiff = await request.content()
-        await self.repository.update(uuid=diff.uuid, version=diff.version, **diff.fields_diff)
+        product = diff.get_one("product")
+        product_uuid = getattr(product, "uuid", product)
+        await self.repository.create_review(diff.uuid, product_uuid, diff.get_one("score"), diff.version)
 
     @enroute.broker.event("ReviewUpdated.score")
     async def review_updated(self, request: Request) -> None:
-        """Handle review created or updated events.
+        """Handle review score updated events.
+
+        :param request: A request instance containing the aggregate difference.
+        :return: This method does not return anything.
+        """
+        diff: AggregateDiff = await request.content()
+        await self.repository.update_review_score(diff.uuid, diff.get_one("score"), diff.version)
+
+    @enroute.broker.event("ReviewDeleted")
+    async def review_deleted(self, request: Request) -> None:
+        """Handle review deleted events.
 
         :param request: A request instance containing the aggregate difference.
         :return: This method does not return anything.
         """
         diff: AggregateDiff = await request.content()
-        await self.repository.update(uuid=diff.uuid, version=diff.version, **diff.fields_diff)
+        await self.repository.delete_review(diff.uuid, diff.version)
@@ -0,0 +1,175 @@
+from __future__ import (
+    annotations,
+)
+
+import logging
+from collections.abc import (
+    AsyncIterable,
+)
+from functools import (
+    wraps,
+)
+from inspect import (
+    isawaitable,
+)
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Optional,
+    Union,
+)
+
+from aiohttp import (
+    web,
+)
+from minos.common import (
+    AvroDataEncoder,
+)
+from minos.networks import (
+    Response,
+    RestHandler,
+    RestRequest,
+    RestResponse,
+    RestService,
+)
+from orjson import (
+    dumps,
+)
+
+logger = logging.getLogger(__name__)
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+JSON_CONTENT_TYPE = "application/json"
+
+
+class StreamingResponse(Response):
+    """Streaming Response class.
+
+    The items are encoded and written one by one as they are produced, either as newline-delimited JSON or as the
+    items of a JSON array, so that the whole result set is never held in memory.
+    """
+
+    def __init__(self, items: AsyncIterable[Any], content_type: str = NDJSON_CONTENT_TYPE):
+        super().__init__()
+        self.items = items
+        self.content_type = content_type
+
+    @staticmethod
+    def requested(request: Any) -> Optional[str]:
+        """Get the streaming content type requested by the client, if any.
+
+        The streaming mode is requested with the ``stream`` query param (``ndjson`` or ``json``) or with an ``Accept``
+        header equal to ``application/x-ndjson``.
+
+        :param request: The request to be checked.
+        :return: The content type to be streamed or ``None`` if streaming was not requested.
+        """
+        if not isinstance(request, RestRequest):
+            return None
+
+        mode = request.raw.query.get("stream")
+        if mode == "ndjson" or request.raw.headers.get("Accept") == NDJSON_CONTENT_TYPE:
+            return NDJSON_CONTENT_TYPE
+        if mode == "json":
+            return JSON_CONTENT_TYPE
+        return None
+
+    async def write(self, request: web.Request) -> web.StreamResponse:
+        """Write the items into a chunked response.
+
+        If the items cannot be produced once the response has been prepared, the status cannot be changed anymore, so
+        the connection is aborted before the terminating chunk is sent, so that the client does not take the truncated
+        body as a complete one. The items are closed however the writing ends (including a client disconnection), so
+        that the resources held by them, such as a pooled connection and its cursor, are released at once.
+
+        :param request: The ``aiohttp`` request to be answered.
+        :return: The ``web.StreamResponse`` instance.
+        """
+        try:
+            return await self._write(request)
+        finally:
+            if (aclose := getattr(self.items, "aclose", None)) is not None:
+                await aclose()
+
+    async def _write(self, request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": self.content_type})
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+
+        is_array = self.content_type == JSON_CONTENT_TYPE
+        separator = b"," if is_array else b"\n"
+
+        try:
+            if is_array:
+                await response.write(b"[")
+            first = True
+            async for item in self.items:
+                chunk = dumps(AvroDataEncoder(item).build())
+                if is_array:
+                    chunk = chunk if first else separator + chunk
+                else:
+                    chunk += separator
+                await response.write(chunk)
+                first = False
+            if is_array:
+                await response.write(b"]")
+        except Exception as exc:
+            logger.exception(f"Raised a system exception while streaming: {exc!r}")
+            if request.transport is not None:
+                request.transport.close()
+            return response
+
+        await response.write_eof()
+        return response
+
+
+class StreamingRestHandler(RestHandler):
+    """Streaming Rest Handler class.
+
+    It behaves as ``RestHandler`` but also writes ``StreamingResponse`` instances incrementally.
+    """
+
+    @staticmethod
+    def get_callback(
+        fn: Callable[[RestRequest], Union[Optional[RestResponse], Awaitable[Optional[RestResponse]]]]
+    ) -> Callable[[web.Request], Awaitable[web.StreamResponse]]:
+        """Get the handler function to be used by the ``aiohttp`` Controller.
+
+        :param fn: The action function.
+        :return: A wrapper function around the given one that is compatible with the ``aiohttp`` Controller.
+        """
+
+        @wraps(fn)
+        async def _wrapper(request: web.Request) -> web.StreamResponse:
+            streamed = list()
+
+            async def _fn(rest_request: RestRequest) -> Optional[RestResponse]:
+                response = fn(rest_request)
+                if isawaitable(response):
+                    response = await response
+
+                if isinstance(response, StreamingResponse):
+                    # The streaming response is written once the default callback has dispatched the request.
+                    streamed.append(response)
+                    return None
+                return response
+
+            response = await RestHandler.get_callback(_fn)(request)
+            if streamed:
+                return await streamed[0].write(request)
+            return response
+
+        return _wrapper
+
+
+class StreamingRestService(RestService):
+    """Streaming Rest Service class.
+
+    Each microservice is built from its own directory, so this module is kept identical in every microservice that
+    streams responses (``make check-shared`` verifies it).
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.handler = StreamingRestHandler.from_config(**kwargs)
@@ -1,6 +1,14 @@
 import sys
 import unittest
+from unittest.mock import (
+    patch,
+)
 
+from src import (
+    Inventory,
+    InventorySlot,
+    Product,
+)
 from tests.utils import (
     build_dependency_injector,
 )
@@ -11,11 +19,110 @@ class TestProduct(unittest.IsolatedAsyncioTestCase):
         self.injector = build_dependency_injector()
 
     async def asyncSetUp(self) -> None:
-        await self.injector.wire(modules=[sys.modules[__name__]])
+        await self.injector.wire(modules=[sys.modules[__name__], sys.modules["minos.aggregate"]])
 
     async def asyncTearDown(self) -> None:
         await self.injector.unwire()
 
+    async def test_shard_inventory(self):
+        product = await Product.create("abc", "Cacao", "1KG", 3, Inventory(amount=10, reserved=4, sold=2))
+
+        await product.shard_inventory(3)
+
+        self.assertTrue(product.is_sharded)
+        slots = await product.get_inventory_slots()
+        self.assertEqual(
+            [Inventory(4, 2, 1), Inventory(3, 1, 1), Inventory(3, 1, 0)], [slot.inventory for slot in slots]
+        )
+        self.assertEqual(Inventory(10, 4, 2), product.inventory)
+
+    async def test_unshard_inventory(self):
+        product = await Product.create("abc", "Cacao", "1KG", 3, Inventory(amount=10, reserved=4, sold=2))
+        await product.shard_inventory(3)
+        slots = await product.get_inventory_slots()
+        slots[0].inventory = slots[0].inventory.reserve(2)
+        await slots[0].save()
+
+        await product.shard_inventory(1)
+
+        self.assertFalse(product.is_sharded)
+        self.assertEqual(Inventory(10, 6, 2), (await Product.get(product.uuid)).inventory)
+
+    async def test_allocate_single_slot(self):
+        product = await Product.create("abc", "Cacao", "1KG", 3, Inventory(amount=10, reserved=0, sold=0))
+        await product.shard_inventory(2)
+
+        observed = await InventorySlot.allocate(product, 5, "available", "reserved")
+
+        self.assertEqual(1, len(observed))
+        self.assertEqual(5, observed[0][1])
+
+    async def test_allocate_several_slots(self):
+        product = await Product.create("abc", "Cacao", "1KG", 3, Inventory(amount=10, reserved=0, sold=0))
+        await product.shard_inventory(4)
+
+        observed = await InventorySlot.allocate(product, 9, "available", "reserved")
+
+        self.assertEqual(9, sum(quantity for _, quantity in observed))
+        self.assertEqual(4, len(observed))
+
+    async def test_allocate_negative(self):
+        product = await Product.create("abc", "Cacao", "1KG", 3, Inventory(amount=10, reserved=4, sold=0))
+        await product.shard_inventory(2)
+
+        observed = await InventorySlot.allocate(product, -3, "available", "reserved")
+
+        self.assertEqual(-3, sum(quantity for _, quantity in observed))
+
+    async def test_allocate_not_enough(self):
+        product = await Product.create("abc", "Cacao", "1KG", 3, Inventory(amount=10, reserved=4, sold=0))
+        await product.shard_inventory(2)
+
+        self.assertIsNone(await InventorySlot.allocate(product, 7, "available", "reserved"))
+
+    async def test_rebalance_inventory(self):
+        product = await Product.create("abc", "Cacao", "1KG", 3, Inventory(amount=10, reserved=0, sold=0))
+        await product.shard_inventory(2)
+        slots = await product.get_inventory_slots()
+        slots[0].inventory = slots[0].inventory.reserve(5)
+        await slots[0].save()
+
+        await product.rebalance_inventory()
+
+        slots = await product.get_inventory_slots()
+        self.assertEqual([Inventory(8, 5, 0), Inventory(2, 0, 0)], [slot.inventory for slot in slots])
+        self.assertEqual(Inventory(10, 5, 0), (await Product.get(product.uuid)).inventory)
+
+    async def test_reserve_save_fails(self):
+        first = await Product.create("abc", "Cacao", "1KG", 3, Inventory(amount=10, reserved=0, sold=0))
+        second = await Product.create("def", "Milk", "1L", 1, Inventory(amount=10, reserved=0, sold=0))
+        save = Product.save
+
+        async def _save(product: Product):
+            if product.uuid == second.uuid:
+                raise ValueError()
+            await save(product)
+
+        with patch.object(Product, "save", _save):
+            with self.assertRaises(ValueError):
+                await Product.reserve({first.uuid: 1, second.uuid: 1})
+
+        self.assertEqual(first, await Product.get(first.uuid))
+        self.assertEqual(second, await Product.get(second.uuid))
+
+
+class TestInventory(unittest.TestCase):
+    def test_split(self):
+        observed = Inventory(amount=7, reserved=2, sold=5).split(3)
+        self.assertEqual([Inventory(3, 1, 2), Inventory(2, 1, 2), Inventory(2, 0, 1)], observed)
+
+    def test_merge(self):
+        observed = Inventory.merge(Inventory(3, 1, 2), Inventory(2, 1, 2), Inventory(2, 0, 1))
+        self.assertEqual(Inventory(amount=7, reserved=2, sold=5), observed)
+
+    def test_available(self):
+        self.assertEqual(5, Inventory(amount=7, reserved=2, sold=5).available)
+
 
 if __name__ == "__main__":
     unittest.main()
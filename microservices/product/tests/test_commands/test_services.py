@@ -11,6 +11,7 @@ from collections import (
 from minos.networks import (
     InMemoryRequest,
     Response,
+    ResponseException,
 )
 
 from src import (
@@ -26,7 +27,7 @@ from tests.utils import (
 class TestProductCommandService(unittest.IsolatedAsyncioTestCase):
     async def asyncSetUp(self) -> None:
         self.injector = build_dependency_injector()
-        await self.injector.wire(modules=[sys.modules[__name__]])
+        await self.injector.wire(modules=[sys.modules[__name__], sys.modules["minos.aggregate"]])
         self.service = ProductCommandService()
 
     async def asyncTearDown(self) -> None:
@@ -152,6 +153,17 @@ class TestProductCommandService(unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual(expected, obtained)
 
+    async def test_reserve_product_not_enough(self):
+        first = await Product.create("abc", "Cacao", "1KG", 3, Inventory(amount=12, reserved=0, sold=0))
+        second = await Product.create("def", "Milk", "1L", 1, Inventory(amount=2, reserved=0, sold=0))
+
+        request = InMemoryRequest({"quantities": {str(first.uuid): 3, str(second.uuid): 5}})
+        with self.assertRaises(ResponseException):
+            await self.service.reserve_products(request)
+
+        self.assertEqual(first, await Product.get(first.uuid))
+        self.assertEqual(second, await Product.get(second.uuid))
+
     async def test_purchase_product(self):
         product = await Product.create("abc", "Cacao", "1KG", 3, Inventory(amount=12, reserved=0, sold=0))
 
@@ -194,6 +206,106 @@ class TestProductCommandService(unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual(expected, obtained)
 
+    async def test_reserve_sharded_product(self):
+        product = await Product.create("abc", "Cacao", "1KG", 3, Inventory(amount=12, reserved=0, sold=0))
+        await product.shard_inventory(3)
+
+        request = InMemoryRequest({"quantities": {str(product.uuid): 6}})
+        await self.service.reserve_products(request)
+
+        obtained = await Product.get(product.uuid)
+        self.assertEqual(product.version, obtained.version)
+
+        slots = await obtained.get_inventory_slots()
+        self.assertEqual(Inventory(12, 6, 0), Inventory.merge(*(slot.inventory for slot in slots)))
+
+    async def test_purchase_sharded_product(self):
+        product = await Product.create("abc", "Cacao", "1KG", 3, Inventory(amount=12, reserved=0, sold=0))
+        await product.shard_inventory(3)
+
+        request = InMemoryRequest({"quantities": {str(product.uuid): 6}})
+        await self.service.reserve_products(request)
+        await self.service.purchase_products(request)
+
+        slots = await product.get_inventory_slots()
+        self.assertEqual(Inventory(6, 0, 6), Inventory.merge(*(slot.inventory for slot in slots)))
+
+    async def test_purchase_sharded_product_revert(self):
+        product = await Product.create("abc", "Cacao", "1KG", 3, Inventory(amount=12, reserved=0, sold=0))
+        await product.shard_inventory(3)
+        await self.service.reserve_products(InMemoryRequest({"quantities": {str(product.uuid): 6}}))
+        before = [slot.inventory for slot in await product.get_inventory_slots()]
+
+        response = await self.service.purchase_products(InMemoryRequest({"quantities": {str(product.uuid): 6}}))
+        allocations = (await response.content())["allocations"]
+        self.assertEqual(6, sum(allocations[str(product.uuid)].values()))
+
+        reverted = {k: {slot: -v for slot, v in allocation.items()} for k, allocation in allocations.items()}
+        request = InMemoryRequest({"quantities": {str(product.uuid): -6}, "allocations": reverted})
+        await self.service.purchase_products(request)
+
+        self.assertEqual(before, [slot.inventory for slot in await product.get_inventory_slots()])
+
+    async def test_purchase_products_not_enough(self):
+        sharded = await Product.create("abc", "Cacao", "1KG", 3, Inventory(amount=12, reserved=0, sold=0))
+        await sharded.shard_inventory(3)
+        await self.service.reserve_products(InMemoryRequest({"quantities": {str(sharded.uuid): 6}}))
+        other = await Product.create("def", "Milk", "1L", 1, Inventory(amount=4, reserved=1, sold=0))
+        slots = await sharded.get_inventory_slots()
+
+        request = InMemoryRequest({"quantities": {str(sharded.uuid): 6, str(other.uuid): 2}})
+        with self.assertRaises(ResponseException):
+            await self.service.purchase_products(request)
+
+        self.assertEqual(other, await Product.get(other.uuid))
+        self.assertEqual(slots, await sharded.get_inventory_slots())
+
+    async def test_reserve_sharded_product_not_enough(self):
+        product = await Product.create("abc", "Cacao", "1KG", 3, Inventory(amount=12, reserved=0, sold=0))
+        await product.shard_inventory(3)
+
+        request = InMemoryRequest({"quantities": {str(product.uuid): 13}})
+        with self.assertRaises(ResponseException):
+            await self.service.reserve_products(request)
+
+        slots = await product.get_inventory_slots()
+        self.assertTrue(all(slot.version == 1 for slot in slots))
+
+    async def test_shard_inventory(self):
+        product = await Product.create("abc", "Cacao", "1KG", 3, Inventory(amount=12, reserved=0, sold=0))
+
+        request = InMemoryRequest({"slots": 4}, {"uuid": product.uuid})
+        response = await self.service.shard_inventory(request)
+
+        observed = await response.content()
+        self.assertEqual(4, len(observed.inventory_slots))
+
+    async def test_update_sharded_inventory_diff(self):
+        product = await Product.create("abc", "Cacao", "1KG", 3, Inventory(amount=12, reserved=0, sold=0))
+        await product.shard_inventory(2)
+
+        request = InMemoryRequest({"amount_diff": 5}, {"uuid": product.uuid})
+        await self.service.update_inventory_diff(request)
+
+        obtained = await Product.get(product.uuid)
+        self.assertEqual(Inventory(17, 0, 0), obtained.inventory)
+        slots = await obtained.get_inventory_slots()
+        self.assertEqual([Inventory(9, 0, 0), Inventory(8, 0, 0)], [slot.inventory for slot in slots])
+
+    async def test_rebalance_inventories(self):
+        product = await Product.create("abc", "Cacao", "1KG", 3, Inventory(amount=12, reserved=0, sold=0))
+        await product.shard_inventory(2)
+        slots = await product.get_inventory_slots()
+        slots[0].inventory = slots[0].inventory.reserve(6)
+        await slots[0].save()
+
+        await self.service.rebalance_inventories(InMemoryRequest())
+
+        obtained = await Product.get(product.uuid)
+        self.assertEqual(Inventory(12, 6, 0), obtained.inventory)
+        slots = await obtained.get_inventory_slots()
+        self.assertEqual([Inventory(9, 6, 0), Inventory(3, 0, 0)], [slot.inventory for slot in slots])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,227 @@
+import unittest
+from unittest.mock import (
+    AsyncMock,
+    MagicMock,
+)
+from uuid import (
+    uuid4,
+)
+
+from minos.aggregate import (
+    TRANSACTION_CONTEXT_VAR,
+    PostgreSqlTransactionRepository,
+    TransactionEntry,
+    TransactionStatus,
+)
+from minos.networks import (
+    BrokerMessageV1,
+    BrokerMessageV1Payload,
+    BrokerRequest,
+    InMemoryRequest,
+    Response,
+    ResponseException,
+)
+
+from src import (
+    IdempotencyStore,
+    build_idempotency_key,
+    idempotent_command,
+)
+from tests.utils import (
+    FakeLockPool,
+    build_config,
+)
+
+
+class _InMemoryIdempotencyStore(IdempotencyStore):
+    """For testing purposes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__("localhost", 5432, "test_db", "minos", "min0s", *args, **kwargs)
+        self.responses = dict()
+        self.transactions = dict()
+
+    async def claim(self, key: bytes, transaction_uuid=None):
+        self.transactions[key] = transaction_uuid
+        if key in self.responses:
+            return self.responses[key]
+        self.responses[key] = None
+        return None
+
+    async def complete(self, key: bytes, response: bytes) -> None:
+        self.responses[key] = response
+
+    async def release(self, key: bytes) -> None:
+        del self.responses[key]
+
+
+class TestIdempotency(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.store = _InMemoryIdempotencyStore(topics=["PurchaseProducts"])
+        self.message = BrokerMessageV1(
+            "PurchaseProducts", BrokerMessageV1Payload({"quantities": {str(uuid4()): 2}}, {"saga": str(uuid4())})
+        )
+
+    def test_build_idempotency_key_saga(self):
+        other = BrokerMessageV1("PurchaseProducts", BrokerMessageV1Payload(self.message.content, self.message.headers))
+
+        self.assertNotEqual(self.message.identifier, other.identifier)
+        self.assertEqual(build_idempotency_key(self.message), build_idempotency_key(other))
+
+    def test_build_idempotency_key_content(self):
+        other = BrokerMessageV1(
+            "PurchaseProducts", BrokerMessageV1Payload({"quantities": {str(uuid4()): 2}}, self.message.headers)
+        )
+
+        self.assertNotEqual(build_idempotency_key(self.message), build_idempotency_key(other))
+
+    def test_build_idempotency_key_header(self):
+        headers = {"saga": self.message.headers["saga"], "idempotency_key": "foo"}
+        other = BrokerMessageV1("PurchaseProducts", BrokerMessageV1Payload(self.message.content, headers))
+
+        self.assertNotEqual(build_idempotency_key(self.message), build_idempotency_key(other))
+
+    def test_build_idempotency_key_identifier(self):
+        content = self.message.content
+        one = BrokerMessageV1("PurchaseProducts", BrokerMessageV1Payload(content))
+        two = BrokerMessageV1("PurchaseProducts", BrokerMessageV1Payload(content), identifier=one.identifier)
+        three = BrokerMessageV1("PurchaseProducts", BrokerMessageV1Payload(content))
+
+        self.assertEqual(build_idempotency_key(one), build_idempotency_key(two))
+        self.assertNotEqual(build_idempotency_key(one), build_idempotency_key(three))
+
+    async def test_idempotent_command_replays(self):
+        inner = AsyncMock(return_value=Response({"foo": "bar"}))
+
+        one = await idempotent_command(BrokerRequest(self.message), inner, store=self.store)
+        two = await idempotent_command(BrokerRequest(self.message), inner, store=self.store)
+
+        self.assertEqual(1, inner.call_count)
+        self.assertEqual({"foo": "bar"}, await one.content())
+        self.assertEqual({"foo": "bar"}, await two.content())
+
+    async def test_idempotent_command_replays_none(self):
+        inner = AsyncMock(return_value=None)
+
+        await idempotent_command(BrokerRequest(self.message), inner, store=self.store)
+        observed = await idempotent_command(BrokerRequest(self.message), inner, store=self.store)
+
+        self.assertEqual(1, inner.call_count)
+        self.assertEqual(None, await observed.content())
+
+    async def test_idempotent_command_replays_response_exception(self):
+        inner = AsyncMock(side_effect=ResponseException("There is not enough product amount"))
+
+        with self.assertRaises(ResponseException):
+            await idempotent_command(BrokerRequest(self.message), inner, store=self.store)
+        with self.assertRaises(ResponseException) as context:
+            await idempotent_command(BrokerRequest(self.message), inner, store=self.store)
+
+        self.assertEqual(1, inner.call_count)
+        self.assertEqual("There is not enough product amount", str(context.exception))
+
+    async def test_idempotent_command_releases_on_exception(self):
+        inner = AsyncMock(side_effect=[ValueError(), Response({"foo": "bar"})])
+
+        with self.assertRaises(ValueError):
+            await idempotent_command(BrokerRequest(self.message), inner, store=self.store)
+        observed = await idempotent_command(BrokerRequest(self.message), inner, store=self.store)
+
+        self.assertEqual(2, inner.call_count)
+        self.assertEqual({"foo": "bar"}, await observed.content())
+
+    async def test_idempotent_command_transaction(self):
+        transaction = TransactionEntry(uuid4(), event_repository=MagicMock(), transaction_repository=MagicMock())
+        token = TRANSACTION_CONTEXT_VAR.set(transaction)
+        try:
+            await idempotent_command(BrokerRequest(self.message), AsyncMock(return_value=None), store=self.store)
+        finally:
+            TRANSACTION_CONTEXT_VAR.reset(token)
+
+        self.assertEqual([transaction.uuid], list(self.store.transactions.values()))
+
+    def test_build_idempotency_key_step(self):
+        content = {"quantities": {str(uuid4()): 2}}
+        one = BrokerMessageV1(
+            "PurchaseProducts", BrokerMessageV1Payload(content | {"step": "one"}, self.message.headers)
+        )
+        two = BrokerMessageV1(
+            "PurchaseProducts", BrokerMessageV1Payload(content | {"step": "two"}, self.message.headers)
+        )
+
+        self.assertNotEqual(build_idempotency_key(one), build_idempotency_key(two))
+
+    async def test_idempotent_command_other_topic(self):
+        message = BrokerMessageV1("GetProducts", BrokerMessageV1Payload({"uuids": []}))
+        inner = AsyncMock(return_value=Response([]))
+
+        await idempotent_command(BrokerRequest(message), inner, store=self.store)
+        await idempotent_command(BrokerRequest(message), inner, store=self.store)
+
+        self.assertEqual(2, inner.call_count)
+        self.assertEqual(dict(), self.store.responses)
+
+    async def test_idempotent_command_not_broker(self):
+        inner = AsyncMock(return_value=Response({"foo": "bar"}))
+
+        await idempotent_command(InMemoryRequest({"foo": "bar"}), inner, store=self.store)
+        await idempotent_command(InMemoryRequest({"foo": "bar"}), inner, store=self.store)
+
+        self.assertEqual(2, inner.call_count)
+
+
+class TestIdempotencyStore(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        config = build_config()
+        self.transaction_repository = PostgreSqlTransactionRepository.from_config(config, lock_pool=FakeLockPool())
+        self.store = IdempotencyStore.from_config(config, poll_interval=0.01)
+        await self.transaction_repository.setup()
+        await self.store.setup()
+
+    async def asyncTearDown(self) -> None:
+        await self.store.destroy()
+        await self.transaction_repository.destroy()
+
+    async def test_claim_complete(self):
+        key = uuid4().bytes
+
+        self.assertIsNone(await self.store.claim(key))
+        await self.store.complete(key, b"foo")
+
+        self.assertEqual(b"foo", await self.store.claim(key))
+
+    async def test_claim_release(self):
+        key = uuid4().bytes
+
+        self.assertIsNone(await self.store.claim(key))
+        await self.store.release(key)
+
+        self.assertIsNone(await self.store.claim(key))
+
+    async def test_claim_expired_lease(self):
+        key = uuid4().bytes
+        self.store.lease = 0
+
+        self.assertIsNone(await self.store.claim(key))
+        self.assertIsNone(await self.store.claim(key))
+
+    async def test_claim_rejected_transaction(self):
+        key, committed, rejected = uuid4().bytes, uuid4(), uuid4()
+        for uuid, status in [(committed, TransactionStatus.COMMITTED), (rejected, TransactionStatus.REJECTED)]:
+            transaction = TransactionEntry(
+                uuid, status, event_repository=MagicMock(), transaction_repository=self.transaction_repository
+            )
+            await self.transaction_repository.submit(transaction)
+
+        self.assertIsNone(await self.store.claim(key, committed))
+        await self.store.complete(key, b"foo")
+        self.assertEqual(b"foo", await self.store.claim(key, committed))
+
+        other = uuid4().bytes
+        self.assertIsNone(await self.store.claim(other, rejected))
+        await self.store.complete(other, b"foo")
+        self.assertIsNone(await self.store.claim(other, rejected))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from time import (
+    time_ns,
+)
+from unittest.mock import (
+    MagicMock,
+    patch,
+)
+from uuid import (
+    uuid4,
+)
+
+from minos.aggregate import (
+    PostgreSqlEventRepository,
+)
+from minos.common import (
+    NULL_UUID,
+)
+
+from src.identifiers import (
+    TimeOrderedEventRepository,
+    TimeOrderedUUIDGenerator,
+    uuid7,
+)
+
+
+class TestTimeOrderedUUIDGenerator(unittest.TestCase):
+    def test_layout(self):
+        now = time_ns() // 1_000_000
+        uuid = uuid7()
+
+        self.assertEqual(7, uuid.version)
+        self.assertEqual("specified in RFC 4122", uuid.variant)
+        self.assertLessEqual(abs(now - (uuid.int >> 80)), 1000)
+
+    def test_increasing(self):
+        generate = TimeOrderedUUIDGenerator()
+        uuids = [generate() for _ in range(10_000)]
+
+        self.assertEqual(sorted(uuids), uuids)
+        self.assertEqual(len(uuids), len(set(uuids)))
+
+    def test_counter_overflow(self):
+        generate = TimeOrderedUUIDGenerator()
+        with patch("src.identifiers.time_ns", return_value=1_000_000_000):
+            uuids = [generate() for _ in range(5000)]
+
+        self.assertEqual(sorted(uuids), uuids)
+        self.assertEqual(1001, uuids[-1].int >> 80)
+
+
+class TestTimeOrderedEventRepository(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.repository = TimeOrderedEventRepository(
+            host="localhost",
+            port=5432,
+            database="product_db",
+            user="minos",
+            password="min0s",
+            broker_publisher=MagicMock(),
+            transaction_repository=MagicMock(),
+            lock_pool=MagicMock(),
+        )
+
+    async def test_submit_create(self):
+        entry = MagicMock(aggregate_uuid=NULL_UUID)
+        with patch.object(PostgreSqlEventRepository, "_submit", side_effect=lambda e, **kwargs: e):
+            observed = await self.repository._submit(entry)
+
+        self.assertEqual(7, observed.aggregate_uuid.version)
+
+    async def test_submit_update(self):
+        uuid = uuid4()
+        entry = MagicMock(aggregate_uuid=uuid)
+        with patch.object(PostgreSqlEventRepository, "_submit", side_effect=lambda e, **kwargs: e):
+            observed = await self.repository._submit(entry)
+
+        self.assertEqual(uuid, observed.aggregate_uuid)
+
+
+if __name__ == "__main__":
+    unittest.main()
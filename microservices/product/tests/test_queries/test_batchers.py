@@ -0,0 +1,119 @@
+import unittest
+from asyncio import (
+    Event,
+    create_task,
+    gather,
+    sleep,
+)
+from unittest.mock import (
+    AsyncMock,
+    MagicMock,
+)
+from uuid import (
+    uuid4,
+)
+
+from minos.aggregate import (
+    Action,
+    AggregateDiff,
+    FieldDiffContainer,
+)
+from minos.common import (
+    current_datetime,
+)
+
+from src import (
+    ProductQueryRepository,
+    ProjectionBatcher,
+)
+from tests.utils import (
+    build_config,
+)
+
+
+def _build_diff(version: int = 1) -> AggregateDiff:
+    return AggregateDiff(
+        uuid4(),
+        "src.aggregates.Product",
+        version,
+        Action.DELETE,
+        created_at=current_datetime(),
+        fields_diff=FieldDiffContainer([]),
+    )
+
+
+class TestProjectionBatcher(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.repository = MagicMock(project=AsyncMock())
+        self.batcher = ProjectionBatcher(self.repository, window=5)
+
+    async def asyncTearDown(self) -> None:
+        await self.batcher.destroy()
+
+    def test_from_config(self):
+        repository = ProductQueryRepository.from_config(build_config())
+        batcher = ProjectionBatcher.from_config(build_config(), product_repository=repository)
+
+        self.assertEqual(repository, batcher.repository)
+        self.assertEqual(0, batcher.window)
+        self.assertEqual(15, batcher.max_size)
+
+    async def test_submit(self):
+        diffs = [_build_diff() for _ in range(4)]
+
+        await gather(*(self.batcher.submit(diff) for diff in diffs))
+
+        self.assertEqual([((diffs,), {})], self.repository.project.call_args_list)
+
+    async def test_submit_max_size(self):
+        self.batcher.max_size = 2
+        diffs = [_build_diff() for _ in range(4)]
+
+        await gather(*(self.batcher.submit(diff) for diff in diffs))
+
+        self.assertEqual([((diffs[:2],), {}), ((diffs[2:],), {})], self.repository.project.call_args_list)
+
+    async def test_submit_while_projecting(self):
+        self.batcher.window = 60_000
+        started, released = Event(), Event()
+
+        async def _project(diffs):
+            started.set()
+            await released.wait()
+
+        self.repository.project.side_effect = _project
+        self.batcher.max_size = 1
+        first = create_task(self.batcher.submit(_build_diff()))
+        await started.wait()
+        self.batcher.max_size = 15
+
+        diffs = [_build_diff() for _ in range(3)]
+        others = gather(*(self.batcher.submit(diff) for diff in diffs))
+        await sleep(0)
+        self.assertEqual(1, self.repository.project.call_count)
+
+        released.set()
+        await gather(first, others)
+
+        self.assertEqual(((diffs,), {}), self.repository.project.call_args_list[1])
+
+    async def test_submit_raises(self):
+        failing = _build_diff()
+
+        async def _project(diffs):
+            if failing in diffs:
+                raise ValueError()
+
+        self.repository.project.side_effect = _project
+
+        observed = await gather(
+            self.batcher.submit(_build_diff()), self.batcher.submit(failing), return_exceptions=True
+        )
+
+        self.assertIsNone(observed[0])
+        self.assertIsInstance(observed[1], ValueError)
+        self.assertEqual(3, self.repository.project.call_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+import unittest
+from decimal import (
+    Decimal,
+)
+from uuid import (
+    uuid4,
+)
+
+from minos.aggregate import (
+    Action,
+    AggregateDiff,
+    FieldDiff,
+    FieldDiffContainer,
+)
+from minos.common import (
+    current_datetime,
+)
+
+from src import (
+    Inventory,
+    PostgreSqlQueryRepository,
+    ProductQueryRepository,
+)
+from src.queries.models import (
+    PRODUCT_TABLE,
+)
+from tests.utils import (
+    build_config,
+)
+
+
+class TestProductQueryRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        self.config = build_config()
+
+    def test_subclass(self):
+        self.assertTrue(issubclass(ProductQueryRepository, PostgreSqlQueryRepository))
+
+    def test_from_config(self):
+        repository = ProductQueryRepository.from_config(self.config)
+
+        self.assertEqual("product_query_db", repository.database)
+        self.assertEqual(self.config.repository.host, repository.host)
+        self.assertEqual(self.config.repository.port, repository.port)
+        self.assertEqual(5, repository.pool_size)
+        self.assertEqual(10, repository.max_overflow)
+        self.assertEqual(3600, repository.pool_recycle)
+        self.assertEqual(30000, repository.statement_timeout)
+        self.assertEqual(1024, repository.cache.max_size)
+        self.assertEqual(5, repository.cache.ttl)
+        self.assertIsNone(repository.engine)
+
+    def test_from_config_with_kwargs(self):
+        repository = ProductQueryRepository.from_config(self.config, pool_size=2, statement_timeout=None)
+
+        self.assertEqual(2, repository.pool_size)
+        self.assertIsNone(repository.statement_timeout)
+
+    def test_invalidate(self):
+        repository = ProductQueryRepository.from_config(self.config)
+        uuid = uuid4()
+        version = repository.cache.version()
+
+        repository._invalidate(uuid)
+
+        self.assertFalse(repository.cache.set(uuid, "stale", version=version))
+        self.assertFalse(repository.cache.set("__catalog__", "stale", version=version))
+
+    def test_cursor(self):
+        uuid = uuid4()
+        cursor = ProductQueryRepository._encode_cursor([Decimal("3.5"), uuid])
+
+        self.assertEqual([Decimal("3.5"), uuid], ProductQueryRepository._decode_cursor(cursor, "price"))
+
+    def test_cursor_invalid(self):
+        cursor = ProductQueryRepository._encode_cursor([uuid4()])
+
+        with self.assertRaises(ValueError):
+            ProductQueryRepository._decode_cursor(cursor, "price")
+        with self.assertRaises(ValueError):
+            ProductQueryRepository._decode_cursor("foo", "uuid")
+
+    def test_fold(self):
+        created, updated, deleted = uuid4(), uuid4(), uuid4()
+        inventory = Inventory(amount=10, reserved=0, sold=0)
+        diffs = [
+            _build_diff(created, 2, Action.UPDATE, title="Cacao 2"),
+            _build_diff(created, 1, Action.CREATE, title="Cacao", price=3.5, inventory=inventory, inventory_slots=None),
+            _build_diff(created, 3, Action.UPDATE, price=4.0),
+            _build_diff(updated, 4, Action.UPDATE, title="Milk"),
+            _build_diff(updated, 5, Action.UPDATE, title="Milk 2", price=1.0),
+            _build_diff(deleted, 7, Action.UPDATE, title="Sugar"),
+            _build_diff(deleted, 8, Action.DELETE),
+            _build_diff(deleted, 9, Action.UPDATE, title="Sugar 2"),
+        ]
+
+        expected = {
+            created: (
+                Action.CREATE,
+                {
+                    "uuid": created,
+                    "version": 3,
+                    "title": "Cacao 2",
+                    "price": 4.0,
+                    "inventory_amount": 10,
+                    "inventory_reserved": 0,
+                    "inventory_sold": 0,
+                },
+            ),
+            updated: (Action.UPDATE, {"uuid": updated, "version": 5, "title": "Milk 2", "price": 1.0}),
+            deleted: (Action.DELETE, {"uuid": deleted, "version": 8}),
+        }
+        self.assertEqual(expected, ProductQueryRepository.fold(diffs))
+
+
+class TestProductQueryRepositoryPage(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.repository = ProductQueryRepository.from_config(build_config())
+
+    async def test_get_page_unknown_ordering(self):
+        with self.assertRaises(ValueError):
+            await self.repository.get_page(10, order_by="title")
+
+    async def test_get_page_unknown_fields(self):
+        with self.assertRaises(ValueError):
+            await self.repository.get_page(10, fields=["title", "foo"])
+
+
+class TestProductQueryRepositoryStream(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.repository = ProductQueryRepository.from_config(build_config())
+        await self.repository.setup()
+
+    async def asyncTearDown(self) -> None:
+        await self.repository.destroy()
+
+    async def test_stream(self):
+        uuids = sorted(uuid4() for _ in range(5))
+        for uuid in uuids:
+            inventory = Inventory(amount=10, reserved=0, sold=0)
+            await self.repository.create(
+                uuid=uuid, version=1, code="abc", title="Cacao", description="1KG", price=3.5, inventory=inventory
+            )
+
+        query = PRODUCT_TABLE.select().where(PRODUCT_TABLE.columns.uuid.in_(uuids)).order_by(PRODUCT_TABLE.columns.uuid)
+        observed = [row["uuid"] async for row in self.repository.stream(query, batch_size=2)]
+
+        self.assertEqual(uuids, observed)
+
+
+class TestProductQueryRepositoryReviews(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.repository = ProductQueryRepository.from_config(build_config())
+        await self.repository.setup()
+
+        self.product_uuid = uuid4()
+        await self.repository.create(
+            uuid=self.product_uuid,
+            version=1,
+            code="abc",
+            title="Cacao",
+            description="1KG",
+            price=3.5,
+            inventory=Inventory(amount=10, reserved=0, sold=0),
+        )
+
+    async def asyncTearDown(self) -> None:
+        await self.repository.destroy()
+
+    async def _get_rating(self) -> tuple[int, float]:
+        product = await self.repository.get(self.product_uuid)
+        return product.reviews_count, product.reviews_score
+
+    async def test_reviews(self):
+        first, second = uuid4(), uuid4()
+        await self.repository.create_review(first, self.product_uuid, 4, 1)
+        await self.repository.create_review(second, self.product_uuid, 2, 1)
+        self.assertEqual((2, 3), await self._get_rating())
+
+        await self.repository.update_review_score(first, 5, 2)
+        self.assertEqual((2, 3.5), await self._get_rating())
+
+        await self.repository.delete_review(second, 2)
+        self.assertEqual((1, 5), await self._get_rating())
+
+    async def test_reviews_replayed(self):
+        uuid = uuid4()
+        await self.repository.create_review(uuid, self.product_uuid, 4, 1)
+        await self.repository.update_review_score(uuid, 2, 2)
+
+        await self.repository.create_review(uuid, self.product_uuid, 4, 1)
+        await self.repository.update_review_score(uuid, 2, 2)
+
+        self.assertEqual((1, 2), await self._get_rating())
+
+    async def test_reviews_out_of_order(self):
+        first, second = uuid4(), uuid4()
+        await self.repository.update_review_score(first, 5, 2)
+        self.assertEqual((0, 0), await self._get_rating())
+
+        await self.repository.create_review(first, self.product_uuid, 4, 1)
+        self.assertEqual((1, 5), await self._get_rating())
+
+        await self.repository.delete_review(second, 2)
+        await self.repository.create_review(second, self.product_uuid, 1, 1)
+        self.assertEqual((1, 5), await self._get_rating())
+
+    async def test_upgrade_reviews_total(self):
+        await self.repository.create_review(uuid4(), self.product_uuid, 4, 1)
+        await self.repository.create_review(uuid4(), self.product_uuid, 1, 1)
+
+        async with self.repository.transaction() as connection:
+            await connection.execute("ALTER TABLE product DROP COLUMN reviews_total")
+            await connection.execute("ALTER TABLE product ADD COLUMN reviews_score NUMERIC DEFAULT 0")
+
+        await self.repository.destroy()
+        await self.repository.setup()
+
+        self.assertEqual((2, 2.5), await self._get_rating())
+
+
+def _build_diff(uuid, version, action, **fields) -> AggregateDiff:
+    fields_diff = FieldDiffContainer([FieldDiff(name, type(value), value) for name, value in fields.items()])
+    return AggregateDiff(
+        uuid, "src.aggregates.Product", version, action, created_at=current_datetime(), fields_diff=fields_diff
+    )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,6 +4,27 @@ from __future__ import (
 
 import sys
 import unittest
+from unittest.mock import (
+    AsyncMock,
+    MagicMock,
+)
+from uuid import (
+    UUID,
+    uuid4,
+)
+
+from minos.aggregate import (
+    Action,
+    AggregateDiff,
+    FieldDiff,
+    FieldDiffContainer,
+)
+from minos.common import (
+    current_datetime,
+)
+from minos.networks import (
+    InMemoryRequest,
+)
 
 from src import (
     ProductQueryService,
@@ -23,6 +44,78 @@ class TestProductQueryService(unittest.IsolatedAsyncioTestCase):
     async def asyncTearDown(self) -> None:
         await self.injector.unwire()
 
+    async def test_product_updated_batched(self):
+        repository, batcher = AsyncMock(), MagicMock(submit=AsyncMock())
+        service = ProductQueryService(projection_batcher=batcher)
+        service.repository = repository
+        diff = AggregateDiff(
+            uuid4(),
+            "src.aggregates.Product",
+            2,
+            Action.UPDATE,
+            created_at=current_datetime(),
+            fields_diff=FieldDiffContainer([FieldDiff("title", str, "Cacao")]),
+        )
+
+        await service.product_updated(InMemoryRequest(diff))
+
+        self.assertEqual([((diff,), {})], batcher.submit.call_args_list)
+        self.assertEqual(0, repository.update.call_count)
+
+    async def test_review_created(self):
+        repository = AsyncMock()
+        service = ProductQueryService()
+        service.repository = repository
+        review_uuid, product_uuid = uuid4(), uuid4()
+        diff = AggregateDiff(
+            review_uuid,
+            "src.aggregates.Review",
+            1,
+            Action.CREATE,
+            created_at=current_datetime(),
+            fields_diff=FieldDiffContainer([FieldDiff("product", UUID, product_uuid), FieldDiff("score", int, 4)]),
+        )
+
+        await service.review_created(InMemoryRequest(diff))
+
+        self.assertEqual([((review_uuid, product_uuid, 4, 1), {})], repository.create_review.call_args_list)
+
+    async def test_review_updated(self):
+        repository = AsyncMock()
+        service = ProductQueryService()
+        service.repository = repository
+        review_uuid = uuid4()
+        diff = AggregateDiff(
+            review_uuid,
+            "src.aggregates.Review",
+            3,
+            Action.UPDATE,
+            created_at=current_datetime(),
+            fields_diff=FieldDiffContainer([FieldDiff("score", int, 2)]),
+        )
+
+        await service.review_updated(InMemoryRequest(diff))
+
+        self.assertEqual([((review_uuid, 2, 3), {})], repository.update_review_score.call_args_list)
+
+    async def test_review_deleted(self):
+        repository = AsyncMock()
+        service = ProductQueryService()
+        service.repository = repository
+        review_uuid = uuid4()
+        diff = AggregateDiff(
+            review_uuid,
+            "src.aggregates.Review",
+            4,
+            Action.DELETE,
+            created_at=current_datetime(),
+            fields_diff=FieldDiffContainer.empty(),
+        )
+
+        await service.review_deleted(InMemoryRequest(diff))
+
+        self.assertEqual([((review_uuid, 4), {})], repository.delete_review.call_args_list)
+
 
 if __name__ == "__main__":
     unittest.main()
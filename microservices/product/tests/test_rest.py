@@ -0,0 +1,159 @@
+import json
+import unittest
+from asyncio import (
+    Event,
+    wait_for,
+)
+
+from aiohttp import (
+    ClientPayloadError,
+    web,
+)
+from aiohttp.test_utils import (
+    TestClient,
+    TestServer,
+    make_mocked_request,
+)
+from minos.common import (
+    ModelType,
+)
+from minos.networks import (
+    InMemoryRequest,
+    Response,
+    RestRequest,
+)
+from sqlalchemy import (
+    func,
+    select,
+)
+
+from src import (
+    ProductQueryRepository,
+    StreamingResponse,
+    StreamingRestHandler,
+)
+from tests.utils import (
+    build_config,
+)
+
+_ItemDTO = ModelType.build("ItemDTO", {"uuid": str, "name": str})
+
+
+async def _items(count: int, fail: bool = False):
+    for i in range(count):
+        yield _ItemDTO(str(i), f"item-{i}")
+    if fail:
+        raise ValueError()
+
+
+class TestStreamingResponse(unittest.TestCase):
+    def test_requested_ndjson(self):
+        request = RestRequest(make_mocked_request("GET", "/items?stream=ndjson"))
+        self.assertEqual("application/x-ndjson", StreamingResponse.requested(request))
+
+    def test_requested_accept(self):
+        request = RestRequest(make_mocked_request("GET", "/items", headers={"Accept": "application/x-ndjson"}))
+        self.assertEqual("application/x-ndjson", StreamingResponse.requested(request))
+
+    def test_requested_json(self):
+        request = RestRequest(make_mocked_request("GET", "/items?stream=json"))
+        self.assertEqual("application/json", StreamingResponse.requested(request))
+
+    def test_not_requested(self):
+        self.assertIsNone(StreamingResponse.requested(RestRequest(make_mocked_request("GET", "/items"))))
+        self.assertIsNone(StreamingResponse.requested(InMemoryRequest({"stream": "ndjson"})))
+
+
+class TestStreamingRestHandler(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        async def _fn(request: RestRequest) -> Response:
+            if (content_type := StreamingResponse.requested(request)) is not None:
+                return StreamingResponse(_items(3, "fail" in request.raw.query), content_type)
+            return Response([item async for item in _items(3)])
+
+        app = web.Application()
+        app.router.add_route("GET", "/items", StreamingRestHandler.get_callback(_fn))
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+
+    async def test_ndjson(self):
+        response = await self.client.get("/items", params={"stream": "ndjson"})
+
+        self.assertEqual(200, response.status)
+        self.assertEqual("application/x-ndjson", response.content_type)
+        lines = (await response.text()).splitlines()
+        self.assertEqual(
+            [{"uuid": str(i), "name": f"item-{i}"} for i in range(3)], [json.loads(line) for line in lines]
+        )
+
+    async def test_json(self):
+        response = await self.client.get("/items", params={"stream": "json"})
+
+        self.assertEqual(200, response.status)
+        self.assertEqual([{"uuid": str(i), "name": f"item-{i}"} for i in range(3)], await response.json())
+
+    async def test_failure_aborts(self):
+        response = await self.client.get("/items", params={"stream": "ndjson", "fail": "1"})
+
+        self.assertEqual(200, response.status)
+        with self.assertRaises(ClientPayloadError):
+            await response.read()
+
+    async def test_not_streamed(self):
+        response = await self.client.get("/items")
+
+        self.assertEqual(200, response.status)
+        self.assertEqual([{"uuid": str(i), "name": f"item-{i}"} for i in range(3)], await response.json())
+
+
+class TestStreamingRestHandlerDisconnection(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.repository = ProductQueryRepository.from_config(build_config(), pool_size=1, max_overflow=0)
+        await self.repository.setup()
+
+        self.responses = list()
+        self.finished = Event()
+
+        async def _fn(request: RestRequest) -> Response:
+            query = select(func.generate_series(1, 1_000_000).label("i"))
+            items = self.repository.stream(query, batch_size=1, factory=lambda row: _ItemDTO(str(row["i"]), ""))
+            response = StreamingResponse(items)
+            # The response is kept alive, so that its items are not closed by the garbage collector.
+            self.responses.append(response)
+            return response
+
+        callback = StreamingRestHandler.get_callback(_fn)
+
+        async def _handler(request: web.Request) -> web.StreamResponse:
+            try:
+                return await callback(request)
+            finally:
+                self.finished.set()
+
+        app = web.Application()
+        app.router.add_route("GET", "/items", _handler)
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+        for response in self.responses:
+            await response.items.aclose()
+        await self.repository.destroy()
+
+    async def test_disconnection_releases_connection(self):
+        response = await self.client.get("/items")
+        self.assertEqual({"uuid": "1", "name": ""}, json.loads(await response.content.readline()))
+        self.assertEqual(0, self.repository.engine.freesize)
+
+        response.close()
+        await wait_for(self.finished.wait(), 5)
+
+        self.assertEqual(1, self.repository.engine.freesize)
+
+
+if __name__ == "__main__":
+    unittest.main()
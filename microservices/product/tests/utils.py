@@ -10,9 +10,9 @@ from uuid import (
 )
 
 from minos.aggregate import (
-    InMemoryEventRepository,
-    InMemorySnapshotRepository,
-    InMemoryTransactionRepository,
+    PostgreSqlEventRepository,
+    PostgreSqlSnapshotRepository,
+    PostgreSqlTransactionRepository,
 )
 from minos.common import (
     DependencyInjector,
@@ -77,9 +77,9 @@ def build_dependency_injector() -> DependencyInjector:
         saga_manager=_FakeSagaManager,
         broker_publisher=_FakeBroker,
         lock_pool=FakeLockPool,
-        transaction_repository=InMemoryTransactionRepository,
-        event_repository=InMemoryEventRepository,
-        snapshot_repository=InMemorySnapshotRepository,
+        transaction_repository=PostgreSqlTransactionRepository,
+        event_repository=PostgreSqlEventRepository,
+        snapshot_repository=PostgreSqlSnapshotRepository,
     )
 
 
@@ -6,9 +6,21 @@ from .aggregates import (
 from .commands import (
     ReviewCommandService,
 )
+from .identifiers import (
+    TimeOrderedEventRepository,
+    TimeOrderedUUIDGenerator,
+    uuid7,
+)
 from .queries import (
+    PostgreSqlQueryRepository,
     RatingDTO,
+    RatingSummaryDTO,
     ReviewDTO,
     ReviewQueryRepository,
     ReviewQueryService,
 )
+from .rest import (
+    StreamingResponse,
+    StreamingRestHandler,
+    StreamingRestService,
+)
@@ -1,5 +1,8 @@
 import logging
 import sys
+from asyncio import (
+    run,
+)
 from pathlib import (
     Path,
 )
@@ -10,6 +13,7 @@ from typing import (
 import typer
 from minos.common import (
     EntrypointLauncher,
+    MinosConfig,
 )
 
 logging.getLogger("aiohttp.access").setLevel(logging.WARNING)
@@ -28,6 +32,32 @@ def start(
     launcher.launch()
 
 
+@app.command("benchmark-identifiers")
+def benchmark_identifiers(
+    file_path: Optional[Path] = typer.Argument(
+        "config.yml", help="Microservice configuration file.", envvar="MINOS_CONFIGURATION_FILE_PATH",
+    ),
+    rows: int = typer.Option(10_000, help="Number of rows inserted with each kind of identifier."),
+    batch_size: int = typer.Option(100, help="Number of rows inserted by each statement."),
+):
+    """Compare the insert throughput and the primary key index size of random and time-ordered identifiers."""
+    from .benchmarks import (
+        benchmark_identifiers,
+    )
+    from .queries import (
+        ReviewQueryRepository,
+    )
+
+    async def _run():
+        async with ReviewQueryRepository.from_config(MinosConfig(file_path)) as repository:
+            return await benchmark_identifiers(repository, rows, batch_size)
+
+    typer.echo(f"{'identifier':>10} {'rows':>8} {'rows/s':>10} {'index (KiB)':>12}")
+    for row in run(_run()):
+        size = row["index_size"] / 1024
+        typer.echo(f"{row['identifier']:>10} {row['rows']:>8} {row['rows_per_second']:>10.0f} {size:>12.0f}")
+
+
 @app.callback()
 def callback():
     """Minos microservice CLI."""
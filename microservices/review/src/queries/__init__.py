@@ -1,5 +1,9 @@
+from .abc import (
+    PostgreSqlQueryRepository,
+)
 from .models import (
     RatingDTO,
+    RatingSummaryDTO,
     ReviewDTO,
 )
 from .repositories import (
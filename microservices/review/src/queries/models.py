@@ -9,8 +9,10 @@ from minos.common import (
 from sqlalchemy import (
     Column,
     DateTime,
+    Index,
     Integer,
     MetaData,
+    Numeric,
     Table,
     Text,
     UniqueConstraint,
@@ -34,6 +36,18 @@ REVIEW_TABLE = Table(
     UniqueConstraint("product_uuid", "user_uuid", name="uix_1"),
 )
 
+REVIEW_RATING_TABLE = Table(
+    "review_rating",
+    META,
+    Column("product_uuid", UUID_PG(as_uuid=True), primary_key=True),
+    Column("product_title", Text, nullable=False),
+    Column("count", Integer, nullable=False, default=0),
+    Column("sum", Integer, nullable=False, default=0),
+    Column("average", Numeric, nullable=False, default=0),
+    *(Column(f"score_{score}", Integer, nullable=False, default=0) for score in range(1, 6)),
+    Index("review_rating_average_idx", "average", "product_uuid"),
+)
+
 ReviewDTO = ModelType.build(
     "ReviewDTO",
     {
@@ -50,3 +64,15 @@ ReviewDTO = ModelType.build(
 )
 
 RatingDTO = ModelType.build("RatingDTO", {"product_uuid": UUID, "product_title": str, "average": float})
+
+RatingSummaryDTO = ModelType.build(
+    "RatingSummaryDTO",
+    {
+        "product_uuid": UUID,
+        "product_title": str,
+        "count": int,
+        "sum": int,
+        "average": float,
+        "histogram": dict[str, int],
+    },
+)
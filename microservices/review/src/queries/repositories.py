@@ -2,31 +2,44 @@ from __future__ import (
     annotations,
 )
 
+from typing import (
+    AsyncIterator,
+    Optional,
+)
 from uuid import (
     UUID,
 )
 
+from aiopg.sa import (
+    SAConnection,
+)
 from minos.aggregate import (
     FieldDiff,
 )
 from minos.common import (
     MinosConfig,
-    MinosSetup,
 )
 from sqlalchemy import (
+    Numeric,
     asc,
-    create_engine,
+    cast,
     desc,
     func,
+    select,
 )
-from sqlalchemy.orm import (
-    sessionmaker,
+from sqlalchemy.dialects.postgresql import (
+    insert,
 )
 
+from .abc import (
+    PostgreSqlQueryRepository,
+)
 from .models import (
     META,
+    REVIEW_RATING_TABLE,
     REVIEW_TABLE,
     RatingDTO,
+    RatingSummaryDTO,
     ReviewDTO,
 )
 
@@ -34,20 +47,27 @@ ORDER_ASC = "asc"
 ORDER_DESC = "desc"
 
 
-class ReviewQueryRepository(MinosSetup):
-    """ProductInventory Repository class."""
+class ReviewQueryRepository(PostgreSqlQueryRepository):
+    """ProductInventory Repository class.
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.engine = create_engine("postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}".format(**kwargs))
-        self.session = sessionmaker(bind=self.engine)()
+    Besides the reviews, a rating summary (count, sum, average and score histogram) is maintained per product on every
+    review change, so that the rating rankings do not need to aggregate the whole review table.
+    """
 
-    async def _setup(self) -> None:
-        META.create_all(self.engine)
+    metadata = META
 
     @classmethod
     def _from_config(cls, *args, config: MinosConfig, **kwargs) -> ReviewQueryRepository:
-        return cls(*args, **(config.repository._asdict() | {"database": "review_query_db"}) | kwargs)
+        return cls(
+            *args,
+            **(config.repository._asdict() | {"database": "review_query_db"}) | cls._pool_config(config) | kwargs,
+        )
+
+    async def _upgrade(self, connection: SAConnection) -> None:
+        # The summaries are built from scratch the first time, so that previous reviews are considered.
+        res = await connection.execute(select(func.count()).select_from(REVIEW_RATING_TABLE))
+        if not await res.scalar():
+            await self._rebuild_ratings(connection)
 
     async def create(self, **kwargs) -> None:
         """Create a new row.
@@ -66,7 +86,9 @@ class ReviewQueryRepository(MinosSetup):
         kwargs.pop("user")
 
         query = REVIEW_TABLE.insert().values(**kwargs)
-        self.engine.execute(query)
+        async with self.transaction() as connection:
+            await connection.execute(query)
+            await self._update_rating(connection, kwargs["product_uuid"], kwargs["product_title"], kwargs["score"], 1)
 
     async def get_reviews_by_product(self, product: UUID) -> list[ReviewDTO]:
         """Create a new row.
@@ -76,12 +98,21 @@ class ReviewQueryRepository(MinosSetup):
         """
 
         query = REVIEW_TABLE.select().where(REVIEW_TABLE.columns.product_uuid == product)
-        res = self.engine.execute(query)
-
-        reviews = [ReviewDTO(**row) for row in res]
+        async with self.connection() as connection:
+            res = await connection.execute(query)
+            reviews = [ReviewDTO(**row) async for row in res]
 
         return reviews
 
+    def stream_reviews_by_product(self, product: UUID) -> AsyncIterator[ReviewDTO]:
+        """Iterate over the reviews of a product without loading them at once.
+
+        :param product: The product identifier.
+        :return: An asynchronous iterator of ``ReviewDTO`` instances.
+        """
+        query = REVIEW_TABLE.select().where(REVIEW_TABLE.columns.product_uuid == product)
+        return self.stream(query, factory=lambda row: ReviewDTO(**row))
+
     async def product_score(self, product: UUID, limit: int = 1, order: str = ORDER_ASC) -> list[ReviewDTO]:
         """Create a new row.
 
@@ -98,9 +129,9 @@ class ReviewQueryRepository(MinosSetup):
             .order_by(direction(REVIEW_TABLE.columns.score))
             .limit(limit)
         )
-        res = self.engine.execute(query)
-
-        reviews = [ReviewDTO(**row) for row in res]
+        async with self.connection() as connection:
+            res = await connection.execute(query)
+            reviews = [ReviewDTO(**row) async for row in res]
 
         return reviews
 
@@ -117,9 +148,9 @@ class ReviewQueryRepository(MinosSetup):
             .order_by(REVIEW_TABLE.columns.score.asc())
             .limit(1)
         )
-        res = self.engine.execute(query)
-
-        reviews = [ReviewDTO(**row) for row in res]
+        async with self.connection() as connection:
+            res = await connection.execute(query)
+            reviews = [ReviewDTO(**row) async for row in res]
 
         return reviews
 
@@ -131,36 +162,120 @@ class ReviewQueryRepository(MinosSetup):
         """
 
         query = REVIEW_TABLE.select().where(REVIEW_TABLE.columns.user_uuid == user)
-        res = self.engine.execute(query)
-
-        reviews = [ReviewDTO(**row) for row in res]
+        async with self.connection() as connection:
+            res = await connection.execute(query)
+            reviews = [ReviewDTO(**row) async for row in res]
 
         return reviews
 
+    def stream_reviews_by_user(self, user: UUID) -> AsyncIterator[ReviewDTO]:
+        """Iterate over the reviews of a user without loading them at once.
+
+        :param user: The user identifier.
+        :return: An asynchronous iterator of ``ReviewDTO`` instances.
+        """
+        query = REVIEW_TABLE.select().where(REVIEW_TABLE.columns.user_uuid == user)
+        return self.stream(query, factory=lambda row: ReviewDTO(**row))
+
     async def reviews_score(self, limit: int = 10, order: str = ORDER_ASC) -> list[RatingDTO]:
         """Top 10 Most Rated Products.
 
+        The ratings are read from the incrementally maintained summary, through its ``average`` index.
+
         :param limit: Records quantity to return.
         :param order: Score order.
         :return: This method does not return anything.
         """
         direction = desc if order == ORDER_DESC else asc
 
-        res = (
-            self.session.query(
-                REVIEW_TABLE.columns.product_uuid,
-                REVIEW_TABLE.columns.product_title,
-                func.avg(REVIEW_TABLE.columns.score).label("average"),
+        query = (
+            select(
+                REVIEW_RATING_TABLE.columns.product_uuid,
+                REVIEW_RATING_TABLE.columns.product_title,
+                REVIEW_RATING_TABLE.columns.average,
+            )
+            .where(REVIEW_RATING_TABLE.columns.count > 0)
+            .order_by(
+                direction(REVIEW_RATING_TABLE.columns.average), direction(REVIEW_RATING_TABLE.columns.product_uuid)
             )
-            .group_by(REVIEW_TABLE.columns.product_uuid, REVIEW_TABLE.columns.product_title)
-            .order_by(direction("average"))
             .limit(limit)
         )
-
-        reviews = [RatingDTO(**row) for row in res]
+        async with self.connection() as connection:
+            res = await connection.execute(query)
+            reviews = [RatingDTO(**row) async for row in res]
 
         return reviews
 
+    async def get_rating(self, product: UUID) -> Optional[RatingSummaryDTO]:
+        """Get the rating summary of a product.
+
+        :param product: The product identifier.
+        :return: A ``RatingSummaryDTO`` instance or ``None`` if the product has not been reviewed.
+        """
+        query = REVIEW_RATING_TABLE.select().where(REVIEW_RATING_TABLE.columns.product_uuid == product)
+        async with self.connection() as connection:
+            res = await connection.execute(query)
+            row = await res.first()
+
+        if row is None:
+            return None
+
+        return RatingSummaryDTO(
+            product_uuid=row["product_uuid"],
+            product_title=row["product_title"],
+            count=row["count"],
+            sum=row["sum"],
+            average=row["average"],
+            histogram={str(score): row[f"score_{score}"] for score in range(1, 6)},
+        )
+
+    async def rebuild_ratings(self) -> None:
+        """Rebuild the rating summaries from the stored reviews.
+
+        :return: This method does not return anything.
+        """
+        async with self.transaction() as connection:
+            await self._rebuild_ratings(connection)
+
+    @staticmethod
+    async def _rebuild_ratings(connection) -> None:
+        columns = REVIEW_TABLE.columns
+        query = REVIEW_RATING_TABLE.insert().from_select(
+            ["product_uuid", "product_title", "count", "sum", "average", *(f"score_{i}" for i in range(1, 6))],
+            select(
+                columns.product_uuid,
+                func.max(columns.product_title),
+                func.count(),
+                func.sum(columns.score),
+                func.avg(columns.score),
+                *(func.count().filter(columns.score == i) for i in range(1, 6)),
+            ).group_by(columns.product_uuid),
+        )
+        await connection.execute(REVIEW_RATING_TABLE.delete())
+        await connection.execute(query)
+
+    @staticmethod
+    async def _update_rating(connection, product: UUID, product_title: str, score: int, count: int) -> None:
+        table = REVIEW_RATING_TABLE
+        values = {"count": count, "sum": count * score, "average": score, f"score_{score}": count}
+        query = (
+            insert(table)
+            .values(product_uuid=product, product_title=product_title, **values)
+            .on_conflict_do_update(
+                index_elements=[table.columns.product_uuid],
+                set_={
+                    "count": table.columns.count + count,
+                    "sum": table.columns.sum + count * score,
+                    "average": func.coalesce(
+                        cast(table.columns.sum + count * score, Numeric) / func.nullif(table.columns.count + count, 0),
+                        0,
+                    ),
+                    f"score_{score}": table.columns[f"score_{score}"] + count,
+                },
+            )
+        )
+        await connection.execute(query)
+
     async def last_reviews(self, limit: int = 1) -> list[ReviewDTO]:
         """Create a new row.
 
@@ -170,9 +285,9 @@ class ReviewQueryRepository(MinosSetup):
 
         query = REVIEW_TABLE.select().order_by(desc(REVIEW_TABLE.columns.date)).limit(limit)
 
-        res = self.engine.execute(query)
-
-        reviews = [ReviewDTO(**row) for row in res]
+        async with self.connection() as connection:
+            res = await connection.execute(query)
+            reviews = [ReviewDTO(**row) async for row in res]
 
         return reviews
 
@@ -183,8 +298,26 @@ class ReviewQueryRepository(MinosSetup):
         :param kwargs: The parameters to be updated.
         :return: This method does not return anything.
         """
+        kwargs = {k: v if not isinstance(v, FieldDiff) else v.value for k, v in kwargs.items()}
+
         query = REVIEW_TABLE.update().where(REVIEW_TABLE.columns.uuid == uuid).values(**kwargs)
-        self.engine.execute(query)
+        async with self.transaction() as connection:
+            previous = None
+            if "score" in kwargs:
+                previous = await self._get_for_update(connection, uuid)
+
+            await connection.execute(query)
+
+            if previous is not None and previous["score"] != kwargs["score"]:
+                product, title = previous["product_uuid"], previous["product_title"]
+                await self._update_rating(connection, product, title, previous["score"], -1)
+                await self._update_rating(connection, product, title, kwargs["score"], 1)
+
+    @staticmethod
+    async def _get_for_update(connection, uuid: UUID):
+        query = REVIEW_TABLE.select().where(REVIEW_TABLE.columns.uuid == uuid).with_for_update()
+        res = await connection.execute(query)
+        return await res.first()
 
     async def delete(self, uuid: UUID) -> None:
         """Delete an entry from the database.
@@ -193,12 +326,19 @@ class ReviewQueryRepository(MinosSetup):
         :return: This method does not return anything.
         """
         query = REVIEW_TABLE.delete().where(REVIEW_TABLE.columns.uuid == uuid)
-        self.engine.execute(query)
+        async with self.transaction() as connection:
+            previous = await self._get_for_update(connection, uuid)
+            await connection.execute(query)
+
+            if previous is not None:
+                product, title = previous["product_uuid"], previous["product_title"]
+                await self._update_rating(connection, product, title, previous["score"], -1)
 
     async def delete_all(self) -> None:
         """Delete all database.
 
         :return: This method does not return anything.
         """
-        query = REVIEW_TABLE.delete()
-        self.engine.execute(query)
+        async with self.transaction() as connection:
+            await connection.execute(REVIEW_TABLE.delete())
+            await connection.execute(REVIEW_RATING_TABLE.delete())
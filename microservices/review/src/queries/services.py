@@ -14,6 +14,9 @@ from minos.networks import (
     enroute,
 )
 
+from ..rest import (
+    StreamingResponse,
+)
 from .repositories import (
     ReviewQueryRepository,
 )
@@ -39,6 +42,9 @@ class ReviewQueryService(QueryService):
             content = await request.content()
             uuid = content["uuid"]
 
+        if (content_type := StreamingResponse.requested(request)) is not None:
+            return StreamingResponse(self.repository.stream_reviews_by_product(uuid), content_type)
+
         res = await self.repository.get_reviews_by_product(uuid)
 
         return Response(res)
@@ -57,6 +63,9 @@ class ReviewQueryService(QueryService):
             content = await request.content()
             uuid = content["uuid"]
 
+        if (content_type := StreamingResponse.requested(request)) is not None:
+            return StreamingResponse(self.repository.stream_reviews_by_user(uuid), content_type)
+
         res = await self.repository.get_reviews_by_user(uuid)
 
         return Response(res)
@@ -88,6 +97,25 @@ class ReviewQueryService(QueryService):
 
         return Response(res)
 
+    @enroute.rest.query("/reviews/product/{uuid}/rating", "GET")
+    @enroute.broker.query("GetProductRating")
+    async def get_product_rating(self, request: Request) -> Response:
+        """Get the rating summary of a product.
+
+        :param request: A request instance containing the product identifier.
+        :return: A response containing the count, sum, average and score histogram of the product reviews.
+        """
+        if isinstance(request, RestRequest):
+            params = await request.params()
+            uuid = params["uuid"]
+        else:
+            content = await request.content()
+            uuid = content["uuid"]
+
+        res = await self.repository.get_rating(uuid)
+
+        return Response(res)
+
     @enroute.rest.query("/reviews/score", "GET")
     @enroute.broker.query("GetTopRatedProducts")
     async def get_reviews_score(self, request: Request) -> Response:
@@ -0,0 +1,44 @@
+import unittest
+from contextlib import (
+    asynccontextmanager,
+)
+from unittest.mock import (
+    AsyncMock,
+    MagicMock,
+)
+
+from src.benchmarks import (
+    benchmark_identifiers,
+)
+
+
+class _FakeReviewQueryRepository:
+    def __init__(self):
+        self.executed = AsyncMock()
+        self.scalar = AsyncMock(return_value=8192)
+
+    @asynccontextmanager
+    async def connection(self):
+        yield MagicMock(execute=self.executed, scalar=self.scalar)
+
+
+class TestBenchmarks(unittest.IsolatedAsyncioTestCase):
+    async def test_benchmark_identifiers(self):
+        repository = _FakeReviewQueryRepository()
+
+        observed = await benchmark_identifiers(repository, rows=250, batch_size=100)
+
+        self.assertEqual(["uuid4", "uuid7"], [row["identifier"] for row in observed])
+        for row in observed:
+            self.assertEqual(250, row["rows"])
+            self.assertEqual(8192, row["index_size"])
+            self.assertGreater(row["rows_per_second"], 0)
+
+        # For each kind of identifier: create, three batches and drop.
+        self.assertEqual(10, repository.executed.call_count)
+        inserted = repository.executed.call_args_list[6].args[0]
+        self.assertEqual(7, inserted.compile().params["uuid_m0"].version)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from asyncio import (
+    gather,
+)
+from uuid import (
+    uuid4,
+)
+
+from src import (
+    PostgreSqlQueryRepository,
+    ReviewQueryRepository,
+)
+from tests.utils import (
+    build_config,
+)
+
+
+class TestReviewQueryRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        self.config = build_config()
+
+    def test_subclass(self):
+        self.assertTrue(issubclass(ReviewQueryRepository, PostgreSqlQueryRepository))
+
+    def test_from_config(self):
+        repository = ReviewQueryRepository.from_config(self.config)
+
+        self.assertEqual("review_query_db", repository.database)
+        self.assertEqual(self.config.repository.host, repository.host)
+        self.assertEqual(self.config.repository.port, repository.port)
+        self.assertEqual(5, repository.pool_size)
+        self.assertEqual(10, repository.max_overflow)
+        self.assertEqual(3600, repository.pool_recycle)
+        self.assertEqual(30000, repository.statement_timeout)
+        self.assertIsNone(repository.engine)
+
+    def test_from_config_with_kwargs(self):
+        repository = ReviewQueryRepository.from_config(self.config, pool_size=2, statement_timeout=None)
+
+        self.assertEqual(2, repository.pool_size)
+        self.assertIsNone(repository.statement_timeout)
+
+
+class TestReviewQueryRepositoryRatings(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.config = build_config()
+        self.repository = ReviewQueryRepository.from_config(self.config, database=self.config.repository.database)
+        await self.repository.setup()
+
+    async def asyncTearDown(self) -> None:
+        await self.repository.destroy()
+
+    async def test_setup_rebuilds_ratings_once(self):
+        product = {"uuid": uuid4(), "title": "Cacao"}
+        for score in (4, 1):
+            user = {"uuid": uuid4(), "name": "John"}
+            await self.repository.create(
+                uuid=uuid4(), version=1, product=product, user=user, title="foo", description="bar", score=score
+            )
+
+        async with self.repository.transaction() as connection:
+            await connection.execute("DELETE FROM review_rating")
+
+        replicas = [
+            ReviewQueryRepository.from_config(self.config, database=self.config.repository.database) for _ in range(3)
+        ]
+        try:
+            await gather(*(replica.setup() for replica in replicas))
+        finally:
+            await gather(*(replica.destroy() for replica in replicas if replica.already_setup))
+
+        rating = await self.repository.get_rating(product["uuid"])
+        self.assertEqual((2, 5, 2.5), (rating.count, rating.sum, rating.average))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -29,6 +29,7 @@ from src import (
     Customer,
     Product,
     RatingDTO,
+    RatingSummaryDTO,
     ReviewDTO,
     ReviewQueryRepository,
     ReviewQueryService,
@@ -264,6 +265,38 @@ class TestReviewQueryService(unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual([RatingDTO(**row) for row in expected], observed)
 
+    async def test_get_product_rating(self):
+        request = InMemoryRequest({"uuid": self.product_1.uuid})
+        response = await self.service.get_product_rating(request)
+
+        observed = await response.content()
+
+        expected = RatingSummaryDTO(
+            product_uuid=self.product_1.uuid,
+            product_title="Product 1",
+            count=2,
+            sum=7,
+            average=3.5,
+            histogram={"1": 0, "2": 1, "3": 0, "4": 0, "5": 1},
+        )
+        self.assertEqual(expected, observed)
+
+    async def test_get_reviews_score_after_update(self):
+        async with self.repository as repository:
+            await repository.update(self.reviews[2]["uuid"], score=5)
+
+        request = InMemoryRequest({"limit": 10, "order": "desc"})
+        response = await self.service.get_reviews_score(request)
+
+        observed = await response.content()
+
+        expected = [
+            {"product_uuid": self.product_2.uuid, "product_title": "Product 2", "average": 4.0},
+            {"product_uuid": self.product_1.uuid, "product_title": "Product 1", "average": 3.5},
+        ]
+
+        self.assertEqual([RatingDTO(**row) for row in expected], observed)
+
     async def test_get_get_last_reviews(self):
         request = InMemoryRequest({"limit": 1})
         response = await self.service.get_last_reviews(request)
@@ -6,7 +6,13 @@ from .commands import (
     _CREATE_TICKET,
     TicketCommandService,
 )
+from .identifiers import (
+    TimeOrderedEventRepository,
+    TimeOrderedUUIDGenerator,
+    uuid7,
+)
 from .queries import (
+    PostgreSqlQueryRepository,
     TicketQueryRepository,
     TicketQueryService,
 )
@@ -0,0 +1,65 @@
+from __future__ import (
+    annotations,
+)
+
+from collections.abc import (
+    Iterable,
+)
+from statistics import (
+    median,
+)
+from time import (
+    perf_counter,
+)
+from uuid import (
+    uuid4,
+)
+
+from .aggregates import (
+    TicketEntry,
+)
+from .queries import (
+    TicketQueryRepository,
+)
+from .queries.models import (
+    TICKET_TABLE,
+)
+
+
+async def benchmark_projection(
+    repository: TicketQueryRepository, entry_counts: Iterable[int], repetitions: int = 5
+) -> list[dict[str, float]]:
+    """Measure the time elapsed since a ticket creation is projected until it can be read with all its entries.
+
+    The benchmark tickets are removed once they have been measured.
+
+    :param repository: The repository in which the tickets are projected.
+    :param entry_counts: The numbers of entries of the benchmark tickets.
+    :param repetitions: The number of tickets projected for each number of entries.
+    :return: A list containing the entry count together with the median, minimum and maximum latency in milliseconds.
+    """
+    results = list()
+    for entry_count in entry_counts:
+        latencies = list()
+        for _ in range(repetitions):
+            uuid = uuid4()
+            entries = [
+                TicketEntry(title=f"Product {i}", unit_price=1.5, quantity=1, product=uuid4())
+                for i in range(entry_count)
+            ]
+
+            started_at = perf_counter()
+            await repository.insert(uuid, 1, uuid.hex[:8], 1.5 * entry_count, entries)
+            ticket = await repository.get_ticket(uuid)
+            latencies.append((perf_counter() - started_at) * 1000)
+
+            if isinstance(ticket, dict) or len(ticket["entries"]) != entry_count:
+                raise ValueError(f"The ticket must contain {entry_count} entries. Obtained: {ticket!r}")
+
+            async with repository.connection() as connection:
+                await connection.execute(TICKET_TABLE.delete().where(TICKET_TABLE.columns.uuid == uuid))
+
+        results.append(
+            {"entries": entry_count, "median": median(latencies), "min": min(latencies), "max": max(latencies)}
+        )
+    return results
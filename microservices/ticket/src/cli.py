@@ -1,5 +1,8 @@
 import logging
 import sys
+from asyncio import (
+    run,
+)
 from pathlib import (
     Path,
 )
@@ -10,6 +13,7 @@ from typing import (
 import typer
 from minos.common import (
     EntrypointLauncher,
+    MinosConfig,
 )
 
 logging.getLogger("aiohttp.access").setLevel(logging.WARNING)
@@ -28,6 +32,31 @@ def start(
     launcher.launch()
 
 
+@app.command("benchmark")
+def benchmark(
+    file_path: Optional[Path] = typer.Argument(
+        "config.yml", help="Microservice configuration file.", envvar="MINOS_CONFIGURATION_FILE_PATH",
+    ),
+    entries: str = typer.Option("1,10,100,500,1000", help="Comma-separated numbers of entries per ticket."),
+    repetitions: int = typer.Option(5, help="Number of tickets projected for each number of entries."),
+):
+    """Measure the ticket projection latency against the number of entries."""
+    from .benchmarks import (
+        benchmark_projection,
+    )
+    from .queries import (
+        TicketQueryRepository,
+    )
+
+    async def _run():
+        async with TicketQueryRepository.from_config(MinosConfig(file_path)) as repository:
+            return await benchmark_projection(repository, map(int, entries.split(",")), repetitions)
+
+    typer.echo(f"{'entries':>8} {'median (ms)':>12} {'min (ms)':>10} {'max (ms)':>10}")
+    for row in run(_run()):
+        typer.echo(f"{row['entries']:>8} {row['median']:>12.2f} {row['min']:>10.2f} {row['max']:>10.2f}")
+
+
 @app.callback()
 def callback():
     """Minos microservice CLI."""
@@ -20,6 +20,9 @@ from src import (
     Ticket,
     TicketEntry,
 )
+from src.identifiers import (
+    uuid7,
+)
 
 CartQuery = ModelType.build("CartQuery", {"uuid": UUID})
 
@@ -40,7 +43,11 @@ async def _process_cart_items(context: SagaContext, response: SagaResponse) -> S
         total_price = product.price * product.quantity
         total_amount += total_price
         order_entry = TicketEntry(
-            title=product.title, unit_price=product.price, quantity=product.quantity, product=product.product_id
+            title=product.title,
+            unit_price=product.price,
+            quantity=product.quantity,
+            product=product.product_id,
+            uuid=uuid7(),
         )
         ticket_entries.add(order_entry)
 
@@ -1,3 +1,6 @@
+from .abc import (
+    PostgreSqlQueryRepository,
+)
 from .repositories import (
     TicketQueryRepository,
 )
@@ -30,7 +30,8 @@ TICKET_TABLE = Table(
 TICKET_ENTRY_TABLE = Table(
     "ticket_entries",
     META,
-    Column("ticket_uuid", UUID_PG(as_uuid=True), primary_key=True),
+    Column("uuid", UUID_PG(as_uuid=True), primary_key=True),
+    Column("ticket_uuid", UUID_PG(as_uuid=True), nullable=False, index=True),
     Column("title", Text, nullable=False),
     Column("unit_price", Numeric, nullable=False),
     Column("quantity", Integer, nullable=False),
@@ -38,7 +39,8 @@ TICKET_ENTRY_TABLE = Table(
     ForeignKeyConstraint(["ticket_uuid"], ["ticket.uuid"], name="fk_ticket", ondelete="CASCADE",),
 )
 TicketEntryDTO = ModelType.build(
-    "TicketEntryDTO", {"ticket_uuid": UUID, "title": str, "unit_price": float, "quantity": int, "product_uuid": UUID},
+    "TicketEntryDTO",
+    {"uuid": UUID, "ticket_uuid": UUID, "title": str, "unit_price": float, "quantity": int, "product_uuid": UUID},
 )
 TicketDTO = ModelType.build(
     "TicketDTO", {"uuid": UUID, "version": int, "code": str, "total_price": float, "entries": list[TicketEntryDTO]}
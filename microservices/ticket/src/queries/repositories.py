@@ -6,17 +6,19 @@ from uuid import (
     UUID,
 )
 
+from aiopg.sa import (
+    SAConnection,
+)
 from minos.common import (
     MinosConfig,
-    PostgreSqlMinosDatabase,
-)
-from sqlalchemy import (
-    create_engine,
 )
-from sqlalchemy.orm import (
-    sessionmaker,
+from sqlalchemy.dialects.postgresql import (
+    insert,
 )
 
+from .abc import (
+    PostgreSqlQueryRepository,
+)
 from .models import (
     META,
     TICKET_ENTRY_TABLE,
@@ -26,23 +28,33 @@ from .models import (
 )
 
 
-class TicketQueryRepository(PostgreSqlMinosDatabase):
+class TicketQueryRepository(PostgreSqlQueryRepository):
     """Ticket Amount repository"""
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.engine = create_engine("postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}".format(**kwargs))
-        self.session = sessionmaker(bind=self.engine)()
-
-    async def _setup(self) -> None:
-        META.create_all(self.engine)
+    metadata = META
 
     @classmethod
     def _from_config(cls, *args, config: MinosConfig, **kwargs) -> TicketQueryRepository:
-        return cls(*args, **(config.repository._asdict() | {"database": "ticket_query_db"}) | kwargs)
+        return cls(
+            *args,
+            **(config.repository._asdict() | {"database": "ticket_query_db"}) | cls._pool_config(config) | kwargs,
+        )
+
+    async def _upgrade(self, connection: SAConnection) -> None:
+        # The entries used to be keyed by their ticket, so that a ticket could only store one of them. They are keyed
+        # by their own identifier now, which is unknown for the already stored ones, so a random one is assigned.
+        result = await connection.execute(_HAS_ENTRY_UUID_QUERY)
+        if await result.first() is not None:
+            return
+
+        await connection.execute(_UPGRADE_ENTRY_UUID_QUERY)
 
     async def insert(self, uuid: UUID, version: int, code: str, total_price: float, entries) -> None:
-        """Insert Payment amount
+        """Insert a ticket together with all its entries within a single transaction.
+
+        The entries are written with a single multi-row statement, and a ticket that already exists is not written
+        again, so that replaying its creation event is harmless.
+
         :param uuid: UUID
         :param version: Version ID
         :param code: Ticket code
@@ -50,18 +62,31 @@ class TicketQueryRepository(PostgreSqlMinosDatabase):
         :param entries: Ticket entries
         :return: Nothing
         """
-        query = TICKET_TABLE.insert().values(uuid=uuid, version=version, code=code, total_price=total_price)
-        self.engine.execute(query)
-
-        for entry in entries:
-            query = TICKET_ENTRY_TABLE.insert().values(
-                ticket_uuid=uuid,
-                title=entry.title,
-                unit_price=entry.unit_price,
-                quantity=entry.quantity,
-                product_uuid=entry.product.uuid,
-            )
-            self.engine.execute(query)
+        query = (
+            insert(TICKET_TABLE)
+            .values(uuid=uuid, version=version, code=code, total_price=total_price)
+            .on_conflict_do_nothing()
+            .returning(TICKET_TABLE.columns.uuid)
+        )
+        rows = [
+            {
+                "uuid": entry.uuid,
+                "ticket_uuid": uuid,
+                "title": entry.title,
+                "unit_price": entry.unit_price,
+                "quantity": entry.quantity,
+                "product_uuid": entry.product.uuid,
+            }
+            for entry in entries
+        ]
+
+        async with self.transaction() as connection:
+            result = await connection.execute(query)
+            if await result.first() is None:
+                return  # The ticket has been already projected.
+
+            if rows:
+                await connection.execute(TICKET_ENTRY_TABLE.insert().values(rows))
 
     async def get_ticket(self, ticket_uuid: UUID) -> dict:
         """Insert Payment amount
@@ -70,24 +95,44 @@ class TicketQueryRepository(PostgreSqlMinosDatabase):
         """
         result = {}
 
-        try:
-            ticket_query = self.session.query(TICKET_TABLE).filter(TICKET_TABLE.columns.uuid == ticket_uuid).one()
-        except Exception:
-            return {"error": "Invalid Ticket UUID"}
+        async with self.connection() as connection:
+            try:
+                ticket_query = TICKET_TABLE.select().where(TICKET_TABLE.columns.uuid == ticket_uuid)
+                ticket_row = await (await connection.execute(ticket_query)).first()
+            except Exception:
+                ticket_row = None
 
-        try:
-            ticket_entries_query = TICKET_ENTRY_TABLE.select().where(
-                TICKET_ENTRY_TABLE.columns.ticket_uuid == ticket_uuid
-            )
-            ticket_entries_results = self.engine.execute(ticket_entries_query)
-        except Exception:
-            return {"error": "An error occurred while obtaining Ticket entries."}
+            if ticket_row is None:
+                return {"error": "Invalid Ticket UUID"}
+
+            try:
+                ticket_entries_query = TICKET_ENTRY_TABLE.select().where(
+                    TICKET_ENTRY_TABLE.columns.ticket_uuid == ticket_uuid
+                )
+                ticket_entries_rows = await (await connection.execute(ticket_entries_query)).fetchall()
+            except Exception:
+                return {"error": "An error occurred while obtaining Ticket entries."}
 
         try:
-            ticket_entries = [TicketEntryDTO(**row) for row in ticket_entries_results]
+            ticket_entries = [TicketEntryDTO(**row) for row in ticket_entries_rows]
 
-            result = TicketDTO(**ticket_query, entries=ticket_entries)
+            result = TicketDTO(**ticket_row, entries=ticket_entries)
         except Exception:
             result = {"error": "An error occurred when formatting result."}
 
         return result
+
+
+_HAS_ENTRY_UUID_QUERY = """
+SELECT 1
+FROM information_schema.columns
+WHERE table_schema = current_schema() AND table_name = 'ticket_entries' AND column_name = 'uuid'
+""".strip()
+
+_UPGRADE_ENTRY_UUID_QUERY = """
+ALTER TABLE ticket_entries ADD COLUMN uuid UUID;
+UPDATE ticket_entries SET uuid = md5(random()::TEXT || clock_timestamp()::TEXT)::UUID;
+ALTER TABLE ticket_entries ALTER COLUMN uuid SET NOT NULL;
+ALTER TABLE ticket_entries DROP CONSTRAINT ticket_entries_pkey;
+ALTER TABLE ticket_entries ADD PRIMARY KEY (uuid);
+""".strip()
@@ -0,0 +1,52 @@
+import unittest
+from contextlib import (
+    asynccontextmanager,
+)
+from unittest.mock import (
+    AsyncMock,
+    MagicMock,
+)
+
+from src.benchmarks import (
+    benchmark_projection,
+)
+
+
+class _FakeTicketQueryRepository:
+    def __init__(self):
+        self.tickets = dict()
+        self.executed = AsyncMock()
+
+    async def insert(self, uuid, version, code, total_price, entries) -> None:
+        self.tickets[uuid] = {"uuid": uuid, "entries": list(entries)}
+
+    async def get_ticket(self, ticket_uuid):
+        return MagicMock(__getitem__=lambda _, key: self.tickets[ticket_uuid][key])
+
+    @asynccontextmanager
+    async def connection(self):
+        yield MagicMock(execute=self.executed)
+
+
+class TestBenchmarks(unittest.IsolatedAsyncioTestCase):
+    async def test_benchmark_projection(self):
+        repository = _FakeTicketQueryRepository()
+
+        observed = await benchmark_projection(repository, [1, 20], repetitions=3)
+
+        self.assertEqual([1, 20], [row["entries"] for row in observed])
+        for row in observed:
+            self.assertLessEqual(row["min"], row["median"])
+            self.assertLessEqual(row["median"], row["max"])
+        self.assertEqual(6, repository.executed.call_count)
+
+    async def test_benchmark_projection_missing_entries(self):
+        repository = _FakeTicketQueryRepository()
+        repository.get_ticket = AsyncMock(return_value={"error": "Invalid Ticket UUID"})
+
+        with self.assertRaises(ValueError):
+            await benchmark_projection(repository, [1], repetitions=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
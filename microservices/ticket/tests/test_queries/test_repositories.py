@@ -0,0 +1,90 @@
+import unittest
+from uuid import (
+    uuid4,
+)
+
+from src import (
+    PostgreSqlQueryRepository,
+    TicketQueryRepository,
+)
+from tests.utils import (
+    build_config,
+)
+
+
+class TestTicketQueryRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        self.config = build_config()
+
+    def test_subclass(self):
+        self.assertTrue(issubclass(TicketQueryRepository, PostgreSqlQueryRepository))
+
+    def test_from_config(self):
+        repository = TicketQueryRepository.from_config(self.config)
+
+        self.assertEqual("ticket_query_db", repository.database)
+        self.assertEqual(self.config.repository.host, repository.host)
+        self.assertEqual(self.config.repository.port, repository.port)
+        self.assertEqual(5, repository.pool_size)
+        self.assertEqual(10, repository.max_overflow)
+        self.assertEqual(3600, repository.pool_recycle)
+        self.assertEqual(30000, repository.statement_timeout)
+        self.assertIsNone(repository.engine)
+
+    def test_from_config_with_kwargs(self):
+        repository = TicketQueryRepository.from_config(self.config, pool_size=2, statement_timeout=None)
+
+        self.assertEqual(2, repository.pool_size)
+        self.assertIsNone(repository.statement_timeout)
+
+
+class TestTicketQueryRepositoryUpgrade(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.repository = TicketQueryRepository.from_config(build_config())
+        await self.repository.setup()
+
+    async def asyncTearDown(self) -> None:
+        await self.repository.destroy()
+
+    async def test_upgrade_entries_primary_key(self):
+        ticket_uuid = uuid4()
+        async with self.repository.transaction() as connection:
+            await connection.execute("DROP TABLE ticket_entries")
+            await connection.execute(_OLD_TICKET_ENTRIES_TABLE)
+            await connection.execute(
+                "INSERT INTO ticket (uuid, version, code, total_price) VALUES (%s, 1, 'abc', 3.5)", ticket_uuid
+            )
+            await connection.execute(
+                "INSERT INTO ticket_entries VALUES (%s, 'Cacao', 3.5, 1, %s)", ticket_uuid, uuid4()
+            )
+
+        await self.repository.destroy()
+        await self.repository.setup()
+
+        entries = [uuid4(), uuid4()]
+        async with self.repository.transaction() as connection:
+            for entry in entries:
+                await connection.execute(
+                    "INSERT INTO ticket_entries (uuid, ticket_uuid, title, unit_price, quantity, product_uuid) "
+                    "VALUES (%s, %s, 'Milk', 1, 2, %s)",
+                    entry,
+                    ticket_uuid,
+                    uuid4(),
+                )
+            result = await connection.execute("SELECT count(*) FROM ticket_entries WHERE ticket_uuid = %s", ticket_uuid)
+            self.assertEqual(3, await result.scalar())
+
+
+_OLD_TICKET_ENTRIES_TABLE = """
+CREATE TABLE ticket_entries (
+    ticket_uuid UUID NOT NULL PRIMARY KEY REFERENCES ticket (uuid) ON DELETE CASCADE,
+    title TEXT NOT NULL,
+    unit_price NUMERIC NOT NULL,
+    quantity INTEGER NOT NULL,
+    product_uuid UUID NOT NULL
+)
+""".strip()
+
+
+if __name__ == "__main__":
+    unittest.main()